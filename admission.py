@@ -0,0 +1,125 @@
+import math
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from prometheus_client import Counter
+from instrumentation import QUEUE_DEPTH, STAGE_SECONDS
+
+ADMISSION_REJECTED = Counter('resume_admission_rejected_total', 'Calls shed by admission control', ['limiter', 'reason'])
+COALESCED = Counter('resume_coalesced_total', 'Calls that joined an identical in-flight computation', ['name'])
+
+
+class OverloadedError(Exception):
+    """
+    Raised when admission control sheds a call; retry_after is a suggested wait in seconds.
+    """
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Concurrency limiter with a bounded wait queue.
+
+    At most max_concurrency calls run at once and at most max_queue wait for a slot. Calls
+    arriving at a full queue, or waiting longer than queue_timeout seconds, are rejected
+    with OverloadedError instead of piling up until they all time out. Retry-After hints are
+    derived from a moving average of how long admitted calls hold their slot.
+    """
+
+    def __init__(self, name, max_concurrency=4, max_queue=32, queue_timeout=30.0):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiting = 0
+        self.average_seconds = 1.0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    def retry_after(self):
+        """
+        Estimated seconds until the current queue has drained, at least 1.
+        """
+        return max(1, math.ceil(self.average_seconds * (self.waiting + 1) / self.max_concurrency))
+
+    def _reject(self, reason, message):
+        ADMISSION_REJECTED.labels(self.name, reason).inc()
+        raise OverloadedError(message, self.retry_after())
+
+    @asynccontextmanager
+    async def admit(self):
+        """
+        Holds a slot for the duration of the block.
+
+        Raises:
+            OverloadedError: If the queue is full or the wait exceeds queue_timeout.
+        """
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            self._reject('queue_full', f"{self.name} is overloaded: {self.waiting} calls already waiting")
+
+        self.waiting += 1
+        QUEUE_DEPTH.labels(self.name).set(self.waiting)
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._reject('timeout', f"{self.name} is overloaded: no slot within {self.queue_timeout:.0f}s")
+        finally:
+            self.waiting -= 1
+            QUEUE_DEPTH.labels(self.name).set(self.waiting)
+            STAGE_SECONDS.labels(f"{self.name}_wait").observe(time.perf_counter() - start)
+
+        self.active += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+            self.average_seconds = 0.8 * self.average_seconds + 0.2 * (time.perf_counter() - start)
+
+    def stats(self):
+        return {
+            'active': self.active,
+            'waiting': self.waiting,
+            'max_concurrency': self.max_concurrency,
+            'max_queue': self.max_queue,
+            'average_seconds': round(self.average_seconds, 3),
+        }
+
+
+class Coalescer:
+    """
+    Lets concurrent calls with the same key share one in-flight computation.
+
+    The computation runs as its own task, so a caller that is cancelled (for example a client
+    that disconnects) does not cancel it for the other callers. Results are not kept once
+    the computation finishes; caching is left to the caches.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._tasks = {}
+
+    async def run(self, key, factory):
+        """
+        Awaits the in-flight computation for key, starting factory() if there is none.
+
+        Args:
+            key (str): Identity of the computation.
+            factory (callable): Returns the coroutine to run when no computation is in flight.
+        """
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._tasks[key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        else:
+            COALESCED.labels(self.name).inc()
+        return await asyncio.shield(task)
+
+    def __len__(self):
+        return len(self._tasks)
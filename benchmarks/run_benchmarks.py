@@ -0,0 +1,374 @@
+"""
+End-to-end benchmarks of ingestion, resume extraction and the /similar-resumes endpoints.
+
+Ollama is replaced by the stub HTTP server in stub_ollama.py and Qdrant runs in local mode,
+so results only depend on this code and the machine. Run from the repository root:
+
+    python -m benchmarks.run_benchmarks                   # compare against benchmarks/baseline.json
+    python -m benchmarks.run_benchmarks --update-baseline # store the results as the new baseline
+"""
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import itertools
+import tempfile
+import threading
+import numpy as np
+import httpx
+import uvicorn
+from qdrant_client import QdrantClient, AsyncQdrantClient
+from benchmarks.stub_ollama import StubOllama
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The benchmarks run in a temporary directory, so repository modules must not depend on the cwd
+sys.path.insert(0, REPO_DIR)
+BASELINE_PATH = os.path.join(REPO_DIR, 'benchmarks', 'baseline.json')
+RESUMES_FIXTURE = os.path.join(REPO_DIR, 'resumes_json.json')
+JOBS_FIXTURE = os.path.join(REPO_DIR, 'job_description.json')
+RESUME_TEXT_DIR = os.path.join(REPO_DIR, 'data', 'resume_text')
+
+MODEL_NAME = 'llama3.2'
+RESUME_COLLECTION = 'resume_collection'
+JOB_COLLECTION = 'jobdescription_collection'
+
+# Latency increases smaller than this are noise, whatever their relative size
+MIN_REGRESSION_MS = 5.0
+
+
+def percentiles(samples, prefix):
+    """
+    Returns p50/p95/p99 of latency samples in seconds as "<prefix>.pXX_ms" metrics.
+    """
+    if not samples:
+        return {}
+    values = np.asarray(samples) * 1000
+    return {f"{prefix}.p{p}_ms": round(float(np.percentile(values, p)), 2) for p in (50, 95, 99)}
+
+
+def scaled_records(records, scale):
+    """
+    Repeats fixture records scale times, tagging copies so every record is a distinct point.
+    """
+    scaled = []
+    for copy in range(scale):
+        for record in records:
+            record = dict(record)
+            if copy:
+                # The skill changes the embedded text as well, so copies are not embedding cache hits
+                skills_key = 'skills' if 'job_title' in record else 'Skills'
+                record[skills_key] = list(record.get(skills_key) or []) + [f"benchmark-{copy}"]
+            scaled.append(record)
+    return scaled
+
+
+class LocalQdrant:
+    """
+    Hands out local-mode Qdrant clients on one storage folder in place of server clients,
+    closing the previous one first because local mode locks its folder.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.client = None
+
+    def close(self):
+        if self.client is not None:
+            self.client.close()
+            self.client = None
+
+    def sync_client(self, **kwargs):
+        self.close()
+        self.client = QdrantClient(path=self.path)
+        return self.client
+
+    def async_client(self, **kwargs):
+        self.close()
+        return AsyncQdrantClient(path=self.path)
+
+
+def bench_ingestion(qdrant, resumes_file, jobs_file, resume_count, job_count):
+    """
+    Times resume and job description ingestion, then a re-sync of the unchanged resumes.
+    """
+    import store_resumes_qdrant
+    import store_job_description
+    store_resumes_qdrant.QdrantClient = qdrant.sync_client
+    store_job_description.QdrantClient = qdrant.sync_client
+
+    metrics = {}
+    for name, run, count in (
+        ('ingest.resumes', lambda: store_resumes_qdrant.process_resumes(
+            resumes_file, MODEL_NAME, 'localhost', 6333, RESUME_COLLECTION, checkpoint=False), resume_count),
+        ('ingest.resumes_unchanged', lambda: store_resumes_qdrant.process_resumes(
+            resumes_file, MODEL_NAME, 'localhost', 6333, RESUME_COLLECTION, checkpoint=False), resume_count),
+        ('ingest.jobs', lambda: store_job_description.process_job_description(
+            jobs_file, MODEL_NAME, 'localhost', 6333, JOB_COLLECTION, checkpoint=False), job_count),
+    ):
+        start = time.perf_counter()
+        run()
+        metrics[f"{name}.docs_per_sec"] = round(count / (time.perf_counter() - start), 2)
+
+    stored = qdrant.client.count(RESUME_COLLECTION).count
+    if stored != resume_count:
+        raise RuntimeError(f"Expected {resume_count} resumes in {RESUME_COLLECTION}, found {stored}")
+    qdrant.close()
+    return metrics
+
+
+def bench_extraction(sample_size, max_concurrency):
+    """
+    Times concurrent resume structuring of resume text files against the stub LLM.
+    """
+    from langchain_ollama.llms import OllamaLLM
+    from extractResumeJsonFormat import load_resume_records, extract_resume_data_concurrent
+    from format import resume_format
+
+    records = load_resume_records(RESUME_TEXT_DIR, sample_size, seed=0)
+    start = time.perf_counter()
+    stats = asyncio.run(extract_resume_data_concurrent(
+        OllamaLLM(model=MODEL_NAME), records, resume_format, 'extraction_results.jsonl',
+        max_concurrency=max_concurrency,
+    ))
+    if stats['failed']:
+        raise RuntimeError(f"Resume extraction failed for {stats['failed']} resumes")
+    return {'extract.resumes.docs_per_sec': round(len(records) / (time.perf_counter() - start), 2)}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class ApiServer:
+    """
+    Runs the FastAPI app with uvicorn in a background thread.
+    """
+
+    def __init__(self, app):
+        self.port = free_port()
+        self.server = uvicorn.Server(uvicorn.Config(app, host='127.0.0.1', port=self.port, log_level='warning'))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.05)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join()
+
+
+async def run_load(url, path, params_for, requests, concurrency):
+    """
+    Sends requests GET requests with at most concurrency in flight.
+
+    Returns:
+        tuple: (latencies in seconds, response bodies, wall time in seconds)
+    """
+    latencies, bodies = [], []
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=120.0) as client:
+        async def one(i):
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.get(path, params=params_for(i))
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+                bodies.append(response.text)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        return latencies, bodies, time.perf_counter() - start
+
+
+def bench_api(qdrant, job_descriptions, requests, concurrency_levels, repeats=3):
+    """
+    Measures /similar-resumes latency percentiles and throughput for LLM-structured, raw and
+    repeated (cached) job descriptions, and per-stage latencies from the streaming endpoint.
+    Every scenario runs repeats times and the run with the highest throughput is reported,
+    which keeps noise from other processes out of the comparison.
+    """
+    import main
+    main.AsyncQdrantClient = qdrant.async_client
+    texts = [job['job_summary'] or job['job_title'] for job in job_descriptions]
+    metrics = {}
+    runs = itertools.count(1)
+
+    def unique(i, run, raw=False):
+        # Distinct text per request, so no request is served from a cache
+        return {'job_description': f"{texts[i % len(texts)]} (request {run}-{i})", 'top_k': 7, 'raw': raw}
+
+    scenarios = {
+        'structured': lambda run: lambda i: unique(i, run),
+        'raw': lambda run: lambda i: unique(i, run, raw=True),
+        'cached': lambda run: lambda i: {'job_description': texts[0], 'top_k': 7},
+    }
+
+    with ApiServer(main.app) as server:
+        # Fill the result cache used by the cached scenario
+        asyncio.run(run_load(server.url, '/similar-resumes', scenarios['cached'](0), 1, 1))
+        for concurrency in concurrency_levels:
+            for name, params_for in scenarios.items():
+                best = None
+                for _ in range(repeats):
+                    latencies, _, wall = asyncio.run(run_load(
+                        server.url, '/similar-resumes', params_for(next(runs)), requests, concurrency
+                    ))
+                    if best is None or wall < best[1]:
+                        best = (latencies, wall)
+                prefix = f"api.{name}.c{concurrency}"
+                metrics.update(percentiles(best[0], prefix))
+                metrics[f"{prefix}.requests_per_sec"] = round(requests / best[1], 2)
+
+        # Stage breakdown from the streaming endpoint's final timings
+        _, bodies, _ = asyncio.run(run_load(
+            server.url, '/similar-resumes/stream',
+            lambda i: {**unique(i, 'stages'), 'speculative': False},
+            requests, 1,
+        ))
+        stages = {}
+        for body in bodies:
+            done = json.loads(body.strip().splitlines()[-1])
+            for stage, ms in done.get('timings', {}).items():
+                stages.setdefault(stage, []).append(ms / 1000)
+        for stage, samples in stages.items():
+            metrics.update(percentiles(samples, f"api.stage.{stage.removesuffix('_ms')}"))
+    return metrics
+
+
+def higher_is_better(metric):
+    return metric.endswith('_per_sec')
+
+
+def is_gated(metric):
+    # p99 of a few dozen requests is too noisy to fail a run on
+    return not metric.endswith('.p99_ms')
+
+
+def compare(metrics, baseline, tolerance):
+    """
+    Prints every metric next to its baseline and returns the names of regressed metrics.
+    Throughput regresses when it drops by more than tolerance; p50/p95 latency when it grows
+    by more than tolerance and MIN_REGRESSION_MS.
+    """
+    regressions = []
+    print(f"{'metric':<48}{'baseline':>12}{'current':>12}{'change':>9}")
+    for name, value in metrics.items():
+        base = baseline.get(name)
+        if not base:
+            print(f"{name:<48}{'-':>12}{value:>12}")
+            continue
+        change = (value - base) / base
+        if higher_is_better(name):
+            regressed = change < -tolerance
+        else:
+            regressed = change > tolerance and value - base > MIN_REGRESSION_MS and is_gated(name)
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<48}{base:>12}{value:>12}{change:>+9.0%}{'  REGRESSED' if regressed else ''}")
+    return regressions
+
+
+def run_benchmarks(scale=4, requests=48, concurrency_levels=(1, 8), repeats=3, extraction_sample=40,
+                   generate_delay=0.05, embed_delay=0.005, baseline_path=BASELINE_PATH, update_baseline=False, tolerance=0.25):
+    """
+    Runs all benchmarks in a temporary working directory and compares them with the baseline.
+
+    Args:
+        scale (int): Number of copies of the fixture resumes and job descriptions ingested.
+        requests (int): Requests per API scenario and concurrency level.
+        concurrency_levels (tuple): Numbers of concurrent API clients.
+        repeats (int): Runs per API scenario; the fastest one is reported.
+        extraction_sample (int): Number of resume text files structured.
+        generate_delay (float): Seconds the stub LLM spends on every generation.
+        embed_delay (float): Seconds the stub spends on every embedding call.
+        baseline_path (str): Stored baseline results.
+        update_baseline (bool): Write the results as the new baseline instead of comparing.
+        tolerance (float): Relative change beyond which a metric counts as regressed.
+
+    Returns:
+        list: Names of regressed metrics.
+    """
+    with open(RESUMES_FIXTURE) as f:
+        resumes = json.load(f)
+    with open(JOBS_FIXTURE) as f:
+        job_descriptions = json.load(f)
+    stub = StubOllama(resumes, job_descriptions, generate_delay=generate_delay, embed_delay=embed_delay).start()
+    os.environ['OLLAMA_HOST'] = stub.url
+
+    config = {
+        'scale': scale, 'requests': requests, 'concurrency_levels': list(concurrency_levels), 'repeats': repeats,
+        'extraction_sample': extraction_sample, 'generate_delay': generate_delay, 'embed_delay': embed_delay,
+    }
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix='benchmarks_') as work_dir:
+        # Caches, checkpoints and Qdrant storage all live under the temporary directory
+        os.chdir(work_dir)
+        try:
+            scaled_resumes = scaled_records(resumes, scale)
+            scaled_jobs = scaled_records(job_descriptions, scale)
+            with open('resumes.jsonl', 'w') as f:
+                f.writelines(json.dumps(record) + '\n' for record in scaled_resumes)
+            with open('jobs.jsonl', 'w') as f:
+                f.writelines(json.dumps(record) + '\n' for record in scaled_jobs)
+
+            qdrant = LocalQdrant(os.path.join(work_dir, 'qdrant'))
+            metrics = {}
+            metrics.update(bench_ingestion(qdrant, 'resumes.jsonl', 'jobs.jsonl', len(scaled_resumes), len(scaled_jobs)))
+            metrics.update(bench_extraction(extraction_sample, max_concurrency=4))
+            metrics.update(bench_api(qdrant, job_descriptions, requests, concurrency_levels, repeats))
+        finally:
+            os.chdir(cwd)
+            stub.stop()
+
+    if update_baseline:
+        with open(baseline_path, 'w') as f:
+            json.dump({'config': config, 'metrics': metrics}, f, indent=2)
+        print(f"Baseline with {len(metrics)} metrics written to {baseline_path}")
+        return []
+
+    baseline = {}
+    if os.path.exists(baseline_path):
+        with open(baseline_path) as f:
+            stored = json.load(f)
+        if stored.get('config') != config:
+            print(f"Warning: baseline was recorded with a different configuration: {stored.get('config')}")
+        baseline = stored.get('metrics', {})
+    regressions = compare(metrics, baseline, tolerance)
+    if regressions:
+        print(f"{len(regressions)} metrics regressed by more than {tolerance:.0%}")
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=48)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8])
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--extraction-sample', type=int, default=40)
+    parser.add_argument('--generate-delay', type=float, default=0.05)
+    parser.add_argument('--embed-delay', type=float, default=0.005)
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    parser.add_argument('--update-baseline', action='store_true')
+    args = parser.parse_args()
+    regressed = run_benchmarks(
+        scale=args.scale, requests=args.requests, concurrency_levels=tuple(args.concurrency),
+        repeats=args.repeats,
+        extraction_sample=args.extraction_sample, generate_delay=args.generate_delay,
+        embed_delay=args.embed_delay, update_baseline=args.update_baseline, tolerance=args.tolerance,
+    )
+    sys.exit(1 if regressed else 0)
@@ -0,0 +1,115 @@
+import json
+import time
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+
+
+def seeded_embedding(text, dimension):
+    """
+    Returns a deterministic pseudo-random unit vector for a text.
+    """
+    seed = int.from_bytes(hashlib.sha256(text.encode('utf-8')).digest()[:8], 'little')
+    vector = np.random.default_rng(seed).standard_normal(dimension)
+    return (vector / np.linalg.norm(vector)).round(6).tolist()
+
+
+class StubOllama:
+    """
+    Stand-in for the Ollama HTTP API serving /api/generate and /api/embed.
+
+    Generations return canned JSON picked deterministically from fixture records: resumes
+    for resume prompts and job descriptions for everything else. Embeddings are seeded
+    random vectors. generate_delay and embed_delay (seconds per call) emulate model time.
+    """
+
+    def __init__(self, resumes, job_descriptions, dimension=3072, generate_delay=0.05, embed_delay=0.005):
+        self.resumes = resumes
+        self.job_descriptions = job_descriptions
+        self.dimension = dimension
+        self.generate_delay = generate_delay
+        self.embed_delay = embed_delay
+        self.calls = {'generate': 0, 'embed': 0}
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _digest(self, prompt):
+        return int.from_bytes(hashlib.sha256(prompt.encode('utf-8')).digest()[:4], 'little')
+
+    def _pick(self, records, prompt):
+        return records[self._digest(prompt) % len(records)]
+
+    def generate(self, body):
+        prompt = body.get('prompt', '')
+        time.sleep(self.generate_delay)
+        if 'From the given resume' in prompt:
+            response = json.dumps(self._pick(self.resumes, prompt))
+        elif 'translate' in prompt:
+            response = prompt[-2000:]
+        else:
+            # Distinct prompts get distinct titles, so their query texts are embedded separately
+            job_description = dict(self._pick(self.job_descriptions, prompt))
+            job_description['job_title'] = f"{job_description.get('job_title', '')} {self._digest(prompt) % 10000}"
+            response = json.dumps(job_description)
+        chunk = {'model': body.get('model'), 'created_at': '2025-01-01T00:00:00Z', 'response': response, 'done': False}
+        final = {
+            'model': body.get('model'), 'created_at': '2025-01-01T00:00:00Z', 'response': '', 'done': True,
+            'done_reason': 'stop', 'prompt_eval_count': len(prompt) // 4, 'eval_count': len(response) // 4,
+        }
+        if body.get('stream', True):
+            return '\n'.join(json.dumps(part) for part in (chunk, final)) + '\n'
+        return json.dumps({**final, 'response': response})
+
+    def embed(self, body):
+        texts = body.get('input', [])
+        texts = [texts] if isinstance(texts, str) else texts
+        time.sleep(self.embed_delay)
+        return json.dumps({
+            'model': body.get('model'),
+            'embeddings': [seeded_embedding(text, self.dimension) for text in texts],
+        })
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                routes = {'/api/generate': stub.generate, '/api/embed': stub.embed}
+                route = routes.get(self.path)
+                if route is None:
+                    self.send_error(404)
+                    return
+                with stub._lock:
+                    stub.calls[self.path.rsplit('/', 1)[-1]] += 1
+                payload = route(body).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/x-ndjson')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self, host='127.0.0.1', port=0):
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
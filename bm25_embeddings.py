@@ -0,0 +1,58 @@
+import re
+import zlib
+from collections import Counter
+from langchain_qdrant import SparseEmbeddings, SparseVector
+
+SPARSE_VECTOR_NAME = "bm25"
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#.\-]*")
+
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or that the their this to was were will with
+""".split())
+
+
+def tokenize(text):
+    """
+    Splits text into lowercase terms, keeping skill tokens such as c++, c# and node.js intact.
+    """
+    tokens = (token.rstrip('.-') for token in TOKEN_PATTERN.findall((text or '').lower()))
+    return [token for token in tokens if token and token not in STOPWORDS]
+
+
+def term_index(term):
+    """
+    Maps a term to a stable sparse vector index.
+    """
+    return zlib.crc32(term.encode('utf-8'))
+
+
+class BM25SparseEmbeddings(SparseEmbeddings):
+    """
+    BM25 term weights as Qdrant sparse vectors.
+
+    Documents carry the BM25 term-frequency component; the collection's sparse vector is
+    created with the IDF modifier so Qdrant applies inverse document frequency at query
+    time. Queries weight each distinct term equally.
+    """
+
+    def __init__(self, k1=1.2, b=0.75, avg_doc_length=200):
+        self.k1 = k1
+        self.b = b
+        self.avg_doc_length = avg_doc_length
+
+    def _document_vector(self, text):
+        tokens = tokenize(text)
+        length_norm = self.k1 * (1 - self.b + self.b * len(tokens) / self.avg_doc_length)
+        weights = {}
+        for term, tf in Counter(tokens).items():
+            index = term_index(term)
+            weights[index] = weights.get(index, 0.0) + tf * (self.k1 + 1) / (tf + length_norm)
+        return SparseVector(indices=list(weights), values=list(weights.values()))
+
+    def embed_documents(self, texts):
+        return [self._document_vector(text) for text in texts]
+
+    def embed_query(self, text):
+        indices = sorted({term_index(term) for term in tokenize(text)})
+        return SparseVector(indices=indices, values=[1.0] * len(indices))
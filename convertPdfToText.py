@@ -1,6 +1,21 @@
 import os
+import json
+import shutil
+import hashlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from PyPDF2 import PdfReader
 
+# Manifests live outside the text directory, which must only hold extracted resumes
+MANIFEST_DIR = os.path.join('.cache', 'manifests')
+
+
+def manifest_path_for(output_dir, manifest_dir=MANIFEST_DIR):
+    """
+    Returns the manifest file used for text files extracted into output_dir.
+    """
+    digest = hashlib.sha256(os.path.abspath(output_dir).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(manifest_dir, f"{os.path.basename(os.path.normpath(output_dir))}.{digest}.json")
+
 
 def get_resume_paths(base_dir):
     """
@@ -56,28 +71,197 @@ def save_text_to_file(text, output_path):
         print(f"Error saving text to {output_path}: {e}")
 
 
-def process_resumes(input_dir, output_dir):
+def file_sha256(file_path, chunk_size=1 << 20):
+    """
+    Compute the SHA-256 digest of a file's contents.
+
+    Args:
+        file_path (str): Path to the file.
+        chunk_size (int): Number of bytes read per chunk.
+
+    Returns:
+        str: Hex digest of the file contents.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_manifest(manifest_path):
+    """
+    Load the extraction manifest mapping PDF paths to their last extracted state.
+
+    Args:
+        manifest_path (str): Path to the manifest JSON file.
+
+    Returns:
+        dict: Manifest entries keyed by PDF path, or an empty dict if none exists.
+    """
+    if not os.path.exists(manifest_path):
+        return {}
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Error reading manifest {manifest_path}, re-extracting everything: {e}")
+        return {}
+
+
+def save_manifest(manifest, manifest_path):
+    """
+    Atomically write the extraction manifest to disk.
+
+    Args:
+        manifest (dict): Manifest entries keyed by PDF path.
+        manifest_path (str): Destination path for the manifest JSON file.
+    """
+    os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+    tmp_path = manifest_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+
+def extract_and_save(resume_path, output_file):
     """
-    Process all PDF resumes: Extract text and save it to text files.
+    Extract text from a single PDF and save it. Runs inside pool workers.
+
+    Args:
+        resume_path (str): Path to the PDF file.
+        output_file (str): Destination path for the text file.
+
+    Returns:
+        bool: True if text was extracted and saved.
+    """
+    text = extract_text_from_pdf(resume_path)
+    if not text:
+        return False
+    save_text_to_file(text, output_file)
+    return True
+
+
+def plan_extraction(resume_paths, output_dir, manifest):
+    """
+    Split resumes into files that need extraction and files that are unchanged.
+
+    A PDF is unchanged when its size and mtime match the manifest. When only the
+    mtime differs, the content hash decides. PDFs whose content was already
+    extracted under another name are copied instead of re-parsed.
+
+    Args:
+        resume_paths (list): Paths to PDF resume files.
+        output_dir (str): Directory where text files are stored.
+        manifest (dict): Manifest entries from the previous run.
+
+    Returns:
+        tuple: (to_extract, to_copy, unchanged) where to_extract is a list of
+        (pdf_path, output_file, entry) tuples, to_copy a list of
+        (source_txt, output_file, pdf_path, entry) tuples and unchanged a count.
+    """
+    known_outputs = {
+        entry['sha256']: entry['output']
+        for entry in manifest.values()
+        if entry.get('sha256') and entry.get('output')
+    }
+    to_extract, to_copy, unchanged = [], [], 0
+
+    for resume_path in resume_paths:
+        output_file = os.path.join(output_dir, os.path.basename(resume_path).replace('.pdf', '.txt'))
+        stat = os.stat(resume_path)
+        previous = manifest.get(resume_path)
+        entry = {'size': stat.st_size, 'mtime': stat.st_mtime, 'output': output_file}
+
+        if (previous and previous.get('size') == stat.st_size and previous.get('mtime') == stat.st_mtime
+                and os.path.exists(previous.get('output', ''))):
+            unchanged += 1
+            continue
+
+        entry['sha256'] = file_sha256(resume_path)
+        if previous and previous.get('sha256') == entry['sha256'] and os.path.exists(output_file):
+            # Touched but not modified: refresh the manifest entry only
+            manifest[resume_path] = entry
+            unchanged += 1
+            continue
+
+        source_txt = known_outputs.get(entry['sha256'])
+        if source_txt and os.path.exists(source_txt):
+            to_copy.append((source_txt, output_file, resume_path, entry))
+        else:
+            to_extract.append((resume_path, output_file, entry))
+
+    return to_extract, to_copy, unchanged
+
+
+def process_resumes(input_dir, output_dir, workers=None, manifest_path=None):
+    """
+    Process PDF resumes: Extract text and save it to text files.
+
+    Only new or changed PDFs are extracted; unchanged files are skipped using a
+    size/mtime/content-hash manifest kept under .cache/manifests.
 
     Args:
         input_dir (str): Directory containing PDF resumes.
         output_dir (str): Directory to save extracted text files.
+        workers (int, optional): Number of worker processes. Defaults to the CPU count;
+            use 1 to extract in the current process.
+        manifest_path (str, optional): Path to the manifest file. Defaults to
+            manifest_path_for(output_dir).
     """
     resume_paths = get_resume_paths(input_dir)
     if not resume_paths:
         print("No PDF files found in the input directory.")
         return
 
-    for resume_path in resume_paths:
-        text = extract_text_from_pdf(resume_path)
-        if text:
-            output_file = os.path.join(output_dir, os.path.basename(resume_path).replace('.pdf', '.txt'))
-            save_text_to_file(text, output_file)
-    print(f"Processed {len(resume_paths)} resumes. Extracted text files are stored in {output_dir}")
+    manifest_path = manifest_path or manifest_path_for(output_dir)
+    manifest = load_manifest(manifest_path)
+    to_extract, to_copy, unchanged = plan_extraction(resume_paths, output_dir, manifest)
+
+    for source_txt, output_file, resume_path, entry in to_copy:
+        try:
+            if os.path.abspath(source_txt) != os.path.abspath(output_file):
+                os.makedirs(os.path.dirname(output_file), exist_ok=True)
+                shutil.copyfile(source_txt, output_file)
+            manifest[resume_path] = entry
+        except Exception as e:
+            print(f"Error copying {source_txt} to {output_file}: {e}")
+
+    extracted = 0
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(to_extract) <= 1:
+        for resume_path, output_file, entry in to_extract:
+            if extract_and_save(resume_path, output_file):
+                manifest[resume_path] = entry
+                extracted += 1
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(extract_and_save, resume_path, output_file): (resume_path, entry)
+                for resume_path, output_file, entry in to_extract
+            }
+            for future in as_completed(futures):
+                resume_path, entry = futures[future]
+                try:
+                    if future.result():
+                        manifest[resume_path] = entry
+                        extracted += 1
+                except Exception as e:
+                    print(f"Error extracting text from {resume_path}: {e}")
+
+    # Drop entries for PDFs that no longer exist in the input directory
+    current = set(resume_paths)
+    for stale in [path for path in manifest if path.startswith(input_dir) and path not in current]:
+        del manifest[stale]
+
+    save_manifest(manifest, manifest_path)
+    print(
+        f"Processed {len(resume_paths)} resumes ({extracted} extracted, {len(to_copy)} copied from duplicates, "
+        f"{unchanged} unchanged). Extracted text files are stored in {output_dir}"
+    )
 
 
 if __name__ == '__main__':
     input_directory = os.path.join(os.getcwd(), 'data/data')
     output_directory = os.path.join(os.getcwd(), 'data/resume_text')
-    process_resumes(input_directory, output_directory)
+    process_resumes(input_directory, output_directory, workers=os.cpu_count())
@@ -0,0 +1,263 @@
+import os
+import re
+import zlib
+import sqlite3
+import hashlib
+import threading
+import numpy as np
+
+DEFAULT_INDEX_PATH = os.path.join('.cache', 'dedup_index.sqlite')
+
+# MinHash signature length and LSH banding: 16 bands of 8 rows make texts with a
+# Jaccard similarity above ~0.7 likely to share a bucket
+NUM_PERMUTATIONS = 128
+LSH_BANDS = 16
+SHINGLE_SIZE = 5
+
+# Estimated Jaccard similarity of word shingles at which a text counts as a duplicate
+DUPLICATE_THRESHOLD = 0.85
+
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+_rng = np.random.RandomState(1)
+# a * h stays below 2**63 for 32-bit h, so the products never overflow uint64
+_PERM_A = _rng.randint(1, 1 << 31, size=NUM_PERMUTATIONS, dtype=np.int64).astype(np.uint64)
+_PERM_B = _rng.randint(0, 1 << 31, size=NUM_PERMUTATIONS, dtype=np.int64).astype(np.uint64)
+
+WORD = re.compile(r'\w+')
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """
+    Returns the set of 32-bit hashes of the word n-grams of a normalized text.
+    Case, punctuation and whitespace differences do not change the result.
+    """
+    words = WORD.findall(text.lower())
+    if len(words) < size:
+        return {zlib.crc32(' '.join(words).encode('utf-8'))} if words else set()
+    return {zlib.crc32(' '.join(words[i:i + size]).encode('utf-8')) for i in range(len(words) - size + 1)}
+
+
+def minhash_signature(text):
+    """
+    Computes the MinHash signature of a text's shingles.
+
+    Args:
+        text (str): The resume text.
+
+    Returns:
+        numpy.ndarray: NUM_PERMUTATIONS uint32 values.
+    """
+    hashes = np.fromiter(shingles(text), dtype=np.uint64)
+    if hashes.size == 0:
+        return np.full(NUM_PERMUTATIONS, MAX_HASH, dtype=np.uint32)
+    permuted = (np.outer(hashes, _PERM_A) + _PERM_B) % MERSENNE_PRIME & MAX_HASH
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def estimated_similarity(signature, other):
+    """
+    Estimates the Jaccard similarity of two texts from their MinHash signatures.
+    """
+    return float(np.mean(signature == other))
+
+
+def band_keys(signature, bands=LSH_BANDS):
+    """
+    Returns one bucket key per LSH band of a signature.
+    """
+    rows = len(signature) // bands
+    return [hashlib.blake2b(signature[i * rows:(i + 1) * rows].tobytes(), digest_size=8).hexdigest()
+            for i in range(bands)]
+
+
+class SignatureIndex:
+    """
+    Persistent MinHash LSH index of resume texts.
+
+    Every source is stored with its content hash, signature and the canonical source it
+    duplicates (itself for unique texts). Band buckets are indexed in SQLite, so texts
+    added later are checked against everything seen before without rescanning it.
+    """
+
+    def __init__(self, path=DEFAULT_INDEX_PATH, threshold=DUPLICATE_THRESHOLD):
+        self.path = path
+        self.threshold = threshold
+        self._lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS signatures ('
+            'source TEXT PRIMARY KEY, sha256 TEXT NOT NULL, signature BLOB NOT NULL, canonical TEXT NOT NULL)'
+        )
+        self._conn.execute('CREATE TABLE IF NOT EXISTS bands (bucket TEXT NOT NULL, source TEXT NOT NULL)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS bands_bucket ON bands (bucket)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS bands_source ON bands (source)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS signatures_canonical ON signatures (canonical)')
+
+    def sha256(self, source):
+        """
+        Returns the content hash stored for source, or None if it is not indexed.
+        """
+        with self._lock:
+            row = self._conn.execute('SELECT sha256 FROM signatures WHERE source = ?', (source,)).fetchone()
+        return row[0] if row else None
+
+    def canonical(self, source):
+        """
+        Returns the canonical source of an indexed source, or None if it is not indexed.
+        """
+        with self._lock:
+            row = self._conn.execute('SELECT canonical FROM signatures WHERE source = ?', (source,)).fetchone()
+        return row[0] if row else None
+
+    def find_canonical(self, signature):
+        """
+        Returns (canonical source, similarity) of the most similar indexed unique text
+        above the threshold, or (None, 0.0).
+        """
+        keys = band_keys(signature)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT DISTINCT s.source, s.signature FROM bands b JOIN signatures s ON s.source = b.source "
+                f"WHERE b.bucket IN ({','.join('?' * len(keys))}) AND s.canonical = s.source",
+                keys,
+            ).fetchall()
+        best, best_similarity = None, 0.0
+        for source, blob in rows:
+            similarity = estimated_similarity(signature, np.frombuffer(blob, dtype=np.uint32))
+            if similarity >= self.threshold and similarity > best_similarity:
+                best, best_similarity = source, similarity
+        return best, best_similarity
+
+    def add(self, source, text, sha256=None):
+        """
+        Indexes a text, linking it to the canonical text it duplicates if there is one.
+
+        Args:
+            source (str): Identifier of the text, e.g. its file name.
+            text (str): The resume text.
+            sha256 (str, optional): Content hash; computed from text when omitted.
+
+        Returns:
+            str: The canonical source, which is source itself for a unique text.
+        """
+        sha256 = sha256 or hashlib.sha256(text.encode('utf-8')).hexdigest()
+        signature = minhash_signature(text)
+        self.remove(source)
+        canonical, _ = self.find_canonical(signature)
+        canonical = canonical or source
+        with self._lock:
+            self._conn.execute('BEGIN')
+            self._conn.execute(
+                'INSERT INTO signatures (source, sha256, signature, canonical) VALUES (?, ?, ?, ?)',
+                (source, sha256, signature.tobytes(), canonical),
+            )
+            # Only unique texts are bucketed; duplicates are found through their canonical
+            if canonical == source:
+                self._conn.executemany(
+                    'INSERT INTO bands (bucket, source) VALUES (?, ?)', [(key, source) for key in band_keys(signature)]
+                )
+            self._conn.execute('COMMIT')
+        return canonical
+
+    def remove(self, source):
+        """
+        Drops a source from the index. Returns the sources that were linked to it as duplicates,
+        which need to be added again to pick a new canonical.
+        """
+        with self._lock:
+            orphans = [row[0] for row in self._conn.execute(
+                'SELECT source FROM signatures WHERE canonical = ? AND source != ?', (source, source)
+            )]
+            self._conn.execute('BEGIN')
+            self._conn.execute('DELETE FROM signatures WHERE source = ?', (source,))
+            self._conn.execute('DELETE FROM bands WHERE source = ?', (source,))
+            self._conn.execute('COMMIT')
+        return orphans
+
+    def sources(self):
+        with self._lock:
+            return [row[0] for row in self._conn.execute('SELECT source FROM signatures')]
+
+    def duplicates(self):
+        """
+        Returns a dict mapping every duplicate source to its canonical source.
+        """
+        with self._lock:
+            return dict(self._conn.execute('SELECT source, canonical FROM signatures WHERE canonical != source'))
+
+    def duplicates_of(self, canonical):
+        """
+        Returns the sources linked to a canonical source.
+        """
+        with self._lock:
+            return [row[0] for row in self._conn.execute(
+                'SELECT source FROM signatures WHERE canonical = ? AND source != ?', (canonical, canonical)
+            )]
+
+    def close(self):
+        self._conn.close()
+
+
+def deduplicate_texts(text_dir, index_path=DEFAULT_INDEX_PATH, threshold=DUPLICATE_THRESHOLD):
+    """
+    Updates the signature index with the .txt files of a directory and returns the duplicates.
+
+    Only new or changed files are signed; files that disappeared are dropped from the index
+    and their duplicates are linked to a new canonical.
+
+    Args:
+        text_dir (str): Directory of extracted resume texts (output of convertPdfToText.py).
+        index_path (str): Path to the SQLite signature index.
+        threshold (float): Estimated Jaccard similarity at which texts count as duplicates.
+
+    Returns:
+        dict: File name of every duplicate mapped to the file name of its canonical text.
+    """
+    index = SignatureIndex(index_path, threshold=threshold)
+    try:
+        names = sorted(name for name in os.listdir(text_dir) if name.endswith('.txt'))
+        current = set(names)
+        pending = []
+        for stale in [source for source in index.sources() if source not in current]:
+            pending.extend(index.remove(stale))
+
+        added = 0
+        for name in names:
+            try:
+                with open(os.path.join(text_dir, name), 'r', encoding='utf-8') as f:
+                    text = f.read()
+            except Exception as e:
+                print(f"Error reading {name}: {e}")
+                continue
+            sha256 = hashlib.sha256(text.encode('utf-8')).hexdigest()
+            if index.sha256(name) == sha256:
+                continue
+            # A changed canonical text may no longer match its duplicates
+            pending.extend(index.remove(name))
+            index.add(name, text, sha256)
+            added += 1
+
+        # Duplicates whose canonical was removed or changed: check them against the updated
+        # index, since a changed canonical keeps its name but may no longer match them
+        for name in dict.fromkeys(pending):
+            if name in current:
+                with open(os.path.join(text_dir, name), 'r', encoding='utf-8') as f:
+                    index.add(name, f.read())
+                added += 1
+
+        duplicates = index.duplicates()
+        print(f"Indexed {added} new or changed texts; {len(duplicates)} of {len(names)} are near-duplicates.")
+        return duplicates
+    finally:
+        index.close()
+
+
+if __name__ == '__main__':
+    text_directory = os.path.join(os.getcwd(), 'data/resume_text')
+    deduplicate_texts(text_directory)
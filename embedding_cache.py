@@ -0,0 +1,215 @@
+import os
+import sqlite3
+import hashlib
+import threading
+import logging
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_ollama import OllamaEmbeddings
+from instrumentation import stage_timer
+
+DEFAULT_CACHE_DIR = os.path.join('.cache', 'embeddings')
+DEFAULT_DIMENSION = 3072
+DEFAULT_BATCH_SIZE = 32
+
+
+def text_hash(model_name, text):
+    """
+    Returns the content hash identifying the embedding of text under a model.
+    """
+    return hashlib.sha256(f"{model_name}\x00{text}".encode('utf-8')).hexdigest()
+
+
+def model_cache_dir(model_name, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Returns the directory holding the cached embeddings of a model.
+    """
+    return os.path.join(cache_dir, model_name.replace(':', '_'))
+
+
+def load_cached_vectors(cache_dir):
+    """
+    Returns a read-only memory map of every vector in an embedding cache directory,
+    without creating or extending any file.
+
+    Raises:
+        FileNotFoundError: If cache_dir holds no embedding cache.
+    """
+    index_path = os.path.join(cache_dir, 'index.sqlite')
+    vectors_path = os.path.join(cache_dir, 'vectors.f32')
+    if not (os.path.exists(index_path) and os.path.exists(vectors_path)):
+        raise FileNotFoundError(f"No embedding cache in {cache_dir}.")
+    conn = sqlite3.connect(f"file:{index_path}?mode=ro", uri=True)
+    try:
+        dimension = conn.execute("SELECT value FROM meta WHERE name = 'dimension'").fetchone()[0]
+        size = conn.execute('SELECT COUNT(*) FROM vectors').fetchone()[0]
+    finally:
+        conn.close()
+    if size == 0:
+        return np.zeros((0, dimension), dtype=np.float32)
+    # Rows are assigned in insertion order, so the first size rows are the stored vectors
+    return np.memmap(vectors_path, dtype=np.float32, mode='r', shape=(size, dimension))
+
+
+class EmbeddingCache:
+    """
+    Stores embedding vectors by content hash in a float32 memory-mapped matrix.
+
+    Vectors live in <cache_dir>/vectors.f32 (one row per vector) and a small SQLite
+    index maps each content hash to its row. The matrix grows by doubling its capacity.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, dimension=DEFAULT_DIMENSION, initial_capacity=1024):
+        self.cache_dir = cache_dir
+        self.dimension = dimension
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self._conn = sqlite3.connect(os.path.join(cache_dir, 'index.sqlite'), check_same_thread=False)
+        self._conn.execute('CREATE TABLE IF NOT EXISTS vectors (hash TEXT PRIMARY KEY, row INTEGER NOT NULL)')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+        stored = self._conn.execute("SELECT value FROM meta WHERE name = 'dimension'").fetchone()
+        if stored and stored[0] != dimension:
+            raise ValueError(f"Embedding cache in {cache_dir} holds {stored[0]}-d vectors, not {dimension}-d.")
+        self._conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('dimension', ?)", (dimension,))
+        self._conn.commit()
+        self._size = self._conn.execute('SELECT COUNT(*) FROM vectors').fetchone()[0]
+
+        self._vectors_path = os.path.join(cache_dir, 'vectors.f32')
+        row_bytes = dimension * np.dtype(np.float32).itemsize
+        existing_rows = os.path.getsize(self._vectors_path) // row_bytes if os.path.exists(self._vectors_path) else 0
+        self._map(max(existing_rows, initial_capacity, self._size))
+
+    def _map(self, capacity):
+        row_bytes = self.dimension * np.dtype(np.float32).itemsize
+        with open(self._vectors_path, 'ab') as f:
+            if f.tell() < capacity * row_bytes:
+                f.truncate(capacity * row_bytes)
+        self._capacity = capacity
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode='r+', shape=(capacity, self.dimension))
+
+    def __len__(self):
+        return self._size
+
+    def get_many(self, hashes):
+        """
+        Looks up vectors by content hash.
+
+        Args:
+            hashes (list): Content hashes to look up.
+
+        Returns:
+            dict: Mapping of the hashes that were found to their float32 vectors.
+        """
+        found = {}
+        with self._lock:
+            for start in range(0, len(hashes), 500):
+                chunk = hashes[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self._conn.execute(
+                    f'SELECT hash, row FROM vectors WHERE hash IN ({placeholders})', chunk
+                ).fetchall()
+                for digest, row in rows:
+                    found[digest] = np.array(self._vectors[row])
+            self.hits += len(found)
+            self.misses += len(set(hashes)) - len(found)
+        return found
+
+    def put_many(self, hashes, vectors):
+        """
+        Stores vectors under their content hashes.
+
+        Args:
+            hashes (list): Content hashes.
+            vectors (list): Vectors matching hashes, each of length dimension.
+        """
+        with self._lock:
+            new_rows = {}
+            for digest, vector in zip(hashes, vectors):
+                row = new_rows.get(digest)
+                if row is None:
+                    existing = self._conn.execute('SELECT row FROM vectors WHERE hash = ?', (digest,)).fetchone()
+                    row = existing[0] if existing else None
+                if row is None:
+                    if self._size >= self._capacity:
+                        self._vectors.flush()
+                        self._map(self._capacity * 2)
+                    row = self._size
+                    self._size += 1
+                    new_rows[digest] = row
+                self._vectors[row] = np.asarray(vector, dtype=np.float32)
+            self._vectors.flush()
+            self._conn.executemany('INSERT INTO vectors (hash, row) VALUES (?, ?)', list(new_rows.items()))
+            self._conn.commit()
+
+    def matrix(self):
+        """
+        Returns a read-only view of all stored vectors, one per row.
+        """
+        return self._vectors[:self._size]
+
+    def stats(self):
+        """
+        Returns hit/miss counters and the number of stored vectors.
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'vectors': self._size}
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that batches embed_documents calls and caches the vectors.
+
+    Documents whose content hash is already cached are never sent to the model;
+    the remaining unique texts are embedded in fixed-size batches.
+    """
+
+    def __init__(self, embeddings, cache, model_name, batch_size=DEFAULT_BATCH_SIZE):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.model_name = model_name
+        self.batch_size = batch_size
+
+    def embed_documents(self, texts):
+        hashes = [text_hash(self.model_name, text) for text in texts]
+        vectors = self.cache.get_many(hashes)
+
+        missing = {}
+        for digest, text in zip(hashes, texts):
+            if digest not in vectors and digest not in missing:
+                missing[digest] = text
+
+        pending = list(missing.items())
+        for start in range(0, len(pending), self.batch_size):
+            batch = pending[start:start + self.batch_size]
+            with stage_timer('document_embedding'):
+                embedded = self.embeddings.embed_documents([text for _, text in batch])
+            batch_hashes = [digest for digest, _ in batch]
+            self.cache.put_many(batch_hashes, embedded)
+            vectors.update(zip(batch_hashes, (np.asarray(v, dtype=np.float32) for v in embedded)))
+
+        if pending:
+            logging.info(f"Embedded {len(pending)} new documents, {len(texts) - len(pending)} served from cache")
+        return [vectors[digest].tolist() for digest in hashes]
+
+    def embed_query(self, text):
+        return self.embeddings.embed_query(text)
+
+
+def cached_ollama_embeddings(model_name, cache_dir=DEFAULT_CACHE_DIR, batch_size=DEFAULT_BATCH_SIZE,
+                             dimension=DEFAULT_DIMENSION):
+    """
+    Builds Ollama embeddings backed by the shared on-disk embedding cache.
+
+    Args:
+        model_name (str): Name of the Ollama embedding model.
+        cache_dir (str): Directory of the embedding cache.
+        batch_size (int): Number of texts sent per embed_documents call.
+        dimension (int): Dimension of the model's vectors.
+
+    Returns:
+        CachedEmbeddings: Embeddings usable anywhere a langchain Embeddings is expected.
+    """
+    cache = EmbeddingCache(model_cache_dir(model_name, cache_dir), dimension=dimension)
+    return CachedEmbeddings(OllamaEmbeddings(model=model_name), cache, model_name, batch_size=batch_size)
@@ -1,88 +1,400 @@
 import os
 import json
 import random
+import asyncio
 import logging 
 from langchain_ollama.llms import OllamaLLM
-from langdetect import detect 
 from format import resume_format 
+from llm_cache import LLMCache, cache_key, model_name_of
+from dedup import deduplicate_texts
+from ingestion import SOURCE_FIELD
+from language_routing import (
+    detect_language, needs_translation, translate_text, atranslate_text, DETECTION_CACHE_NAMESPACE,
+)
+from instrumentation import (
+    stage_timer, stage_summary, start_metrics_server_from_env, LLMMetricsCallback, QUEUE_DEPTH,
+)
+from structured_output import (
+    StructuredOutputError, StructuredOutputStats, invoke_structured, ainvoke_structured, schema_for_template,
+)
 
 def load_resumes(file_dir, sample_size):
     """
     Loads random sample size resumes from given directory and returns them as a list
     """
+    return [record['text'] for record in load_resume_records(file_dir, sample_size)]
+
+def load_resume_records(file_dir, sample_size=None, seed=None, exclude=None):
+    """
+    Loads resumes from given directory together with their ordering metadata.
+
+    Args:
+    - file_dir: Directory containing the resume text files; only *.txt files are loaded.
+    - sample_size: Number of resumes to sample at random, or None for all of them.
+    - seed: Seed for the sample, so an interrupted run picks the same resumes again.
+    - exclude: File names to leave out before sampling, e.g. near-duplicates from dedup.py.
+
+    Returns:
+    - list: Dicts with "index", "source" and "text" keys.
+    """
     try:
-        file_paths = os.listdir(file_dir)
+        file_paths = sorted(
+            path for path in os.listdir(file_dir) if path.endswith('.txt') and path not in (exclude or ())
+        )
         if not file_paths:
             raise FileNotFoundError("No files found in the directory.")
 
-        sample_size = min(sample_size, len(file_paths))
-        random_sample = random.sample(file_paths, sample_size)
+        if sample_size is not None:
+            sample_size = min(sample_size, len(file_paths))
+            file_paths = random.Random(seed).sample(file_paths, sample_size)
 
-        resumes = []
-        for path in random_sample:
+        records = []
+        for index, path in enumerate(file_paths):
             abs_path = os.path.join(file_dir, path)
             with open(abs_path, 'r', encoding='utf-8') as f:
-                resumes.append(f.read())
+                records.append({'index': index, 'source': path, 'text': f.read()})
 
-        return resumes
+        return records
     except Exception as e:
         raise Exception(f"Error loading resumes: {e}")
 
-def extract_resume_data(model, resumes, resume_format):
+def build_resume_prompt(resume, resume_format):
     """
-    Extracts structured data from resumes using llm model 
+    Builds the structuring prompt for a single resume.
     """
-    extracted_data = []
-
-    for resume in resumes:
-        try:
-            detected_language = detect(resume)
-             # Detect the language of the resume text
-            logging.info(f"Detected language: {detected_language}")
-            if detected_language != 'en':
-                resume = convert_to_english(resume, detected_language = detected_language, model = model)
-            prompt = f"""
+    return f"""
             Please provide the output strictly in JSON format without any additional comments or explanations.
             From the given resume, extract the information in JSON format.
             If there are no field values, leave it empty.
             The given resume is {resume}.
             The response format is {resume_format}.
             """
-            result = model.invoke(prompt)
-            structured_result = json.loads(result.replace('\n', ''))
+
+def extract_resume_data(model, resumes, resume_format, cache=None, structured_stats=None):
+    """
+    Extracts structured data from resumes using llm model 
+    Results are looked up in and stored to the optional LLMCache.
+    Outcomes of the structured generations are counted in the optional structured_stats.
+    """
+    extracted_data = []
+
+    for resume in resumes:
+        try:
+            key = cache_key(model_name_of(model), resume_format, resume) if cache else None
+            cached = cache.get(key) if cache else None
+            if cached is not None:
+                extracted_data.append(json.loads(cached))
+                continue
+            # Detect the language of the resume text on a bounded sample
+            detected_language = detect_language(resume, cache=cache)
+            logging.info(f"Detected language: {detected_language}")
+            if needs_translation(detected_language):
+                resume = convert_to_english(resume, detected_language = detected_language, model = model, cache = cache)
+            prompt = build_resume_prompt(resume, resume_format)
+            structured_result = invoke_structured(
+                model, prompt, schema_for_template(resume_format), stats=structured_stats
+            )
+            if cache:
+                cache.put(key, json.dumps(structured_result))
             extracted_data.append(structured_result)
-        except json.JSONDecodeError as jde:
-            print(f"JSON decoding error for resume: {resume[:50]}... Error: {jde}")
+        except StructuredOutputError as soe:
+            print(f"JSON decoding error for resume: {resume[:50]}... Error: {soe}")
         except Exception as e:
             print(f"Error processing resume: {resume[:50]}... Error: {e}")
 
     return extracted_data
 
+async def astructure_resume(model, resume, resume_format, max_retries=3, backoff=1.0, cache=None, structured_stats=None,
+                            language=None, translated=None):
+    """
+    Structures a single resume without blocking the event loop, retrying failed calls.
+
+    Args:
+    - model: The language model used for translation and extraction.
+    - resume: The resume text.
+    - resume_format: The JSON template the model should follow.
+    - max_retries: Number of additional attempts after the first failure.
+    - backoff: Base delay in seconds; doubled after every failed attempt.
+    - cache: Optional LLMCache; a hit skips translation and extraction (attempts is 0).
+    - structured_stats: Optional StructuredOutputStats. Unusable JSON gets one targeted retry from the
+      structured output layer and is not retried again here.
+    - language: Language detected by the routing stage; detected here when omitted.
+    - translated: English translation from the translation queue; translated here when omitted.
+
+    Returns:
+    - tuple: (structured_result, attempts)
+    """
+    key = cache_key(model_name_of(model), resume_format, resume) if cache else None
+    cached = cache.get(key) if cache else None
+    if cached is not None:
+        return json.loads(cached), 0
+
+    if language is None:
+        language = await asyncio.to_thread(detect_language, resume, cache)
+        logging.info(f"Detected language: {language}")
+
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            text = resume if translated is None else translated
+            if translated is None and needs_translation(language):
+                text = await aconvert_to_english(resume, language, model, cache=cache)
+            structured_result = await ainvoke_structured(
+                model, build_resume_prompt(text, resume_format), schema_for_template(resume_format), stats=structured_stats
+            )
+            if cache:
+                cache.put(key, json.dumps(structured_result))
+            return structured_result, attempt
+        except StructuredOutputError:
+            raise
+        except Exception as e:
+            if attempt > max_retries:
+                raise
+            delay = backoff * (2 ** (attempt - 1))
+            logging.warning(f"Attempt {attempt} failed ({e}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+def read_result_states(output_file):
+    """
+    Returns the latest state of every source in a JSON Lines results file: ("data", None)
+    once it was structured, or ("duplicate_of", canonical source) once it was linked as a
+    near-duplicate. The last such line of a source wins; error lines do not change its state.
+    """
+    states = {}
+    if not os.path.exists(output_file):
+        return states
+    with open(output_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A partially written last line from an interrupted run
+                continue
+            if 'data' in record:
+                states[record.get('source')] = ('data', None)
+            elif 'duplicate_of' in record:
+                states[record.get('source')] = ('duplicate_of', record['duplicate_of'])
+    return states
+
+def read_completed_sources(output_file):
+    """
+    Returns the sources whose latest line in a JSON Lines results file is a structured result.
+    """
+    return {source for source, (state, _) in read_result_states(output_file).items() if state == 'data'}
+
+def write_duplicate_links(output_file, duplicates):
+    """
+    Appends a {"source", "duplicate_of"} line to a JSON Lines results file for every
+    near-duplicate whose latest line does not already link it to the same canonical.
+
+    Args:
+    - output_file: JSON Lines results file of extract_resume_data_concurrent.
+    - duplicates: File name of every duplicate mapped to its canonical, from dedup.deduplicate_texts.
+
+    Returns:
+    - int: Number of links written.
+    """
+    states = read_result_states(output_file)
+    written = 0
+    with open(output_file, 'a', encoding='utf-8') as out:
+        for source, canonical in sorted(duplicates.items()):
+            if states.get(source) != ('duplicate_of', canonical):
+                out.write(json.dumps({'source': source, 'duplicate_of': canonical}) + '\n')
+                written += 1
+    return written
+
+async def extract_resume_data_concurrent(model, records, resume_format, output_file,
+                                         max_concurrency=4, max_retries=3, backoff=1.0, cache=None, structured_stats=None,
+                                         translation_concurrency=2):
+    """
+    Extracts structured data from resumes with a bounded number of LLM requests in flight.
+
+    A routing stage detects each resume's language on a bounded sample. English resumes go
+    straight to the structuring workers; other resumes first pass through a separate queue
+    of translation workers, so slow translations do not hold up the English ones.
+    Results are appended to a JSON Lines file as soon as each resume finishes, so memory
+    use does not grow with the corpus and an interrupted run can be resumed: resumes whose
+    source already has a result in output_file are skipped. Ollama only serves requests in
+    parallel up to its OLLAMA_NUM_PARALLEL setting.
+
+    Args:
+    - model: The language model used for translation and extraction.
+    - records: Iterable of dicts with "index", "source" and "text" keys.
+    - resume_format: The JSON template the model should follow.
+    - output_file: JSON Lines file the results are appended to.
+    - max_concurrency: Number of resumes processed at the same time.
+    - max_retries: Number of retries per resume before it is recorded as failed.
+    - backoff: Base delay in seconds for exponential backoff between retries.
+    - cache: Optional LLMCache shared by all workers.
+    - structured_stats: Optional StructuredOutputStats shared by all workers.
+    - translation_concurrency: Number of non-English resumes translated at the same time.
+
+    Returns:
+    - dict: Counts of "succeeded", "failed", "skipped" and "translated" resumes.
+    """
+    completed = read_completed_sources(output_file)
+    stats = {'succeeded': 0, 'failed': 0, 'skipped': 0, 'translated': 0}
+    queue = asyncio.Queue(maxsize=max_concurrency * 2)
+    translation_queue = asyncio.Queue(maxsize=translation_concurrency * 2)
+
+    async def producer():
+        for record in records:
+            if record.get('source') in completed:
+                stats['skipped'] += 1
+                continue
+            key = cache_key(model_name_of(model), resume_format, record['text']) if cache else None
+            if cache and cache.contains(key):
+                # Already structured: no language routing needed
+                await queue.put(record)
+                QUEUE_DEPTH.labels('resume_extraction').set(queue.qsize())
+                continue
+            record['language'] = await asyncio.to_thread(detect_language, record['text'], cache)
+            if needs_translation(record['language']):
+                await translation_queue.put(record)
+                QUEUE_DEPTH.labels('translation').set(translation_queue.qsize())
+            else:
+                await queue.put(record)
+                QUEUE_DEPTH.labels('resume_extraction').set(queue.qsize())
+        for _ in range(translation_concurrency):
+            await translation_queue.put(None)
+
+    async def route():
+        # Structuring workers stop once both the producer and the translators are done
+        await asyncio.gather(producer(), *(translator() for _ in range(translation_concurrency)))
+        for _ in range(max_concurrency):
+            await queue.put(None)
+
+    with open(output_file, 'a', encoding='utf-8') as out:
+        def write_line(line):
+            out.write(json.dumps(line) + '\n')
+            out.flush()
+
+        async def translator():
+            while True:
+                record = await translation_queue.get()
+                QUEUE_DEPTH.labels('translation').set(translation_queue.qsize())
+                if record is None:
+                    return
+                for attempt in range(1, max_retries + 2):
+                    try:
+                        record['translated'] = await aconvert_to_english(
+                            record['text'], record['language'], model, cache=cache
+                        )
+                        stats['translated'] += 1
+                        break
+                    except Exception as e:
+                        if attempt > max_retries:
+                            stats['failed'] += 1
+                            logging.error(f"Error translating resume {record.get('source')}: {e}")
+                            write_line({
+                                'index': record['index'], 'source': record.get('source'),
+                                'language': record['language'], 'error': f"Translation failed: {e}",
+                            })
+                            record = None
+                            break
+                        await asyncio.sleep(backoff * (2 ** (attempt - 1)))
+                if record is not None:
+                    await queue.put(record)
+                    QUEUE_DEPTH.labels('resume_extraction').set(queue.qsize())
+
+        async def worker():
+            while True:
+                record = await queue.get()
+                QUEUE_DEPTH.labels('resume_extraction').set(queue.qsize())
+                if record is None:
+                    return
+                line = {'index': record['index'], 'source': record.get('source')}
+                if 'language' in record:
+                    line['language'] = record['language']
+                try:
+                    with stage_timer('resume_structuring'):
+                        line['data'], line['attempts'] = await astructure_resume(
+                            model, record['text'], resume_format, max_retries=max_retries, backoff=backoff,
+                            cache=cache, structured_stats=structured_stats,
+                            language=record.get('language'), translated=record.get('translated'),
+                        )
+                    stats['succeeded'] += 1
+                except Exception as e:
+                    line['error'] = str(e)
+                    stats['failed'] += 1
+                    logging.error(f"Error processing resume {line['source']}: {e}")
+                write_line(line)
+
+        await asyncio.gather(route(), *(worker() for _ in range(max_concurrency)))
+
+    logging.info(f"Structured resumes: {stats}")
+    if cache:
+        logging.info(f"LLM cache: {cache.stats()}")
+        logging.info(f"Language detection cache: {cache.namespace(DETECTION_CACHE_NAMESPACE).stats()}")
+    if structured_stats:
+        logging.info(f"Structured output: {structured_stats.stats()}")
+    logging.info(f"Stage timings: {stage_summary()}")
+    return stats
+
+def merge_jsonl_results(jsonl_file, output_file):
+    """
+    Collects successful results from a JSON Lines file in input order and saves them.
+    Only line offsets are kept in memory; a .jsonl output_file is written record by record.
+    Every record keeps the file it was structured from as "Source", which ingestion keys its
+    point by. Near-duplicates linked by write_duplicate_links are listed in their canonical's
+    record as "DuplicateSources".
+    """
+    offsets, links = {}, {}
+    with open(jsonl_file, 'rb') as f:
+        offset = 0
+        for line in f:
+            try:
+                record = json.loads(line) if line.strip() else {}
+            except json.JSONDecodeError:
+                record = {}
+            if 'data' in record:
+                offsets[record['source']] = (record['index'], offset)
+                links.pop(record['source'], None)
+            elif 'duplicate_of' in record:
+                links[record['source']] = record['duplicate_of']
+                offsets.pop(record['source'], None)
+            offset += len(line)
+    ordered = [(offset, source) for source, (_, offset) in sorted(offsets.items(), key=lambda item: item[1])]
+    duplicate_sources = {}
+    for source, canonical in sorted(links.items()):
+        duplicate_sources.setdefault(canonical, []).append(source)
+
+    def iter_results():
+        with open(jsonl_file, 'rb') as f:
+            for offset, source in ordered:
+                f.seek(offset)
+                data = {**json.loads(f.readline())['data'], SOURCE_FIELD: source}
+                if source in duplicate_sources:
+                    data = {**data, 'DuplicateSources': duplicate_sources[source]}
+                yield data
+
+    results = iter_results() if output_file.endswith('.jsonl') else list(iter_results())
+    save_to_json(results, output_file)
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def convert_to_english(resume_text, detected_language ,model):
+def convert_to_english(resume_text, detected_language ,model, cache=None):
     """
     Translates a resume text to English if it's not already in English.
+    The text is translated section by section; chunks are cached by content in the optional LLMCache.
     
     Args:
     - resume_text: The resume text that needs to be translated.
     - model: The language model used for translation.
+    - cache: Optional LLMCache for chunk translations.
     
     Returns:
     - str: The translated resume text in English, or the original text if it is already in English.
     """
     try:
-        if detected_language != 'en':
+        if needs_translation(detected_language):
             # If the language is not English, translate the resume to English
-            prompt = f"""
-            You are an expert in language translation.
-            The given language is {detected_language}.
-            Please translate the following resume to English:
-            {resume_text}
-            """
-            # Invoke the model to translate the resume
-            translated_resume = model.invoke(prompt).replace('\n', '')
+            translated_resume = translate_text(model, resume_text, detected_language, cache=cache)
             logging.info("Translation successful.")
             return translated_resume
         else:
@@ -93,13 +405,26 @@ def convert_to_english(resume_text, detected_language ,model):
         logging.error(f"Error during language detection or translation: {e}")
         return resume_text  # Return the original text in case of error
 
+async def aconvert_to_english(resume_text, detected_language, model, cache=None):
+    """
+    Async counterpart of convert_to_english used by the concurrent extraction path.
+    Chunks are translated concurrently. Errors are propagated so the caller can retry.
+    """
+    return await atranslate_text(model, resume_text, detected_language, cache=cache)
+
 def save_to_json(data, output_file):
     """
     Extracts data and stored in JSON file 
+    Files ending in .jsonl are written as JSON Lines, one resume per line,
+    which the ingestion scripts can stream without loading the whole file.
     """
     try:
         with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=4)
+            if output_file.endswith('.jsonl'):
+                for record in data:
+                    f.write(json.dumps(record) + '\n')
+            else:
+                json.dump(data, f, indent=4)
         print(f"Data successfully saved to {output_file}")
     except Exception as e:
         raise Exception(f"Error saving data to JSON file: {e}")
@@ -107,17 +432,31 @@ def save_to_json(data, output_file):
 
 def main():
     file_dir = os.path.join(os.getcwd(), 'data/resume_text')
+    results_file = 'resumes_results.jsonl'
     output_file = 'resumes_json.json'
     sample_size = 250
+    sample_seed = 42
+    max_concurrency = 4
 
     try:
-        model = OllamaLLM(model='llama3.2')
-        resumes = load_resumes(file_dir, sample_size)
-        extracted_data = extract_resume_data(model, resumes, resume_format = resume_format)
-        save_to_json(extracted_data, output_file)
+        model = OllamaLLM(model='llama3.2', callbacks=[LLMMetricsCallback()])
+        cache = LLMCache()
+        structured_stats = StructuredOutputStats()
+        # Near-duplicates are not structured again; their links to a canonical text are recorded
+        # in the results file and end up in the canonical's record
+        duplicates = deduplicate_texts(file_dir)
+        write_duplicate_links(results_file, duplicates)
+        records = load_resume_records(file_dir, sample_size, seed = sample_seed, exclude = duplicates)
+        asyncio.run(extract_resume_data_concurrent(
+            model, records, resume_format = resume_format,
+            output_file = results_file, max_concurrency = max_concurrency, cache = cache,
+            structured_stats = structured_stats,
+        ))
+        merge_jsonl_results(results_file, output_file)
 
     except Exception as e:
         print(f"An error occurred: {e}")
 
 if __name__ == '__main__':
+    start_metrics_server_from_env()
     main()
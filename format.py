@@ -43,7 +43,7 @@ job_description_format = """{
   "posted_date": "2025-01-06",
   "closing_date": "2025-02-01",
   "contact_email": "careers@techsolutions.com",
-  "keywords": ["Software Engineer", "Python", "Remote Work", "Full-time"],
+  "keywords": ["Software Engineer", "Python", "Remote Work", "Full-time"]
 }"""
 
 
@@ -82,6 +82,6 @@ resume_format = """
             }
           ],
           "Achievements": ["[Achievement 1]", "[Achievement 2]"],
-          "Languages": ["[Language 1]", "[Language 2]"],
+          "Languages": ["[Language 1]", "[Language 2]"]
         }
         """
\ No newline at end of file
@@ -0,0 +1,493 @@
+import os
+import json
+import uuid
+import hashlib
+import logging
+from itertools import islice
+from langchain_qdrant import QdrantVectorStore, RetrievalMode
+from qdrant_client.http.models import (
+    PointIdsList, PayloadSchemaType, SetPayload, SetPayloadOperation, ScalarQuantization, ScalarQuantizationConfig, ScalarType,
+    ProductQuantization, ProductQuantizationConfig, CompressionRatio,
+)
+from bm25_embeddings import BM25SparseEmbeddings, SPARSE_VECTOR_NAME
+from query_cache import bump_collection_version
+from instrumentation import stage_timer, DOCUMENTS
+
+# Namespace for point IDs; changing it re-keys every collection
+POINT_ID_NAMESPACE = uuid.UUID('6f1c2a8e-3b0d-5e4a-9c77-2d51f0b8a4e3')
+
+CHECKPOINT_DIR = os.path.join('.cache', 'checkpoints')
+
+# File a resume was structured from (set by extractResumeJsonFormat.py); records that have
+# one are keyed by it, so an edited resume replaces its point
+SOURCE_FIELD = 'Source'
+
+# Fields derived from other records after structuring, e.g. the near-duplicates linked to a
+# resume by extractResumeJsonFormat.py; they do not change what a record is
+DERIVED_FIELDS = ('DuplicateSources',)
+
+# Top-level payload keys ingestion writes next to the vector store's payload, to detect
+# changed records and find the points of a source
+SOURCE_PAYLOAD_KEY = 'source'
+FINGERPRINT_PAYLOAD_KEY = 'fingerprint'
+
+# Resume fields that can be used as search filters, keyed by the name used in search filters
+RESUME_FILTER_FIELDS = {
+    'skills': lambda resume: resume.get('Skills') or [],
+    'certifications': lambda resume: resume.get('Certifications') or [],
+    'languages': lambda resume: resume.get('Languages') or [],
+    'education_years': lambda resume: [edu.get('Year') for edu in resume.get('Education') or [] if isinstance(edu, dict)],
+}
+
+# Filters match a normalized copy of those fields stored under this payload key, since the
+# LLM capitalizes skills, certifications and languages inconsistently
+FILTER_PAYLOAD_KEY = 'filters'
+
+RESUME_PAYLOAD_INDEXES = {f'{FILTER_PAYLOAD_KEY}.{field}': PayloadSchemaType.KEYWORD for field in RESUME_FILTER_FIELDS}
+
+
+def normalize_filter_value(value):
+    """
+    Returns the form a filter value is stored and matched in: lowercased, with whitespace
+    collapsed. Returns None for values that cannot be filtered on.
+    """
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        return None
+    return ' '.join(str(value).lower().split()) or None
+
+
+def resume_filter_values(resume):
+    """
+    Returns the normalized values of every filter field of a resume.
+
+    Returns:
+        dict: Filter name to a sorted list of distinct normalized values.
+    """
+    values = {}
+    for field, extract in RESUME_FILTER_FIELDS.items():
+        normalized = (normalize_filter_value(value) for value in extract(resume or {}))
+        values[field] = sorted({value for value in normalized if value})
+    return values
+
+
+def resume_filter_payload(resume):
+    """
+    Returns the payload entry filters run on, for the extra_payload of sync_documents and stream_sync.
+    """
+    return {FILTER_PAYLOAD_KEY: resume_filter_values(resume)}
+
+
+def record_fingerprint(record):
+    """
+    Returns a SHA-256 digest of a record's canonical JSON form, leaving out its source and
+    DERIVED_FIELDS.
+
+    Args:
+        record (dict): A resume or job description record.
+
+    Returns:
+        str: Hex digest that only changes when the record's content changes.
+    """
+    record = {key: value for key, value in record.items() if key != SOURCE_FIELD and key not in DERIVED_FIELDS}
+    canonical = json.dumps(record, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def content_point_id(record):
+    """
+    Derives a UUIDv5 point ID from a record's content, so identical records share a point.
+    """
+    return str(uuid.uuid5(POINT_ID_NAMESPACE, record_fingerprint(record)))
+
+
+def point_id(record):
+    """
+    Derives a stable UUIDv5 point ID for a record.
+
+    Records with a source (resumes) are keyed by it, so an edited or re-extracted resume
+    upserts over its old point. Records without one (job descriptions) are keyed by their
+    content, so identical records map to the same point and an edited record gets a new ID.
+
+    Args:
+        record (dict): A resume or job description record.
+
+    Returns:
+        str: The point ID.
+    """
+    source = record.get(SOURCE_FIELD)
+    if source:
+        return str(uuid.uuid5(POINT_ID_NAMESPACE, f"source:{source}"))
+    return content_point_id(record)
+
+
+def record_sources(record):
+    """
+    Returns the sources a record stands for: its own and those of the near-duplicates linked to it.
+    """
+    sources = [record.get(SOURCE_FIELD)] + list(record.get('DuplicateSources') or [])
+    return [source for source in sources if source]
+
+
+def quantization_config(quantization):
+    """
+    Returns the Qdrant quantization config for "scalar" (int8) or "product" (x16) quantization,
+    or None. Quantized vectors stay in RAM; searches rescore with the original vectors.
+    """
+    if quantization is None:
+        return None
+    if quantization == 'scalar':
+        return ScalarQuantization(scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=True))
+    if quantization == 'product':
+        return ProductQuantization(product=ProductQuantizationConfig(compression=CompressionRatio.X16, always_ram=True))
+    raise ValueError(f"Unknown quantization '{quantization}'. Expected 'scalar' or 'product'.")
+
+
+def create_payload_indexes(client, collection_name, fields=RESUME_PAYLOAD_INDEXES):
+    """
+    Creates payload indexes so searches can filter on these fields inside Qdrant.
+    Creating an index that already exists is a no-op.
+    """
+    for field_name, field_schema in fields.items():
+        client.create_payload_index(collection_name=collection_name, field_name=field_name, field_schema=field_schema)
+
+
+def has_sparse_vector(client, collection_name, sparse_vector_name=SPARSE_VECTOR_NAME):
+    """
+    Returns True if the collection was created with the given sparse vector.
+    """
+    sparse_vectors = client.get_collection(collection_name).config.params.sparse_vectors or {}
+    return sparse_vector_name in sparse_vectors
+
+
+def resume_vector_store(client, collection_name, embeddings):
+    """
+    Builds the vector store used to write resumes.
+
+    Collections created with the BM25 sparse vector get hybrid writes (dense and sparse);
+    older collections keep dense-only writes.
+    """
+    if has_sparse_vector(client, collection_name):
+        return QdrantVectorStore(
+            client=client,
+            collection_name=collection_name,
+            embedding=embeddings,
+            retrieval_mode=RetrievalMode.HYBRID,
+            sparse_embedding=BM25SparseEmbeddings(),
+            sparse_vector_name=SPARSE_VECTOR_NAME,
+        )
+    return QdrantVectorStore(client=client, collection_name=collection_name, embedding=embeddings)
+
+
+def existing_point_ids(client, collection_name, batch_size=1000):
+    """
+    Returns the IDs of all points currently stored in a collection.
+
+    Args:
+        client (QdrantClient): Qdrant client.
+        collection_name (str): Name of the Qdrant collection.
+        batch_size (int): Number of points fetched per scroll request.
+
+    Returns:
+        set: Point IDs as strings.
+    """
+    return set(existing_point_states(client, collection_name, batch_size))
+
+
+def existing_point_states(client, collection_name, batch_size=1000):
+    """
+    Returns the source and fingerprint written by ingestion for every point of a collection.
+
+    Returns:
+        dict: Point ID (str) to a (source, fingerprint) tuple; either is None for points
+        written before ingestion recorded them.
+    """
+    states = {}
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection_name,
+            limit=batch_size,
+            offset=offset,
+            with_payload=[SOURCE_PAYLOAD_KEY, FINGERPRINT_PAYLOAD_KEY],
+            with_vectors=False,
+        )
+        for point in points:
+            payload = point.payload or {}
+            states[str(point.id)] = (payload.get(SOURCE_PAYLOAD_KEY), payload.get(FINGERPRINT_PAYLOAD_KEY))
+        if offset is None:
+            return states
+
+
+def write_point_payloads(client, collection_name, payloads):
+    """
+    Adds payload keys to upserted points in one request.
+
+    Args:
+        payloads (dict): Point ID to the payload keys to set on that point.
+    """
+    client.batch_update_points(
+        collection_name=collection_name,
+        update_operations=[
+            SetPayloadOperation(set_payload=SetPayload(payload=payload, points=[id_]))
+            for id_, payload in payloads.items()
+        ],
+    )
+
+
+class _SyncState:
+    # What a sync has seen so far, to decide what to upsert and which points to delete at the end
+
+    def __init__(self, existing, extra_payload=None):
+        self.existing = existing
+        self.extra_payload = extra_payload
+        self.seen = set()
+        self.sources = set()
+        self.legacy_ids = set()
+
+    def changed(self, records):
+        # Returns {point ID: (record, fingerprint)} of the records that are new or changed
+        changed = {}
+        for record in records:
+            id_ = point_id(record)
+            self.seen.add(id_)
+            self.sources.update(record_sources(record))
+            if record.get(SOURCE_FIELD):
+                # Points written before records carried a source were keyed by content
+                self.legacy_ids.add(content_point_id(record))
+            fingerprint = record_fingerprint(record)
+            state = self.existing.get(id_)
+            if (state is None or state[1] != fingerprint) and id_ not in changed:
+                changed[id_] = (record, fingerprint)
+        return changed
+
+    def upsert(self, vector_store, client, collection_name, changed, to_document):
+        # Writes changed records and returns (added, updated) counts
+        with stage_timer('ingest_upsert'):
+            vector_store.add_documents(documents=[to_document(record) for record, _ in changed.values()],
+                                       ids=list(changed))
+            states = {id_: (record.get(SOURCE_FIELD), fingerprint) for id_, (record, fingerprint) in changed.items()}
+            write_point_payloads(client, collection_name, {
+                id_: {
+                    SOURCE_PAYLOAD_KEY: record.get(SOURCE_FIELD), FINGERPRINT_PAYLOAD_KEY: fingerprint,
+                    **(self.extra_payload(record) if self.extra_payload else {}),
+                }
+                for id_, (record, fingerprint) in changed.items()
+            })
+        updated = sum(id_ in self.existing for id_ in changed)
+        self.existing.update(states)
+        return len(changed) - updated, updated
+
+    def removed(self, delete_removed):
+        # Points of the synced sources that were replaced, plus every unseen point with delete_removed
+        return sorted(
+            id_ for id_, (source, _) in self.existing.items()
+            if id_ not in self.seen and (delete_removed or source in self.sources or id_ in self.legacy_ids)
+        )
+
+
+def sync_documents(vector_store, client, collection_name, records, to_document, delete_removed=False,
+                   extra_payload=None):
+    """
+    Upserts the records that are new or changed since they were last written, bumping the
+    collection version when anything changed.
+
+    A record is unchanged when its point already holds the same fingerprint. Points that
+    belonged to the synced records' sources but were replaced, e.g. a resume's point from
+    before it was keyed by source or a resume that is now linked as a near-duplicate, are
+    deleted; points of other sources are kept unless delete_removed is set.
+
+    Args:
+        vector_store (QdrantVectorStore): Vector store used to embed and upload documents.
+        client (QdrantClient): Qdrant client for the same collection.
+        collection_name (str): Name of the Qdrant collection.
+        records (list): Resume or job description records to sync.
+        to_document (callable): Builds a langchain Document from a record.
+        delete_removed (bool): Delete every point whose record is not in records. Only safe
+            when records are the only source of the collection.
+        extra_payload (callable, optional): Returns payload keys stored next to the vector
+            store's payload for a record, e.g. resume_filter_payload.
+
+    Returns:
+        dict: Counts of "added", "updated", "unchanged" and "deleted" points.
+    """
+    with stage_timer('ingest_scan'):
+        state = _SyncState(existing_point_states(client, collection_name), extra_payload)
+
+    changed = state.changed(records)
+    added, updated = state.upsert(vector_store, client, collection_name, changed, to_document) if changed else (0, 0)
+    removed = state.removed(delete_removed)
+    if removed:
+        client.delete(collection_name=collection_name, points_selector=PointIdsList(points=removed))
+    if changed or removed:
+        bump_collection_version(collection_name)
+
+    stats = {'added': added, 'updated': updated, 'unchanged': len(records) - len(changed), 'deleted': len(removed)}
+    for outcome, count in stats.items():
+        DOCUMENTS.labels(collection_name, outcome).inc(count)
+    return stats
+
+
+def iter_json_records(file_path, chunk_size=1 << 16):
+    """
+    Yields records from a JSON array file or a JSON Lines file without loading it whole.
+
+    Args:
+        file_path (str): Path to a file holding a JSON array of objects, or one JSON
+            object per line.
+        chunk_size (int): Number of characters read at a time.
+
+    Yields:
+        dict: One record at a time.
+
+    Raises:
+        ValueError: If the file is neither a JSON array nor JSON Lines.
+    """
+    decoder = json.JSONDecoder()
+    with open(file_path, 'r', encoding='utf-8') as f:
+        buffer = f.read(chunk_size).lstrip()
+        if not buffer:
+            return
+        if not buffer.startswith('['):
+            if not buffer.startswith('{'):
+                raise ValueError(f"{file_path} is neither a JSON array nor JSON Lines.")
+            f.seek(0)
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+            return
+
+        buffer = buffer[1:]
+        eof = False
+        while True:
+            buffer = buffer.lstrip().lstrip(',').lstrip()
+            if buffer.startswith(']'):
+                return
+            try:
+                record, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if eof:
+                    raise ValueError(f"{file_path} ends in the middle of a JSON array.")
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buffer += chunk
+                continue
+            yield record
+            buffer = buffer[end:]
+
+
+def batched(iterable, batch_size):
+    """
+    Yields lists of up to batch_size items from iterable.
+    """
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def checkpoint_path_for(json_file_path, collection_name, checkpoint_dir=CHECKPOINT_DIR):
+    """
+    Returns the checkpoint file used when streaming json_file_path into collection_name.
+    """
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    name = os.path.basename(json_file_path)
+    return os.path.join(checkpoint_dir, f"{collection_name}.{name}.checkpoint.json")
+
+
+def load_checkpoint(checkpoint_path, source_path):
+    """
+    Returns the number of records already ingested from source_path, or 0.
+
+    A checkpoint only applies while the source file keeps the size and mtime it had
+    when the checkpoint was written.
+    """
+    if not checkpoint_path or not os.path.exists(checkpoint_path):
+        return 0
+    try:
+        with open(checkpoint_path, 'r') as f:
+            checkpoint = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return 0
+    stat = os.stat(source_path)
+    if checkpoint.get('size') != stat.st_size or checkpoint.get('mtime') != stat.st_mtime:
+        return 0
+    return checkpoint.get('records', 0)
+
+
+def save_checkpoint(checkpoint_path, source_path, records):
+    """
+    Records that the first records entries of source_path have been ingested.
+    """
+    stat = os.stat(source_path)
+    tmp_path = checkpoint_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({'source': source_path, 'size': stat.st_size, 'mtime': stat.st_mtime, 'records': records}, f)
+    os.replace(tmp_path, checkpoint_path)
+
+
+def stream_sync(vector_store, client, collection_name, json_file_path, to_document,
+                batch_size=256, checkpoint_path=None, delete_removed=False, extra_payload=None):
+    """
+    Streams records from a JSON or JSON Lines file into a collection in fixed-size batches.
+
+    Each batch is diffed against the collection like sync_documents and the checkpoint is
+    advanced after it is upserted, so an interrupted run resumes after the last completed
+    batch. Records before the checkpoint are only hashed, to know which points to keep.
+    The collection version is bumped after every write, so API result caches are invalidated.
+
+    Args:
+        vector_store (QdrantVectorStore): Vector store used to embed and upload documents.
+        client (QdrantClient): Qdrant client for the same collection.
+        collection_name (str): Name of the Qdrant collection.
+        json_file_path (str): Path to the JSON array or JSON Lines file.
+        to_document (callable): Builds a langchain Document from a record.
+        batch_size (int): Number of records upserted per batch.
+        checkpoint_path (str, optional): Where to store progress; no checkpointing if None.
+        delete_removed (bool): Delete every point whose record is not in the file. Only safe
+            when the file is the only source of the collection; without it, only replaced
+            points of the file's sources are deleted (see sync_documents).
+        extra_payload (callable, optional): Returns payload keys stored next to the vector
+            store's payload for a record, e.g. resume_filter_payload.
+
+    Returns:
+        dict: Counts of "added", "updated", "unchanged", "deleted" and "resumed" records.
+    """
+    with stage_timer('ingest_scan'):
+        state = _SyncState(existing_point_states(client, collection_name), extra_payload)
+    resume_from = load_checkpoint(checkpoint_path, json_file_path)
+    stats = {'added': 0, 'updated': 0, 'unchanged': 0, 'deleted': 0, 'resumed': resume_from}
+    processed = 0
+
+    for batch in batched(iter_json_records(json_file_path), batch_size):
+        if not all(isinstance(record, dict) for record in batch):
+            raise ValueError(f"Invalid data format in {json_file_path}. Expected a list of objects.")
+        changed = state.changed(batch)
+        processed += len(batch)
+        if processed <= resume_from:
+            continue
+
+        added = updated = 0
+        if changed:
+            added, updated = state.upsert(vector_store, client, collection_name, changed, to_document)
+            bump_collection_version(collection_name)
+        for outcome, count in (('added', added), ('updated', updated), ('unchanged', len(batch) - len(changed))):
+            stats[outcome] += count
+            DOCUMENTS.labels(collection_name, outcome).inc(count)
+
+        if checkpoint_path:
+            save_checkpoint(checkpoint_path, json_file_path, processed)
+        logging.info(f"Ingested {processed} records into {collection_name}")
+
+    removed = state.removed(delete_removed)
+    if removed:
+        client.delete(collection_name=collection_name, points_selector=PointIdsList(points=removed))
+        bump_collection_version(collection_name)
+    stats['deleted'] = len(removed)
+    DOCUMENTS.labels(collection_name, 'deleted').inc(len(removed))
+
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        # The whole file went through; the next run starts from scratch
+        os.remove(checkpoint_path)
+    return stats
@@ -0,0 +1,168 @@
+import os
+import time
+import asyncio
+import threading
+from functools import wraps
+from contextlib import contextmanager
+from langchain_core.callbacks import BaseCallbackHandler
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+
+# Latency buckets in seconds, from cache hits to slow LLM calls
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+STAGE_SECONDS = Histogram(
+    'resume_stage_seconds', 'Duration of request and ingestion stages', ['stage'], buckets=LATENCY_BUCKETS,
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    'resume_http_request_seconds', 'Duration of API requests until the response starts', ['route', 'method', 'status'],
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge('resume_http_requests_in_flight', 'API requests being processed')
+LLM_CALL_SECONDS = Histogram(
+    'resume_llm_call_seconds', 'Duration of LLM calls', ['model', 'status'], buckets=LATENCY_BUCKETS,
+)
+LLM_TOKENS = Counter('resume_llm_tokens_total', 'Tokens processed by LLM calls', ['model', 'kind'])
+LLM_CALLS_IN_FLIGHT = Gauge('resume_llm_calls_in_flight', 'LLM calls waiting for a response', ['model'])
+QUEUE_DEPTH = Gauge('resume_queue_depth', 'Items waiting in work queues', ['queue'])
+THREADPOOL_THREADS = Gauge('resume_threadpool_threads', 'Threads of worker pools', ['pool', 'state'])
+EVENT_LOOP_TASKS = Gauge('resume_event_loop_tasks', 'Tasks scheduled on the API event loop')
+DOCUMENTS = Counter('resume_ingested_documents_total', 'Records processed by ingestion', ['collection', 'outcome'])
+
+
+class StageTimer:
+    """
+    Elapsed time of a stage_timer block, readable after the block ends.
+    """
+
+    def __init__(self):
+        self.seconds = 0.0
+
+    @property
+    def ms(self):
+        return round(self.seconds * 1000, 1)
+
+
+@contextmanager
+def stage_timer(stage):
+    """
+    Times a block and records it in the stage histogram, including when the block raises.
+
+    Usage:
+        with stage_timer('search') as timer:
+            ...
+        timer.ms
+    """
+    timer = StageTimer()
+    start = time.perf_counter()
+    try:
+        yield timer
+    finally:
+        timer.seconds = time.perf_counter() - start
+        STAGE_SECONDS.labels(stage).observe(timer.seconds)
+
+
+def timed_stage(stage):
+    """
+    Decorator recording every call of an async function in the stage histogram.
+    """
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            with stage_timer(stage):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class LLMMetricsCallback(BaseCallbackHandler):
+    """
+    LangChain callback recording LLM call durations, in-flight calls and Ollama token counts.
+    """
+
+    # Record synchronously instead of in an executor thread for async calls
+    run_inline = True
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._runs = {}
+
+    def on_llm_start(self, serialized, prompts, *, run_id, invocation_params=None, metadata=None, **kwargs):
+        model = (invocation_params or {}).get('model') or (metadata or {}).get('ls_model_name') or 'unknown'
+        with self._lock:
+            self._runs[run_id] = (model, time.perf_counter())
+        LLM_CALLS_IN_FLIGHT.labels(model).inc()
+
+    def _finish(self, run_id, status):
+        with self._lock:
+            model, start = self._runs.pop(run_id, ('unknown', None))
+        if start is not None:
+            LLM_CALLS_IN_FLIGHT.labels(model).dec()
+            LLM_CALL_SECONDS.labels(model, status).observe(time.perf_counter() - start)
+        return model
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        model = self._finish(run_id, 'ok')
+        for generations in response.generations:
+            for generation in generations:
+                info = generation.generation_info or {}
+                LLM_TOKENS.labels(model, 'prompt').inc(info.get('prompt_eval_count') or 0)
+                LLM_TOKENS.labels(model, 'completion').inc(info.get('eval_count') or 0)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id, 'error')
+
+
+def observe_event_loop():
+    """
+    Updates the event loop and thread pool gauges. Call from the running event loop, e.g.
+    right before metrics are rendered.
+    """
+    loop = asyncio.get_running_loop()
+    EVENT_LOOP_TASKS.set(len(asyncio.all_tasks(loop)))
+
+    # Pool behind asyncio.to_thread (local retrieval backend)
+    executor = getattr(loop, '_default_executor', None)
+    if executor is not None:
+        THREADPOOL_THREADS.labels('asyncio', 'total').set(len(executor._threads))
+        THREADPOOL_THREADS.labels('asyncio', 'queued').set(executor._work_queue.qsize())
+
+    # Pool behind sync FastAPI dependencies and endpoints
+    try:
+        from anyio.to_thread import current_default_thread_limiter
+        limiter = current_default_thread_limiter()
+        THREADPOOL_THREADS.labels('anyio', 'busy').set(limiter.borrowed_tokens)
+        THREADPOOL_THREADS.labels('anyio', 'total').set(limiter.total_tokens)
+    except Exception:
+        pass
+
+
+def stage_summary():
+    """
+    Returns count, total and mean duration of every recorded stage, for logging from scripts.
+    """
+    summary = {}
+    for metric in STAGE_SECONDS.collect():
+        totals = {}
+        for sample in metric.samples:
+            if sample.name.endswith('_count') or sample.name.endswith('_sum'):
+                totals.setdefault(sample.labels['stage'], {})[sample.name.rsplit('_', 1)[-1]] = sample.value
+        for stage, values in totals.items():
+            count = int(values.get('count', 0))
+            total = values.get('sum', 0.0)
+            summary[stage] = {
+                'count': count,
+                'total_seconds': round(total, 3),
+                'mean_ms': round(total / count * 1000, 1) if count else 0.0,
+            }
+    return summary
+
+
+def start_metrics_server_from_env(env_var='METRICS_PORT'):
+    """
+    Serves /metrics on the port in env_var, if set, so long-running scripts can be scraped.
+    """
+    port = os.environ.get(env_var)
+    if port:
+        start_http_server(int(port))
+        return int(port)
+    return None
@@ -1,8 +1,16 @@
 import json
 import os
+import zlib
+import asyncio
 import logging
 from langchain_ollama.llms import OllamaLLM
 from format import job_description_format
+from aggregate_data import aggregate_job_description_data
+from dedup import minhash_signature, estimated_similarity
+from instrumentation import LLMMetricsCallback, start_metrics_server_from_env, stage_timer
+from structured_output import (
+    StructuredOutputError, StructuredOutputStats, invoke_structured, ainvoke_structured, schema_for_template,
+)
 
 
 # Configure logging
@@ -11,8 +19,15 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 # Fields for which job descriptions are to be generated
 FIELDS = ['software engineer', 'database', 'quality assurance', 'human resources', 'teacher', 'receptionist', 'project manager', 'chef', 'Business Analyst', 'Accountant']
 
+# Concurrent generation: sampling temperatures cycled through per example (raised on every
+# retry), generations per posting before giving up, and the estimated Jaccard similarity
+# to an accepted posting at which a new one is rejected as a near-duplicate
+TEMPERATURES = [0.6, 0.75, 0.9, 1.05]
+MAX_ATTEMPTS = 3
+DUPLICATE_THRESHOLD = 0.7
 
-def generate_job_description_for_field(model, field, job_description_format):
+
+def generate_job_description_for_field(model, field, job_description_format, structured_stats=None):
     """
     Generates job description for a specific field using the provided model.
     
@@ -20,6 +35,7 @@ def generate_job_description_for_field(model, field, job_description_format):
     - model: The language model to use for job description generation.
     - field: The specific field (department) for which the job description is being created.
     - job_description_format: The format in which the job description should be structured.
+    - structured_stats: Optional StructuredOutputStats the outcome is counted in.
     
     Returns:
     - dict: The generated job description in JSON format.
@@ -31,10 +47,11 @@ def generate_job_description_for_field(model, field, job_description_format):
     You should only provide the response in JSON format.
     """
     try:
-        result = model.invoke(prompt)
-        structured_results = json.loads(result.replace('\n', ''))
+        structured_results = invoke_structured(
+            model, prompt, schema_for_template(job_description_format), stats=structured_stats
+        )
         return structured_results
-    except json.JSONDecodeError:
+    except StructuredOutputError:
         logging.error(f"Failed to decode JSON for {field} department.")
         return None
     except Exception as e:
@@ -42,7 +59,7 @@ def generate_job_description_for_field(model, field, job_description_format):
         return None
 
 
-def create_job_descriptions(model, fields, job_description_format):
+def create_job_descriptions(model, fields, job_description_format, structured_stats=None):
     """
     Creates job descriptions for a list of fields using the provided model.
     
@@ -50,6 +67,7 @@ def create_job_descriptions(model, fields, job_description_format):
     - model: The language model to use for job description generation.
     - fields: A list of fields for which job descriptions need to be created.
     - job_description_format: The format in which the job descriptions should be structured.
+    - structured_stats: Optional StructuredOutputStats shared by all generations.
     
     Returns:
     - list: A list of generated job descriptions.
@@ -59,12 +77,168 @@ def create_job_descriptions(model, fields, job_description_format):
     for field in fields:
         for i in range(number_example): 
             logging.info(f"Generating job description for {field} department...")
-            job_description = generate_job_description_for_field(model, field, job_description_format)
+            job_description = generate_job_description_for_field(
+                model, field, job_description_format, structured_stats=structured_stats
+            )
             if job_description:
                 generated_job_descriptions.append(job_description)
     return generated_job_descriptions
 
 
+def generation_options(field, example, attempt, base_seed=0):
+    """
+    Returns Ollama sampling options for one generation: a seed derived from the field, the
+    example number and the attempt, so reruns reproduce the same postings, and a temperature
+    that differs between examples of a field and rises with every retry.
+    """
+    seed = (zlib.crc32(field.encode('utf-8')) + base_seed * 1000003 + example * 101 + attempt) % (2 ** 31)
+    temperature = TEMPERATURES[(example + attempt) % len(TEMPERATURES)] + 0.1 * attempt
+    return {'seed': seed, 'temperature': round(temperature, 2)}
+
+
+def load_job_descriptions(filename):
+    """
+    Returns the job descriptions already saved in filename, or an empty list if it does not exist.
+
+    Raises:
+    - ValueError: If the file is not a JSON array, so it is not overwritten by mistake.
+    """
+    if not os.path.exists(filename):
+        return []
+    try:
+        with open(filename, 'r') as f:
+            job_descriptions = json.load(f)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"{filename} is not valid JSON: {e}")
+    if not isinstance(job_descriptions, list):
+        raise ValueError(f"{filename} does not hold a JSON array of job descriptions.")
+    return job_descriptions
+
+
+def save_job_descriptions_atomic(job_descriptions, filename):
+    """
+    Writes job descriptions to a temporary file and renames it over filename, so the file
+    always holds a complete JSON array even if the process dies mid-write.
+    """
+    tmp_path = filename + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(job_descriptions, f, indent=4)
+    os.replace(tmp_path, filename)
+
+
+def posting_field(job, fields):
+    """
+    Returns the field a posting without a "generation" object was most likely generated for:
+    the first field whose words all appear in its job title, then in its department, or None.
+    """
+    for key in ('job_title', 'department'):
+        words = set(str(job.get(key) or '').lower().split())
+        for field in fields:
+            if words and set(field.lower().split()) <= words:
+                return field
+    return None
+
+
+def filled_slots(job_descriptions, fields, number_example):
+    """
+    Returns the (field, example) slots the saved job descriptions already fill.
+
+    Postings with a "generation" object fill the slot it names. Older postings have none, so
+    each one matched to a field by posting_field fills that field's lowest free example
+    number, up to number_example; postings that match no field fill nothing.
+    """
+    filled = {
+        (job['generation'].get('field'), job['generation'].get('example'))
+        for job in job_descriptions if isinstance(job.get('generation'), dict)
+    }
+    for job in job_descriptions:
+        if isinstance(job.get('generation'), dict):
+            continue
+        field = posting_field(job, fields)
+        if field is None:
+            continue
+        free = [example for example in range(number_example) if (field, example) not in filled]
+        if free:
+            filled.add((field, free[0]))
+    return filled
+
+
+async def acreate_job_descriptions(model, fields, job_description_format, number_example=5, max_concurrency=4,
+                                   filename='job_description.json', structured_stats=None, base_seed=0):
+    """
+    Creates job descriptions with up to max_concurrency LLM requests in flight.
+
+    Every generation uses its own seed and temperature (see generation_options). Postings
+    that are near-duplicates of an accepted one are rejected and generated again, up to
+    MAX_ATTEMPTS times. Accepted postings are written to filename as they arrive, each with
+    a "generation" object naming its field and example number. A rerun keeps the postings
+    already in filename, checks new ones against them for near-duplicates and only generates
+    the (field, example) slots that are still missing, so a crash does not lose completed work.
+    Postings saved without a "generation" object count towards their field (see filled_slots).
+
+    Args:
+    - model: The language model to use for job description generation.
+    - fields: A list of fields for which job descriptions need to be created.
+    - job_description_format: The format in which the job descriptions should be structured.
+    - number_example: Number of job descriptions per field.
+    - max_concurrency: Number of generations running at the same time.
+    - filename: JSON file the accepted job descriptions are written to.
+    - structured_stats: Optional StructuredOutputStats shared by all generations.
+    - base_seed: Changes every seed, for a different but reproducible set of postings.
+
+    Returns:
+    - list: The job descriptions in filename: earlier ones first, then the new ones in completion order.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    accepted = load_job_descriptions(filename)
+    signatures = [minhash_signature(aggregate_job_description_data(job)) for job in accepted]
+    filled = filled_slots(accepted, fields, number_example)
+    stats = {'accepted': 0, 'duplicates': 0, 'failed': 0, 'existing': len(accepted)}
+    schema = schema_for_template(job_description_format)
+
+    async def generate(field, example):
+        prompt = f"""
+    You are an expert in creating a job description for the following {field} department.
+    Prepare the job description in JSON format.
+    The format is {job_description_format}
+    You should only provide the response in JSON format.
+    """
+        for attempt in range(MAX_ATTEMPTS):
+            options = generation_options(field, example, attempt, base_seed)
+            try:
+                async with semaphore:
+                    with stage_timer('job_description_generation'):
+                        job_description = await ainvoke_structured(
+                            model.bind(options=options), prompt, schema, stats=structured_stats
+                        )
+            except Exception as e:
+                logging.error(f"Error occurred while generating job description for {field}: {e}")
+                continue
+
+            # No await between the check and the append, so concurrent generations cannot both pass
+            signature = minhash_signature(aggregate_job_description_data(job_description))
+            if any(estimated_similarity(signature, other) >= DUPLICATE_THRESHOLD for other in signatures):
+                stats['duplicates'] += 1
+                logging.info(f"Rejected near-duplicate {field} job description (attempt {attempt + 1})")
+                continue
+            job_description['generation'] = {'field': field, 'example': example}
+            signatures.append(signature)
+            accepted.append(job_description)
+            stats['accepted'] += 1
+            save_job_descriptions_atomic(accepted, filename)
+            logging.info(f"Generated job description {example + 1}/{number_example} for {field} department")
+            return
+        stats['failed'] += 1
+        logging.warning(f"No distinct job description {example + 1} for {field} after {MAX_ATTEMPTS} attempts")
+
+    await asyncio.gather(*(
+        generate(field, example)
+        for field in fields for example in range(number_example) if (field, example) not in filled
+    ))
+    logging.info(f"Job descriptions: {stats}")
+    return accepted
+
+
 def save_job_description_to_file(job_descriptions, filename='job_description.json'):
     """
     Saves the generated job descriptions to a JSON file.
@@ -84,17 +258,20 @@ def main():
     """
     Main function to create and save job descriptions.
     """
-    model = OllamaLLM(model='llama3.2')
+    model = OllamaLLM(model='llama3.2', callbacks=[LLMMetricsCallback()])
+    structured_stats = StructuredOutputStats()
     
-    # Generate job descriptions for all fields
-    job_descriptions = create_job_descriptions(model, FIELDS, job_description_format)
+    # Generate job descriptions for all fields; accepted ones are saved to job_description.json as they arrive
+    job_descriptions = asyncio.run(acreate_job_descriptions(
+        model, FIELDS, job_description_format, number_example=5, max_concurrency=4,
+        filename='job_description.json', structured_stats=structured_stats,
+    ))
+    logging.info(f"Structured output: {structured_stats.stats()}")
     
-    # Save the generated job descriptions to a file
-    if job_descriptions:
-        save_job_description_to_file(job_descriptions)
-    else:
+    if not job_descriptions:
         logging.warning("No job descriptions were generated.")
 
 
 if __name__ == '__main__':
+    start_metrics_server_from_env()
     main()
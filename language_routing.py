@@ -0,0 +1,157 @@
+import re
+import asyncio
+import logging
+from langdetect import DetectorFactory, detect
+from langdetect.lang_detect_exception import LangDetectException
+from llm_cache import cache_key, model_name_of
+from instrumentation import stage_timer
+
+# langdetect is randomized; a fixed seed makes repeated runs agree
+DetectorFactory.seed = 0
+
+# Characters of normalized text the language is detected on
+DETECTION_SAMPLE_CHARS = 2000
+
+# Largest piece of a resume translated in one prompt, and pieces translated at the same time
+TRANSLATION_CHUNK_CHARS = 3000
+TRANSLATION_CHUNK_CONCURRENCY = 4
+
+# LLMCache namespace of detections, kept apart from the LLM results and their hit rate
+DETECTION_CACHE_NAMESPACE = 'language_detections'
+
+ENGLISH = 'en'
+UNKNOWN = 'unknown'
+
+SECTION_BREAK = re.compile(r'\n\s*\n')
+
+
+def detection_sample(text, max_chars=DETECTION_SAMPLE_CHARS):
+    """
+    Returns the whitespace-normalized start of a text, bounded to max_chars.
+    """
+    return ' '.join(text[:max_chars * 2].split())[:max_chars]
+
+
+def detect_language(text, cache=None):
+    """
+    Detects the language of a text from a bounded sample.
+
+    Args:
+        text (str): The resume text.
+        cache (LLMCache, optional): Stores detections keyed by the sample's content, in its
+            DETECTION_CACHE_NAMESPACE namespace.
+
+    Returns:
+        str: ISO 639-1 code such as "en", or "unknown" when the sample has no detectable text.
+    """
+    sample = detection_sample(text)
+    cache = cache.namespace(DETECTION_CACHE_NAMESPACE) if cache else None
+    key = cache_key('langdetect', str(DETECTION_SAMPLE_CHARS), sample) if cache else None
+    cached = cache.get(key) if cache else None
+    if cached is not None:
+        return cached
+    with stage_timer('language_detection'):
+        try:
+            language = detect(sample)
+        except LangDetectException:
+            language = UNKNOWN
+    if cache:
+        cache.put(key, language)
+    return language
+
+
+def needs_translation(language):
+    return language not in (ENGLISH, UNKNOWN)
+
+
+def split_chunks(text, max_chars=TRANSLATION_CHUNK_CHARS):
+    """
+    Splits a text into pieces of at most max_chars, breaking between sections (blank
+    lines) where possible, then between lines, and only then inside a line.
+    """
+    chunks, current = [], ''
+
+    def pieces():
+        for section in SECTION_BREAK.split(text):
+            if len(section) <= max_chars:
+                yield section
+                continue
+            for line in section.split('\n'):
+                for start in range(0, max(len(line), 1), max_chars):
+                    yield line[start:start + max_chars]
+
+    for piece in pieces():
+        if not piece.strip():
+            continue
+        if current and len(current) + len(piece) + 2 > max_chars:
+            chunks.append(current)
+            current = ''
+        current = f"{current}\n\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def translation_prompt(chunk, language):
+    return f"""
+            You are an expert in language translation.
+            The given language is {language}.
+            Please translate the following part of a resume to English.
+            Return only the translation:
+            {chunk}
+            """
+
+
+def _translation_key(model, chunk, language):
+    return cache_key(model_name_of(model), f"translate:{language}", chunk)
+
+
+def translate_text(model, text, language, cache=None):
+    """
+    Translates a text to English chunk by chunk, reusing cached chunk translations.
+
+    Args:
+        model: The language model used for translation.
+        text (str): The text to translate.
+        language (str): Detected language of the text.
+        cache (LLMCache, optional): Stores translations keyed by model, language and chunk content.
+
+    Returns:
+        str: The translated text.
+    """
+    translated = []
+    with stage_timer('translation'):
+        for chunk in split_chunks(text):
+            key = _translation_key(model, chunk, language)
+            cached = cache.get(key) if cache else None
+            if cached is None:
+                cached = model.invoke(translation_prompt(chunk, language)).strip()
+                if cache:
+                    cache.put(key, cached)
+            translated.append(cached)
+    return '\n\n'.join(translated)
+
+
+async def atranslate_text(model, text, language, cache=None, max_concurrency=TRANSLATION_CHUNK_CONCURRENCY):
+    """
+    Async counterpart of translate_text translating up to max_concurrency chunks at a time.
+    Errors are propagated so the caller can retry; chunks translated before the error stay cached.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def translate(chunk):
+        key = _translation_key(model, chunk, language)
+        cached = cache.get(key) if cache else None
+        if cached is not None:
+            return cached
+        async with semaphore:
+            result = (await model.ainvoke(translation_prompt(chunk, language))).strip()
+        if cache:
+            cache.put(key, result)
+        return result
+
+    chunks = split_chunks(text)
+    with stage_timer('translation'):
+        translated = await asyncio.gather(*(translate(chunk) for chunk in chunks))
+    logging.info(f"Translated {len(chunks)} chunks from {language}")
+    return '\n\n'.join(translated)
@@ -0,0 +1,152 @@
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+import logging
+
+DEFAULT_CACHE_PATH = os.path.join('.cache', 'llm_cache.sqlite')
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_TABLE = 'llm_cache'
+
+TABLE_NAME = re.compile(r'^[a-z_][a-z0-9_]*$')
+
+
+def cache_key(model_name, template, input_text):
+    """
+    Builds a content-addressed cache key for an LLM call.
+
+    Args:
+        model_name (str): Name of the model answering the prompt.
+        template (str): The response template (e.g. format.resume_format).
+        input_text (str): The input the prompt is built from.
+
+    Returns:
+        str: Hex SHA-256 digest identifying the call.
+    """
+    digest = hashlib.sha256()
+    for part in (model_name, template, input_text):
+        encoded = (part or '').encode('utf-8')
+        # Length-prefix every part so different splits never collide
+        digest.update(len(encoded).to_bytes(8, 'big'))
+        digest.update(encoded)
+    return digest.hexdigest()
+
+
+def model_name_of(model):
+    """
+    Returns the model name of a langchain Ollama model, falling back to its repr.
+    """
+    return getattr(model, 'model', None) or repr(model)
+
+
+class LLMCache:
+    """
+    Persistent SQLite cache for LLM results with size-bounded LRU eviction.
+
+    Values are stored as text, keyed by cache_key(). The total size of stored values
+    is kept under max_bytes by evicting the least recently used entries. Lookups that are
+    not LLM calls go to a namespace(), a separate table with its own counters and budget.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES, table=DEFAULT_TABLE):
+        if not TABLE_NAME.match(table):
+            raise ValueError(f"Invalid cache table name '{table}'")
+        self.path = path
+        self.max_bytes = max_bytes
+        self.table = table
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._namespaces = {}
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            f'CREATE TABLE IF NOT EXISTS {table} ('
+            'key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)'
+        )
+        self._conn.execute(f'CREATE INDEX IF NOT EXISTS {table}_last_access ON {table} (last_access)')
+        self._total_bytes = self._conn.execute(f'SELECT COALESCE(SUM(size), 0) FROM {table}').fetchone()[0]
+
+    def get(self, key):
+        """
+        Returns the cached value for key, or None on a miss.
+        """
+        with self._lock:
+            row = self._conn.execute(f'SELECT value FROM {self.table} WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute(f'UPDATE {self.table} SET last_access = ? WHERE key = ?', (time.time(), key))
+            return row[0]
+
+    def contains(self, key):
+        """
+        Returns True if key is cached, without counting a hit or miss.
+        """
+        with self._lock:
+            return self._conn.execute(f'SELECT 1 FROM {self.table} WHERE key = ?', (key,)).fetchone() is not None
+
+    def put(self, key, value):
+        """
+        Stores value under key and evicts least recently used entries if over budget.
+        """
+        size = len(value.encode('utf-8'))
+        with self._lock:
+            previous = self._conn.execute(f'SELECT size FROM {self.table} WHERE key = ?', (key,)).fetchone()
+            self._conn.execute(
+                f'INSERT OR REPLACE INTO {self.table} (key, value, size, last_access) VALUES (?, ?, ?, ?)',
+                (key, value, size, time.time()),
+            )
+            self._total_bytes += size - (previous[0] if previous else 0)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        # Drop the oldest entries until the cache is back under 90% of its budget
+        target = int(self.max_bytes * 0.9)
+        rows = self._conn.execute(f'SELECT key, size FROM {self.table} ORDER BY last_access').fetchall()
+        evicted = []
+        for key, size in rows:
+            if self._total_bytes <= target:
+                break
+            evicted.append((key,))
+            self._total_bytes -= size
+        self._conn.executemany(f'DELETE FROM {self.table} WHERE key = ?', evicted)
+        logging.info(f"LLM cache ({self.table}) evicted {len(evicted)} entries")
+
+    def namespace(self, name, max_bytes=None):
+        """
+        Returns a cache stored in its own table of the same file, created on first use, e.g. for
+        language detections that should not count towards the LLM hit rate.
+        """
+        with self._lock:
+            if name not in self._namespaces:
+                self._namespaces[name] = LLMCache(self.path, max_bytes or self.max_bytes, table=f'{self.table}_{name}')
+            return self._namespaces[name]
+
+    def stats(self):
+        """
+        Returns hit/miss counters and the current size of the cache, without its namespaces.
+        """
+        with self._lock:
+            entries = self._conn.execute(f'SELECT COUNT(*) FROM {self.table}').fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': entries,
+                'bytes': self._total_bytes,
+            }
+
+    def close(self):
+        with self._lock:
+            for namespace in self._namespaces.values():
+                namespace.close()
+            self._conn.close()
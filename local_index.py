@@ -0,0 +1,307 @@
+import os
+import json
+import numpy as np
+from qdrant_client import QdrantClient
+from aggregate_data import aggregate_resume_data
+from embedding_cache import cached_ollama_embeddings
+from ingestion import iter_json_records, batched, point_id, RESUME_FILTER_FIELDS, normalize_filter_value
+from section_index import is_section_collection
+
+DEFAULT_INDEX_DIR = os.path.join('.cache', 'local_index', 'resume_collection')
+
+# Resume fields that can be filtered on, keyed by the name used in search filters
+FILTER_FIELDS = RESUME_FILTER_FIELDS
+
+QUANTIZATION_CHUNK_ROWS = 8192
+
+# int8 rows are widened to float32 in blocks of about this many bytes, small enough to stay
+# in CPU cache, so scoring reads a quarter of the bytes of the float32 vectors
+QUANTIZED_BLOCK_BYTES = 256 * 1024
+
+
+class LocalIndexWriter:
+    """
+    Writes resume vectors and records into an index directory read by LocalIndex.
+
+    Layout:
+        meta.json       dimension and number of vectors
+        ids.json        point ID of every row
+        vectors.f32     L2-normalized float32 vectors, one row per resume
+        vectors.i8      int8 scalar-quantized copy of vectors.f32
+        scales.f32      per-row dequantization scale of vectors.i8
+        records.jsonl   page_content and metadata of every row
+        offsets.i64     byte offset of every row in records.jsonl
+        filters.json    row numbers per value of every filter field
+    """
+
+    def __init__(self, index_dir):
+        self.index_dir = index_dir
+        os.makedirs(index_dir, exist_ok=True)
+        self.ids = []
+        self.filters = {field: {} for field in FILTER_FIELDS}
+        self.dimension = None
+        self._vectors = open(os.path.join(index_dir, 'vectors.f32.tmp'), 'wb')
+        self._records = open(os.path.join(index_dir, 'records.jsonl.tmp'), 'wb')
+        self._offsets = []
+
+    def add(self, ids, vectors, page_contents, metadatas):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.dimension is None:
+            self.dimension = vectors.shape[1]
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        self._vectors.write((vectors / np.maximum(norms, 1e-12)).astype(np.float32).tobytes())
+
+        for id_, page_content, metadata in zip(ids, page_contents, metadatas):
+            row = len(self.ids)
+            self.ids.append(str(id_))
+            self._offsets.append(self._records.tell())
+            line = json.dumps({'page_content': page_content, 'metadata': metadata}, ensure_ascii=False)
+            self._records.write(line.encode('utf-8') + b'\n')
+            for field, extract in FILTER_FIELDS.items():
+                for value in map(normalize_filter_value, extract(metadata or {})):
+                    if value:
+                        rows = self.filters[field].setdefault(value, [])
+                        if not rows or rows[-1] != row:
+                            rows.append(row)
+
+    def close(self):
+        self._vectors.close()
+        self._records.close()
+        count = len(self.ids)
+        dimension = self.dimension or 0
+
+        def path(name):
+            return os.path.join(self.index_dir, name)
+
+        os.replace(path('vectors.f32.tmp'), path('vectors.f32'))
+        os.replace(path('records.jsonl.tmp'), path('records.jsonl'))
+        np.asarray(self._offsets, dtype=np.int64).tofile(path('offsets.i64'))
+
+        # Symmetric per-row int8 quantization, written in chunks to bound memory
+        vectors = np.memmap(path('vectors.f32'), dtype=np.float32, mode='r', shape=(count, dimension)) if count else None
+        scales = np.zeros(count, dtype=np.float32)
+        with open(path('vectors.i8'), 'wb') as f:
+            for start in range(0, count, QUANTIZATION_CHUNK_ROWS):
+                chunk = np.asarray(vectors[start:start + QUANTIZATION_CHUNK_ROWS])
+                chunk_scales = np.maximum(np.abs(chunk).max(axis=1), 1e-12) / 127.0
+                scales[start:start + len(chunk)] = chunk_scales
+                f.write(np.round(chunk / chunk_scales[:, None]).astype(np.int8).tobytes())
+        scales.tofile(path('scales.f32'))
+
+        with open(path('ids.json'), 'w') as f:
+            json.dump(self.ids, f)
+        with open(path('filters.json'), 'w') as f:
+            json.dump(self.filters, f)
+        with open(path('meta.json'), 'w') as f:
+            json.dump({'dimension': dimension, 'count': count}, f)
+
+
+class LocalIndex:
+    """
+    In-process, memory-mapped resume vector index searched with NumPy matrix products.
+
+    With quantized=True, candidates are scored against the memory-mapped int8 copy of the
+    vectors and the best top_k * rescore_factor of them are rescored with the float32
+    vectors, which are only paged in for those rows.
+    """
+
+    def __init__(self, index_dir=DEFAULT_INDEX_DIR, quantized=False, rescore_factor=4):
+        self.index_dir = index_dir
+        self.quantized = quantized
+        self.rescore_factor = rescore_factor
+
+        def path(name):
+            return os.path.join(index_dir, name)
+
+        with open(path('meta.json')) as f:
+            meta = json.load(f)
+        self.count = meta['count']
+        self.dimension = meta['dimension']
+        with open(path('ids.json')) as f:
+            self.ids = json.load(f)
+        with open(path('filters.json')) as f:
+            self.filters = {
+                field: {value: np.asarray(rows, dtype=np.int64) for value, rows in values.items()}
+                for field, values in json.load(f).items()
+            }
+        # One extra offset at the end of the file gives every row's length
+        self.offsets = np.append(np.fromfile(path('offsets.i64'), dtype=np.int64), os.path.getsize(path('records.jsonl')))
+
+        shape = (self.count, self.dimension)
+        self.vectors = np.memmap(path('vectors.f32'), dtype=np.float32, mode='r', shape=shape) if self.count else np.zeros(shape, np.float32)
+        if quantized and self.count:
+            self.quantized_vectors = np.memmap(path('vectors.i8'), dtype=np.int8, mode='r', shape=shape)
+            self.scales = np.fromfile(path('scales.f32'), dtype=np.float32)
+        self._records_fd = os.open(path('records.jsonl'), os.O_RDONLY)
+
+    def candidate_rows(self, filters):
+        """
+        Returns the rows allowed by filters (dict of field to values), or None for all rows.
+        Every value must match, except education_years where any value matches; case is ignored.
+        """
+        rows = None
+        for field, values in (filters or {}).items():
+            values = [value for value in map(normalize_filter_value, values or []) if value]
+            if not values:
+                continue
+            index = self.filters.get(field, {})
+            empty = np.zeros(0, dtype=np.int64)
+            if field == 'education_years':
+                matches = [np.unique(np.concatenate([index.get(value, empty) for value in values]))]
+            else:
+                matches = [index.get(value, empty) for value in values]
+            for match in matches:
+                rows = match if rows is None else np.intersect1d(rows, match, assume_unique=True)
+        return rows
+
+    def _scores(self, queries, rows):
+        # Scores of every query against the given rows (all rows when rows is None), chunked
+        total = self.count if rows is None else len(rows)
+        scores = np.empty((len(queries), total), dtype=np.float32)
+        if self.quantized:
+            return self._quantized_scores(queries, rows, scores)
+        for start in range(0, total, QUANTIZATION_CHUNK_ROWS):
+            selection = slice(start, start + QUANTIZATION_CHUNK_ROWS) if rows is None else rows[start:start + QUANTIZATION_CHUNK_ROWS]
+            block = np.asarray(self.vectors[selection])
+            scores[:, start:start + block.shape[0]] = queries @ block.T
+        return scores
+
+    def _quantized_scores(self, queries, rows, scores):
+        # Scores against the int8 vectors: each block is widened into a reused cache-sized
+        # buffer and the per-row scales are applied to the scores, not to the vectors
+        block_rows = max(1, QUANTIZED_BLOCK_BYTES // (self.dimension * 4))
+        buffer = np.empty((block_rows, self.dimension), dtype=np.float32)
+        for start in range(0, scores.shape[1], block_rows):
+            selection = slice(start, start + block_rows) if rows is None else rows[start:start + block_rows]
+            block = self.quantized_vectors[selection]
+            count = block.shape[0]
+            np.copyto(buffer[:count], block, casting='unsafe')
+            np.matmul(queries, buffer[:count].T, out=scores[:, start:start + count])
+        scores *= self.scales if rows is None else self.scales[rows]
+        return scores
+
+    def search(self, queries, top_k, filters=None):
+        """
+        Finds the top_k rows by cosine similarity for every query vector.
+
+        Args:
+            queries (list): Query vectors.
+            top_k (int): Number of results per query.
+            filters (dict, optional): Filter field to list of required values.
+
+        Returns:
+            list: For every query, a list of (row, score) pairs ordered by score.
+        """
+        queries = np.asarray(queries, dtype=np.float32)
+        queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+        rows = self.candidate_rows(filters)
+        total = self.count if rows is None else len(rows)
+        if total == 0:
+            return [[] for _ in queries]
+
+        scores = self._scores(queries, rows)
+        keep = min(total, top_k * self.rescore_factor if self.quantized else top_k)
+        results = []
+        for query, query_scores in zip(queries, scores):
+            top = np.argpartition(-query_scores, keep - 1)[:keep]
+            candidates = top if rows is None else rows[top]
+            if self.quantized:
+                # Rescore the int8 candidates with the exact float32 vectors
+                order = np.argsort(candidates)
+                candidates = candidates[order]
+                exact = np.asarray(self.vectors[candidates]) @ query
+                best = np.argsort(-exact)[:top_k]
+                results.append([(int(candidates[i]), float(exact[i])) for i in best])
+            else:
+                best = top[np.argsort(-query_scores[top])][:top_k]
+                results.append([(int(best_row if rows is None else rows[best_row]), float(query_scores[best_row])) for best_row in best])
+        return results
+
+    def record(self, row):
+        """
+        Reads the page_content and metadata stored for a row. Safe to call from several threads.
+        """
+        start, end = int(self.offsets[row]), int(self.offsets[row + 1])
+        return json.loads(os.pread(self._records_fd, end - start, start))
+
+    def close(self):
+        os.close(self._records_fd)
+
+
+def build_index_from_json(json_file_path, model_name, index_dir=DEFAULT_INDEX_DIR, batch_size=256):
+    """
+    Builds a local index from a resumes JSON or JSON Lines file without Qdrant.
+
+    Embeddings go through the shared embedding cache, so resumes already ingested
+    into Qdrant are not embedded again.
+
+    Args:
+        json_file_path (str): Path to the resumes JSON or JSON Lines file.
+        model_name (str): Name of the embedding model.
+        index_dir (str): Directory the index is written to.
+        batch_size (int): Number of resumes embedded per batch.
+    """
+    embeddings = cached_ollama_embeddings(model_name)
+    writer = LocalIndexWriter(index_dir)
+    seen = set()
+    for batch in batched(iter_json_records(json_file_path), batch_size):
+        records = []
+        for resume in batch:
+            id_ = point_id(resume)
+            if id_ not in seen:
+                seen.add(id_)
+                records.append((id_, resume))
+        texts = [aggregate_resume_data(resume) for _, resume in records]
+        if texts:
+            writer.add([id_ for id_, _ in records], embeddings.embed_documents(texts), texts,
+                       [resume for _, resume in records])
+    writer.close()
+    print(f"Local index with {len(writer.ids)} resumes written to {index_dir}")
+
+
+def export_index_from_qdrant(qdrant_host, qdrant_port, collection_name, index_dir=DEFAULT_INDEX_DIR, batch_size=256):
+    """
+    Builds a local index from the dense vectors and payloads stored in a Qdrant collection.
+
+    Args:
+        qdrant_host (str): Host address for the Qdrant server.
+        qdrant_port (int): Port number for the Qdrant server.
+        collection_name (str): Name of the Qdrant collection.
+        index_dir (str): Directory the index is written to.
+        batch_size (int): Number of points fetched per scroll request.
+
+    Raises:
+        ValueError: For section collections, whose best-section (MAX_SIM) scoring the local
+            index cannot reproduce; build the index with build_index_from_json instead.
+    """
+    client = QdrantClient(host=qdrant_host, port=qdrant_port)
+    if is_section_collection(client.get_collection(collection_name)):
+        raise ValueError(
+            f"'{collection_name}' stores section vectors, which the local index does not support. "
+            "Build the index from the resumes JSON with build_index_from_json instead."
+        )
+    writer = LocalIndexWriter(index_dir)
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection_name, limit=batch_size, offset=offset, with_payload=True, with_vectors=True,
+        )
+        if points:
+            # Hybrid collections return named vectors; the dense one is unnamed
+            vectors = [point.vector[''] if isinstance(point.vector, dict) else point.vector for point in points]
+            writer.add(
+                [point.id for point in points], vectors,
+                [point.payload.get('page_content') for point in points],
+                [point.payload.get('metadata') or {} for point in points],
+            )
+        if offset is None:
+            break
+    writer.close()
+    print(f"Local index with {len(writer.ids)} resumes exported from '{collection_name}' to {index_dir}")
+
+
+if __name__ == '__main__':
+    build_index_from_json(
+        json_file_path='resumes_json.json',
+        model_name="llama3.2",
+    )
@@ -1,97 +1,772 @@
 import os
 import json
-from fastapi import FastAPI, HTTPException, Query
-from typing import List
+import time
+import asyncio
+import httpx
+from contextlib import asynccontextmanager, nullcontext
+from fastapi import FastAPI, HTTPException, Query, Request, Depends
+from fastapi.responses import StreamingResponse, Response, JSONResponse
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+from pydantic import BaseModel, ConfigDict, Field
+from typing import List, Optional, Union
 from langchain_ollama.llms import OllamaLLM
 from langchain_ollama import OllamaEmbeddings
-from langchain_qdrant import QdrantVectorStore
-from qdrant_client import QdrantClient
-from fastapi.concurrency import run_in_threadpool
+from qdrant_client import AsyncQdrantClient
 from functools import lru_cache
 from format import job_description_format
-import asyncio
-
-# Initialize FastAPI app
-app = FastAPI()
+from llm_cache import LLMCache, cache_key
+from aggregate_data import aggregate_job_description_data
+from precompute_job_matches import (
+    JobMatchStore, job_match_request, job_match_request_for_vector, format_job_matches, collection_versions,
+)
+from retrieval import ResumeFilters, QdrantRetriever, LocalRetriever
+from section_index import SECTION_VECTOR_NAME, dense_resume_vector
+from local_index import LocalIndex, DEFAULT_INDEX_DIR
+from projection import Projection, ProjectedEmbeddings
+from structured_output import StructuredOutputStats, ainvoke_structured, schema_for_template
+from instrumentation import (
+    stage_timer, timed_stage, LLMMetricsCallback, observe_event_loop, HTTP_REQUEST_SECONDS, HTTP_REQUESTS_IN_FLIGHT,
+)
+from query_cache import TTLCache, QueryResultCache, query_cache_key, normalize_query_text
+from admission import AdmissionController, Coalescer, OverloadedError
+from reranking import Reranker
+from resume_store import ResumeStore
 
 # Qdrant and embeddings settings
 QDRANT_HOST = "localhost"
 QDRANT_PORT = 6333
-COLLECTION_NAME = "resume_collection"
+QDRANT_PREFER_GRPC = False
+# Resume collection searched; set to a collection ingested with sections=True for section-level matching
+COLLECTION_NAME = os.environ.get("RESUME_COLLECTION", "resume_collection")
+JOB_COLLECTION_NAME = "jobdescription_collection"
 EMBEDDING_MODEL = "llama3.2"
 
-# Initialize clients (reuse connections)
+# Connection pool sizes for the Ollama and Qdrant HTTP clients
+OLLAMA_MAX_CONNECTIONS = 16
+QDRANT_MAX_CONNECTIONS = 32
+
+# Largest top_k a request may ask for
+MAX_TOP_K = 100
+
+# Batch matching: concurrent LLM structuring calls and queries per Qdrant batch search
+BATCH_LLM_CONCURRENCY = 4
+BATCH_SEARCH_SIZE = 32
+
+# Hybrid search: candidates fetched per retriever (multiples of top_k) before rank fusion
+HYBRID_PREFETCH_FACTOR = 4
+
+# Resume retrieval backend: "qdrant", or "local" for the in-process index built by local_index.py
+RETRIEVAL_BACKEND = os.environ.get("RETRIEVAL_BACKEND", "qdrant")
+LOCAL_INDEX_DIR = os.environ.get("LOCAL_INDEX_DIR", DEFAULT_INDEX_DIR)
+LOCAL_INDEX_QUANTIZED = os.environ.get("LOCAL_INDEX_QUANTIZED", "false").lower() == "true"
+
+# Projection the collections were ingested with (see projection.py), applied to query vectors
+PROJECTION_PATH = os.environ.get("PROJECTION_PATH")
+
+# Quantized collections: candidates searched on quantized vectors (multiple of top_k) before rescoring
+QUANTIZATION_OVERSAMPLING = float(os.environ.get("QUANTIZATION_OVERSAMPLING", "2.0"))
+
+# Query caches: results per exact request, embeddings per normalized query text
+QUERY_CACHE_TTL = float(os.environ.get("QUERY_CACHE_TTL", "300"))
+QUERY_RESULT_CACHE_SIZE = 1024
+QUERY_EMBEDDING_CACHE_SIZE = 4096
+
+# Admission control for LLM structuring: concurrent calls, calls waiting for a slot and the
+# longest wait (seconds) before a call is shed with 429. Match LLM_MAX_CONCURRENCY to OLLAMA_NUM_PARALLEL.
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", "4"))
+LLM_MAX_QUEUE = int(os.environ.get("LLM_MAX_QUEUE", "32"))
+LLM_QUEUE_TIMEOUT = float(os.environ.get("LLM_QUEUE_TIMEOUT", "30"))
+
+# Re-ranking: candidates fetched (multiple of top_k), time budget per request in seconds and
+# candidates rated by the LLM judge
+RERANK_CANDIDATE_FACTOR = 5
+RERANK_BUDGET_SECONDS = float(os.environ.get("RERANK_BUDGET_SECONDS", "2.0"))
+RERANK_JUDGE_CANDIDATES = 10
+
+# Local store of full resume records, for collections ingested with resume_store_path (see
+# resume_store.py). Results are then hydrated from it and Qdrant only returns IDs and scores.
+RESUME_STORE_PATH = os.environ.get("RESUME_STORE_PATH")
+# Resume fields returned per result unless the request projects others with fields=
+DEFAULT_RESULT_FIELDS = ("content",)
+
+@lru_cache()
+def get_llm_cache():
+    return LLMCache()
+
 @lru_cache()
-def get_qdrant_client():
-    return QdrantClient(host=QDRANT_HOST, port=QDRANT_PORT)
+def get_job_match_store():
+    return JobMatchStore()
 
 @lru_cache()
-def get_ollama_embeddings():
-    return OllamaEmbeddings(model=EMBEDDING_MODEL)
+def get_structured_output_stats():
+    return StructuredOutputStats()
+
+@lru_cache()
+def get_result_cache():
+    return QueryResultCache(COLLECTION_NAME, max_entries=QUERY_RESULT_CACHE_SIZE, ttl=QUERY_CACHE_TTL)
+
+@lru_cache()
+def get_query_embedding_cache():
+    return TTLCache(max_entries=QUERY_EMBEDDING_CACHE_SIZE, ttl=QUERY_CACHE_TTL)
+
+@lru_cache()
+def get_resume_store():
+    return ResumeStore(RESUME_STORE_PATH) if RESUME_STORE_PATH else None
+
+# Build service clients once per process and share their connection pools across requests
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    ollama_kwargs = {
+        "limits": httpx.Limits(
+            max_connections=OLLAMA_MAX_CONNECTIONS,
+            max_keepalive_connections=OLLAMA_MAX_CONNECTIONS,
+        ),
+        "timeout": httpx.Timeout(120.0),
+    }
+    app.state.llm = OllamaLLM(model=EMBEDDING_MODEL, client_kwargs=ollama_kwargs, callbacks=[LLMMetricsCallback()])
+    app.state.embeddings = OllamaEmbeddings(model=EMBEDDING_MODEL, client_kwargs=ollama_kwargs)
+    if PROJECTION_PATH:
+        app.state.embeddings = ProjectedEmbeddings(app.state.embeddings, Projection.load(PROJECTION_PATH))
+    app.state.qdrant = AsyncQdrantClient(
+        host=QDRANT_HOST,
+        port=QDRANT_PORT,
+        prefer_grpc=QDRANT_PREFER_GRPC,
+        limits=httpx.Limits(
+            max_connections=QDRANT_MAX_CONNECTIONS,
+            max_keepalive_connections=QDRANT_MAX_CONNECTIONS,
+        ),
+    )
+    if RETRIEVAL_BACKEND == "local":
+        local_index = LocalIndex(LOCAL_INDEX_DIR, quantized=LOCAL_INDEX_QUANTIZED)
+        app.state.retriever = LocalRetriever(local_index)
+    else:
+        local_index = None
+        app.state.retriever = await QdrantRetriever.create(
+            app.state.qdrant, COLLECTION_NAME, prefetch_factor=HYBRID_PREFETCH_FACTOR,
+            oversampling=QUANTIZATION_OVERSAMPLING,
+        )
+    app.state.llm_admission = AdmissionController(
+        "llm_admission", max_concurrency=LLM_MAX_CONCURRENCY, max_queue=LLM_MAX_QUEUE, queue_timeout=LLM_QUEUE_TIMEOUT,
+    )
+    # Identical concurrent requests share one structuring call and one search
+    app.state.structuring_coalescer = Coalescer("structuring")
+    app.state.request_coalescer = Coalescer("similar_resumes")
+    app.state.reranker = Reranker(
+        budget_seconds=RERANK_BUDGET_SECONDS, judge_candidates=RERANK_JUDGE_CANDIDATES, admission=app.state.llm_admission,
+    )
+    yield
+    await app.state.qdrant.close()
+    if local_index is not None:
+        local_index.close()
+
+# Initialize FastAPI app
+app = FastAPI(lifespan=lifespan)
+
+# Record latency of every request by route template, and the number of requests in flight
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    HTTP_REQUESTS_IN_FLIGHT.inc()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        HTTP_REQUESTS_IN_FLIGHT.dec()
+        route = request.scope.get("route")
+        HTTP_REQUEST_SECONDS.labels(
+            route.path if route is not None else "unmatched", request.method, str(status)
+        ).observe(time.perf_counter() - start)
+
+# Shed calls rejected by admission control with 429 and a Retry-After hint
+@app.exception_handler(OverloadedError)
+async def overloaded_handler(request: Request, exc: OverloadedError):
+    return JSONResponse(
+        status_code=429, content={"detail": str(exc)}, headers={"Retry-After": str(exc.retry_after)}
+    )
 
 # Helper function: Extract job description and format into JSON
-def job_description_json_format(job_description: str, format_template: str):
-    model = OllamaLLM(model=EMBEDDING_MODEL)
-    prompt = f"""
-        Extract key information from the job description into JSON format:
-        Template: {format_template}
-        Job Description: {job_description}
+@timed_stage("structuring")
+async def job_description_json_format(model: OllamaLLM, job_description: str, format_template: str,
+                                      admission: Optional[AdmissionController] = None,
+                                      coalescer: Optional[Coalescer] = None):
     """
-    response = model.invoke(prompt).replace("\n", "")
-    json_response = json.loads(response)
-    return json_response
+    Cache hits return without an LLM call. Otherwise the call waits for a slot of admission
+    (raising OverloadedError when shed), and concurrent calls for the same text share the
+    call in flight through coalescer.
+    """
+    cache = get_llm_cache()
+    key = cache_key(EMBEDDING_MODEL, format_template, job_description)
+    cached = cache.get(key)
+    if cached is not None:
+        return json.loads(cached)
 
-# Query Qdrant for similar results
-async def query_similar_results(job_description_text: str, top_k: int = 7):
-    try:
-        embeddings = get_ollama_embeddings()
-        client = get_qdrant_client()
-        vector_store = QdrantVectorStore(
-            client=client,
-            collection_name=COLLECTION_NAME,
-            embedding=embeddings,
-        )
+    async def generate():
+        prompt = f"""
+            Extract key information from the job description into JSON format:
+            Template: {format_template}
+            Job Description: {job_description}
+        """
+        async with admission.admit() if admission is not None else nullcontext():
+            json_response = await ainvoke_structured(
+                model, prompt, schema_for_template(format_template), stats=get_structured_output_stats()
+            )
+        cache.put(key, json.dumps(json_response))
+        return json_response
 
-        # Get embeddings for the query text
-        query_embedding = await run_in_threadpool(embeddings.embed_query, job_description_text)
+    if coalescer is None:
+        return await generate()
+    return await coalescer.run(key, generate)
 
-        # Query the vector store
-        results = vector_store.similarity_search_by_vector(
-            embedding=query_embedding,
-            k=top_k,
-        )
+# Structure a job description with the app's LLM under admission control and coalescing
+async def structure_job_description(request: Request, job_description: str):
+    state = request.app.state
+    return await job_description_json_format(
+        state.llm, job_description, job_description_format,
+        admission=state.llm_admission, coalescer=state.structuring_coalescer,
+    )
+
+# Structured job description accepted by the POST endpoint (fields of format.job_description_format)
+class JobDescription(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    job_title: str = ""
+    skills: List[str] = []
+    required_qualifications: List[Union[str, dict]] = []
+    preferred_qualifications: List[Union[str, dict]] = []
+    responsibilities: List[str] = []
+
+# Helper function: Build the text to embed from a structured job description
+def job_description_query_text(formatted_json: dict):
+    return formatted_json.get("aggregate_content") or aggregate_job_description_data(formatted_json)
+
+# Filters on structured resume fields, applied by the retrieval backend
+def resume_filters(
+    skills: List[str] = Query([], description="Only return resumes listing all of these skills"),
+    certifications: List[str] = Query([], description="Only return resumes listing all of these certifications"),
+    languages: List[str] = Query([], description="Only return resumes listing all of these languages"),
+    education_years: List[str] = Query([], description="Only return resumes with a degree from one of these years"),
+):
+    return ResumeFilters(
+        skills=skills, certifications=certifications, languages=languages, education_years=education_years
+    )
+
+# Resume fields returned per result: "content", "metadata" (the whole resume) or top-level
+# resume fields such as "Skills"; none for IDs and scores only
+def validate_result_fields(fields: List[str]):
+    unknown = [field for field in fields if field not in ResumeStore.fields() and field != "metadata"]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown resume fields: {', '.join(unknown)}")
+    return tuple(fields)
+
+def result_fields(
+    fields: str = Query(",".join(DEFAULT_RESULT_FIELDS), description="Comma-separated resume fields to return per result (content, metadata or top-level fields like Skills); empty for IDs and scores only"),
+):
+    return validate_result_fields([field.strip() for field in fields.split(",") if field.strip()])
+
+# Request body for matching many job descriptions at once
+class BatchMatchRequest(BaseModel):
+    job_descriptions: List[Union[JobDescription, str]]
+    top_k: int = Field(7, ge=1, le=MAX_TOP_K)
+    raw: bool = False
+    rerank: bool = False
+    llm_judge: bool = False
+    filters: ResumeFilters = ResumeFilters()
+    fields: List[str] = list(DEFAULT_RESULT_FIELDS)
+
+# Payload a search fetches for the requested fields: none when results are hydrated from the
+# resume store, otherwise the text and, for other fields or re-ranking, the resume metadata
+def payload_selection(fields, rerank: bool = False):
+    if get_resume_store() is not None:
+        return {"with_content": False, "with_metadata": False}
+    return {
+        "with_content": rerank or "content" in fields,
+        "with_metadata": rerank or any(field != "content" for field in fields),
+    }
+
+def hit_field(hit: dict, field: str):
+    if field == "content":
+        return hit.get("content")
+    metadata = hit.get("metadata") or {}
+    return metadata if field == "metadata" else metadata.get(field)
+
+# Build API results with only the requested fields, reading from the resume store the ones
+# the hits do not already carry
+def hydrate_results(hits: List[dict], fields):
+    store = get_resume_store()
+    missing = [
+        field for field in fields
+        if not all(("content" if field == "content" else "metadata") in hit for hit in hits)
+    ]
+    records = {}
+    if store is not None and missing and hits:
+        with stage_timer("hydration"):
+            records = store.get_many([hit["id"] for hit in hits], missing)
+    results = []
+    for hit in hits:
+        record = records.get(hit["id"], {})
+        result = {"id": hit["id"]}
+        for field in fields:
+            result[field] = record[field] if field in record else hit_field(hit, field)
+        result["similarity"] = hit["similarity"]
+        if "rerank_score" in hit:
+            result["rerank_score"] = hit["rerank_score"]
+        results.append(result)
+    return results
+
+# Embed query texts, reusing cached embeddings of texts that normalize to the same string
+async def embed_query_texts(embeddings, texts: List[str]):
+    cache = get_query_embedding_cache()
+    keys = [normalize_query_text(text) for text in texts]
+    vectors = [cache.get(key) for key in keys]
+    missing = {}
+    for key, text, vector in zip(keys, texts, vectors):
+        if vector is None and key not in missing:
+            missing[key] = text
+    if missing:
+        for key, vector in zip(missing, await embeddings.aembed_documents(list(missing.values()))):
+            cache.put(key, vector)
+            missing[key] = vector
+    return [vector if vector is not None else missing[key] for key, vector in zip(keys, vectors)]
+
+# Search resumes for many query texts: one embedding call, then batched searches
+async def iter_similar_results_batch(request: Request, texts: List[str], top_k: int = 7,
+                                     filters: Optional[ResumeFilters] = None, with_metadata: bool = False,
+                                     with_content: bool = True):
+    """
+    Yields (index, results) pairs, one backend batch search of BATCH_SEARCH_SIZE queries at a time.
+    """
+    embeddings = request.app.state.embeddings
+    retriever = request.app.state.retriever
+
+    with stage_timer("embedding"):
+        query_embeddings = await embed_query_texts(embeddings, texts)
+
+    for start in range(0, len(query_embeddings), BATCH_SEARCH_SIZE):
+        chunk = query_embeddings[start:start + BATCH_SEARCH_SIZE]
+        with stage_timer("search"):
+            hits = await retriever.search_batch(
+                texts[start:start + BATCH_SEARCH_SIZE], chunk, top_k, filters,
+                with_metadata=with_metadata, with_content=with_content,
+            )
+        for offset, results in enumerate(hits):
+            yield start + offset, results
 
-        # Include similarity scores
-        return [
-            {"content": result.page_content, "similarity": result.score}
-            for result in sorted(results, key=lambda x: x.score, reverse=True)
-        ]
+async def query_similar_results_batch(request: Request, texts: List[str], top_k: int = 7,
+                                      filters: Optional[ResumeFilters] = None, with_metadata: bool = False,
+                                      with_content: bool = True):
+    results = [None] * len(texts)
+    async for index, hits in iter_similar_results_batch(
+        request, texts, top_k=top_k, filters=filters, with_metadata=with_metadata, with_content=with_content
+    ):
+        results[index] = hits
+    return results
 
+# Query the retrieval backend for similar results
+async def query_similar_results(request: Request, job_description_text: str, top_k: int = 7,
+                                filters: Optional[ResumeFilters] = None, with_metadata: bool = False,
+                                with_content: bool = True):
+    try:
+        results = await query_similar_results_batch(
+            request, [job_description_text], top_k=top_k, filters=filters,
+            with_metadata=with_metadata, with_content=with_content,
+        )
+        return results[0]
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error querying similar results: {e}")
 
+# Re-rank a wider candidate pool (searched with payload_selection(..., rerank=True)) for a
+# structured job description. Candidates are hydrated from the resume store when there is one.
+async def rerank_results(request: Request, job: dict, hits: List[dict], top_k: int, llm_judge: bool = False):
+    state = request.app.state
+    store = get_resume_store()
+    if store is not None and hits:
+        with stage_timer("hydration"):
+            records = store.get_many([hit["id"] for hit in hits], ["content", "metadata"])
+        hits = [{**hit, **records.get(hit["id"], {})} for hit in hits]
+    ranked = await state.reranker.rerank(
+        job, hits, top_k, model=state.llm if llm_judge else None, stats=get_structured_output_stats()
+    )
+    # The reranker drops metadata; keep it for hydrate_results
+    metadata = {hit["id"]: hit.get("metadata") or {} for hit in hits}
+    return [{**hit, "metadata": metadata[hit["id"]]} for hit in ranked]
+
+# Query similar results for a structured job description, optionally re-ranked
+async def query_ranked_results(request: Request, job: dict, text: str, top_k: int,
+                               filters: Optional[ResumeFilters] = None, rerank: bool = False,
+                               llm_judge: bool = False, fields=DEFAULT_RESULT_FIELDS):
+    selection = payload_selection(fields, rerank=rerank)
+    if not rerank:
+        hits = await query_similar_results(request, text, top_k=top_k, filters=filters, **selection)
+    else:
+        candidates = await query_similar_results(
+            request, text, top_k=top_k * RERANK_CANDIDATE_FACTOR, filters=filters, **selection
+        )
+        hits = await rerank_results(request, job, candidates, top_k, llm_judge=llm_judge)
+    return hydrate_results(hits, fields)
+
 # API endpoint for GET request
 @app.get("/similar-resumes", response_model=List[dict])
 async def get_similar_resumes(
+    request: Request,
     job_description: str = Query(..., description="Job description text to find similar resumes"),
-    top_k: int = Query(7, description="Number of similar resumes to retrieve"),
+    top_k: int = Query(7, ge=1, le=MAX_TOP_K, description="Number of similar resumes to retrieve"),
+    raw: bool = Query(False, description="Embed the job description text directly, skipping LLM structuring"),
+    rerank: bool = Query(False, description="Re-rank a wider candidate pool on skills, experience and education"),
+    llm_judge: bool = Query(False, description="Also rate the best re-ranked candidates with the LLM"),
+    filters: ResumeFilters = Depends(resume_filters),
+    fields: tuple = Depends(result_fields),
 ):
     """
     GET endpoint to retrieve similar resumes based on the provided job description.
+    With rerank, RERANK_CANDIDATE_FACTOR times top_k candidates are re-scored within
+    RERANK_BUDGET_SECONDS; re-ranking needs the structured job description and is skipped with raw.
+    Results of identical requests are served from the query result cache, and identical
+    requests arriving together share one computation. When the LLM is saturated the
+    request is rejected with 429 and a Retry-After header. Every result carries its id, similarity
+    and the requested fields, which come from the resume store when RESUME_STORE_PATH is set.
     """
-    try:
-        # Process job description JSON
-        formatted_json = await run_in_threadpool(
-            job_description_json_format,
-            job_description,
-            job_description_format,
-        )
-        aggregate_content = formatted_json.get("aggregate_content")
-    except Exception as e:
-        raise HTTPException(
-            status_code=500, detail=f"Error processing job description: {e}"
+    result_cache = get_result_cache()
+    key = query_cache_key("GET", job_description, top_k, raw, rerank, llm_judge, filters.model_dump(), fields)
+    cached = result_cache.get(key)
+    if cached is not None:
+        return cached
+
+    async def compute():
+        formatted_json = None
+        if raw:
+            aggregate_content = job_description
+        else:
+            try:
+                # Process job description JSON
+                formatted_json = await structure_job_description(request, job_description)
+                aggregate_content = job_description_query_text(formatted_json)
+            except OverloadedError:
+                raise
+            except Exception as e:
+                raise HTTPException(
+                    status_code=500, detail=f"Error processing job description: {e}"
+                )
+
+        # Query for similar results
+        similar_results = await query_ranked_results(
+            request, formatted_json, aggregate_content, top_k=top_k, filters=filters,
+            rerank=rerank and formatted_json is not None, llm_judge=llm_judge, fields=fields,
         )
+        result_cache.put(key, similar_results)
+        return similar_results
+
+    return await request.app.state.request_coalescer.run(key, compute)
+
+# API endpoint for already structured job descriptions
+@app.post("/similar-resumes", response_model=List[dict])
+async def post_similar_resumes(
+    request: Request,
+    job_description: JobDescription,
+    top_k: int = Query(7, ge=1, le=MAX_TOP_K, description="Number of similar resumes to retrieve"),
+    rerank: bool = Query(False, description="Re-rank a wider candidate pool on skills, experience and education"),
+    llm_judge: bool = Query(False, description="Also rate the best re-ranked candidates with the LLM"),
+    filters: ResumeFilters = Depends(resume_filters),
+    fields: tuple = Depends(result_fields),
+):
+    """
+    POST endpoint to retrieve similar resumes for a job description that is already structured
+    like format.job_description_format. The text is aggregated locally, without an LLM call.
+    """
+    result_cache = get_result_cache()
+    key = query_cache_key("POST", job_description.model_dump(), top_k, rerank, llm_judge, filters.model_dump(), fields)
+    cached = result_cache.get(key)
+    if cached is not None:
+        return cached
 
-    # Query for similar results
-    similar_results = await query_similar_results(aggregate_content, top_k=top_k)
+    job = job_description.model_dump()
+    aggregate_content = aggregate_job_description_data(job)
+    similar_results = await query_ranked_results(
+        request, job, aggregate_content, top_k=top_k, filters=filters, rerank=rerank, llm_judge=llm_judge,
+        fields=fields,
+    )
+    result_cache.put(key, similar_results)
     return similar_results
+
+# Search resumes for one query text, timing the embedding and search stages
+async def timed_search(request: Request, text: str, top_k: int, filters: Optional[ResumeFilters] = None,
+                       with_metadata: bool = False, with_content: bool = True):
+    with stage_timer("embedding") as embedding_timer:
+        vectors = await embed_query_texts(request.app.state.embeddings, [text])
+    with stage_timer("search") as search_timer:
+        hits = await request.app.state.retriever.search_batch(
+            [text], vectors, top_k, filters, with_metadata=with_metadata, with_content=with_content
+        )
+    return hits[0], {"embedding_ms": embedding_timer.ms, "search_ms": search_timer.ms}
+
+# Encode a stream event as an NDJSON line or a server-sent event
+def format_stream_event(event: dict, sse: bool):
+    if sse:
+        return f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+    return json.dumps(event) + "\n"
+
+# API endpoint for the streaming variant of GET /similar-resumes
+@app.get("/similar-resumes/stream")
+async def stream_similar_resumes(
+    request: Request,
+    job_description: str = Query(..., description="Job description text to find similar resumes"),
+    top_k: int = Query(7, ge=1, le=MAX_TOP_K, description="Number of similar resumes to retrieve"),
+    raw: bool = Query(False, description="Embed the job description text directly, skipping LLM structuring"),
+    speculative: bool = Query(True, description="Search with the raw text while the LLM structures it and send those hits first"),
+    rerank: bool = Query(False, description="Re-rank a wider candidate pool on skills, experience and education"),
+    llm_judge: bool = Query(False, description="Also rate the best re-ranked candidates with the LLM"),
+    filters: ResumeFilters = Depends(resume_filters),
+    fields: tuple = Depends(result_fields),
+):
+    """
+    Streaming variant of GET /similar-resumes that reports each stage as it completes.
+
+    Events are NDJSON lines, or server-sent events when the client accepts text/event-stream:
+    - "provisional": hits of the raw-text search that runs in parallel with LLM structuring
+      (speculative mode only; skipped if structuring finishes first),
+    - "structured": the LLM structuring stage finished,
+    - "final": hits for the structured job description, identical to GET /similar-resumes,
+    - "error": a stage failed,
+    - "done": timings of every stage.
+    Every event carries elapsed_ms since the request started.
+    """
+    sse = "text/event-stream" in request.headers.get("accept", "")
+    key = query_cache_key("GET", job_description, top_k, raw, rerank, llm_judge, filters.model_dump(), fields)
+    result_cache = get_result_cache()
+
+    async def stream():
+        start = time.perf_counter()
+        timings = {}
+
+        def event(name, **fields):
+            fields["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 1)
+            return format_stream_event({"event": name, **fields}, sse)
+
+        cached = result_cache.get(key)
+        if cached is not None:
+            yield event("final", results=cached, cached=True)
+            yield event("done", timings=timings)
+            return
+
+        async def structure():
+            stage_start = time.perf_counter()
+            formatted_json = await structure_job_description(request, job_description)
+            timings["structuring_ms"] = round((time.perf_counter() - stage_start) * 1000, 1)
+            return formatted_json
+
+        formatted_json = None
+        if raw:
+            query_text = job_description
+        else:
+            structuring = asyncio.create_task(structure())
+            provisional = asyncio.create_task(
+                timed_search(request, job_description, top_k, filters, **payload_selection(fields))
+            ) if speculative else None
+            try:
+                if provisional is not None:
+                    await asyncio.wait({structuring, provisional}, return_when=asyncio.FIRST_COMPLETED)
+                    if provisional.done() and not structuring.done():
+                        try:
+                            hits, provisional_timings = provisional.result()
+                            timings.update({f"provisional_{name}": value for name, value in provisional_timings.items()})
+                            yield event("provisional", results=hydrate_results(hits, fields))
+                        except Exception as e:
+                            yield event("error", stage="provisional", detail=f"Error querying similar results: {e}")
+                formatted_json = await structuring
+                query_text = job_description_query_text(formatted_json)
+                yield event("structured", query_text=query_text)
+            except OverloadedError as e:
+                yield event("error", stage="structuring", status=429, retry_after=e.retry_after, detail=str(e))
+                yield event("done", timings=timings)
+                return
+            except Exception as e:
+                yield event("error", stage="structuring", detail=f"Error processing job description: {e}")
+                yield event("done", timings=timings)
+                return
+            finally:
+                # The structured search supersedes the provisional one
+                if provisional is not None:
+                    if not provisional.done():
+                        provisional.cancel()
+                    elif not provisional.cancelled():
+                        provisional.exception()
+
+        ranked = rerank and formatted_json is not None
+        try:
+            hits, search_timings = await timed_search(
+                request, query_text, top_k * RERANK_CANDIDATE_FACTOR if ranked else top_k, filters,
+                **payload_selection(fields, rerank=ranked),
+            )
+        except Exception as e:
+            yield event("error", stage="search", detail=f"Error querying similar results: {e}")
+            yield event("done", timings=timings)
+            return
+        timings.update(search_timings)
+        if ranked:
+            stage_start = time.perf_counter()
+            hits = await rerank_results(request, formatted_json, hits, top_k, llm_judge=llm_judge)
+            timings["rerank_ms"] = round((time.perf_counter() - stage_start) * 1000, 1)
+        hits = hydrate_results(hits, fields)
+        result_cache.put(key, hits)
+        yield event("final", results=hits)
+        timings["total_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        yield event("done", timings=timings)
+
+    return StreamingResponse(stream(), media_type="text/event-stream" if sse else "application/x-ndjson")
+
+# Prometheus metrics: stage and request latencies, LLM calls and tokens, queue and pool saturation
+@app.get("/metrics")
+async def get_metrics():
+    observe_event_loop()
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+# Success rate and retries of LLM job description structuring
+@app.get("/structured-output-stats")
+async def get_structured_output_stats_endpoint():
+    return get_structured_output_stats().stats()
+
+# Hit rates of the query, embedding and LLM caches
+@app.get("/cache-stats")
+async def get_cache_stats():
+    return {
+        "results": get_result_cache().stats(),
+        "query_embeddings": get_query_embedding_cache().stats(),
+        "llm": get_llm_cache().stats(),
+    }
+
+# Load on the LLM admission limiter and identical requests currently sharing a computation
+@app.get("/admission-stats")
+async def get_admission_stats(request: Request):
+    state = request.app.state
+    return {
+        **state.llm_admission.stats(),
+        "coalescing": {
+            "structuring": len(state.structuring_coalescer),
+            "similar_resumes": len(state.request_coalescer),
+        },
+    }
+
+# API endpoint for resume-to-jobs matching
+@app.get("/similar-jobs/{resume_id}", response_model=List[dict])
+async def get_similar_jobs(
+    request: Request,
+    resume_id: str,
+    top_k: int = Query(7, ge=1, le=MAX_TOP_K, description="Number of job descriptions to retrieve"),
+    precomputed: bool = Query(True, description="Serve matches from the table built by precompute_job_matches.py when available"),
+):
+    """
+    GET endpoint to retrieve job descriptions matching a stored resume.
+
+    Matches come from the precomputed table when it holds at least top_k of them and neither
+    collection was ingested since it was computed. Otherwise the resume's stored vector is
+    looked up by point ID in Qdrant, so no model is called. On section collections the resume
+    is matched by the mean of its section vectors.
+    """
+    if precomputed:
+        with stage_timer("job_match_lookup"):
+            store = get_job_match_store()
+            current = store.is_current(collection_versions(COLLECTION_NAME, JOB_COLLECTION_NAME))
+            matches = store.get(resume_id, top_k) if current else None
+        if matches is not None and len(matches) >= top_k:
+            return matches
+
+    try:
+        if getattr(request.app.state.retriever, "sections", False):
+            # Section points have no single vector Qdrant could look up
+            points = await request.app.state.qdrant.retrieve(
+                COLLECTION_NAME, ids=[resume_id], with_payload=False, with_vectors=[SECTION_VECTOR_NAME]
+            )
+            if not points:
+                raise HTTPException(status_code=404, detail=f"Resume {resume_id} not found")
+            match_request = job_match_request_for_vector(dense_resume_vector(points[0].vector), top_k)
+        else:
+            match_request = job_match_request(resume_id, COLLECTION_NAME, top_k)
+        with stage_timer("job_search"):
+            response = await request.app.state.qdrant.query_points(
+                collection_name=JOB_COLLECTION_NAME,
+                query=match_request.query,
+                lookup_from=match_request.lookup_from,
+                limit=match_request.limit,
+                with_payload=match_request.with_payload,
+            )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=404 if "not found" in str(e).lower() else 500, detail=f"Error querying similar jobs: {e}")
+    return format_job_matches(response.points)
+
+# API endpoint for matching many job descriptions in one call
+@app.post("/similar-resumes/batch")
+async def post_similar_resumes_batch(request: Request, batch: BatchMatchRequest):
+    """
+    POST endpoint to match many job descriptions against the resume collection.
+
+    Structured job descriptions are aggregated locally; text job descriptions are structured
+    by the LLM unless raw is set. With rerank, results of structured job descriptions are
+    re-ranked like GET /similar-resumes. Job descriptions are searched as soon as their
+    structuring finishes: the ones that are ready together are embedded in one call and
+    searched in Qdrant batches. Results are streamed as NDJSON lines of {"index", "results"}
+    (or {"index", "error"}) as they complete; results carry the fields listed in fields.
+    """
+    fields = validate_result_fields(batch.fields)
+    semaphore = asyncio.Semaphore(BATCH_LLM_CONCURRENCY)
+    top_k = batch.top_k * RERANK_CANDIDATE_FACTOR if batch.rerank else batch.top_k
+
+    async def resolve(index, item):
+        # Returns (index, (structured job description or None, query text)), or (index, exception)
+        try:
+            if isinstance(item, JobDescription):
+                job = item.model_dump()
+                return index, (job, aggregate_job_description_data(job))
+            if batch.raw:
+                return index, (None, item)
+            async with semaphore:
+                formatted_json = await structure_job_description(request, item)
+            return index, (formatted_json, job_description_query_text(formatted_json))
+        except Exception as e:
+            return index, e
+
+    async def search(ready):
+        # Searches the job descriptions resolved so far and yields their NDJSON lines
+        sent = set()
+        try:
+            async for position, hits in iter_similar_results_batch(
+                request, [text for _, (_, text) in ready], top_k=top_k,
+                filters=batch.filters, **payload_selection(fields, rerank=batch.rerank),
+            ):
+                index, (job, _) = ready[position]
+                if batch.rerank and job is not None:
+                    hits = await rerank_results(request, job, hits, batch.top_k, llm_judge=batch.llm_judge)
+                elif batch.rerank:
+                    hits = hits[:batch.top_k]
+                sent.add(index)
+                yield json.dumps({"index": index, "results": hydrate_results(hits, fields)}) + "\n"
+        except Exception as e:
+            for index, _ in ready:
+                if index not in sent:
+                    yield json.dumps({"index": index, "error": f"Error querying similar results: {e}"}) + "\n"
+
+    async def stream():
+        pending = {asyncio.ensure_future(resolve(index, item)) for index, item in enumerate(batch.job_descriptions)}
+        try:
+            while pending:
+                # Everything that finished while the previous group was searched is searched together
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                ready = []
+                for index, outcome in sorted(task.result() for task in done):
+                    if isinstance(outcome, OverloadedError):
+                        yield json.dumps({"index": index, "error": str(outcome), "retry_after": outcome.retry_after}) + "\n"
+                    elif isinstance(outcome, Exception):
+                        yield json.dumps({"index": index, "error": f"Error processing job description: {outcome}"}) + "\n"
+                    else:
+                        ready.append((index, outcome))
+                if ready:
+                    async for line in search(ready):
+                        yield line
+        finally:
+            # The client disconnected; stop structuring the remaining job descriptions
+            for task in pending:
+                task.cancel()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
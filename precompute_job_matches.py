@@ -0,0 +1,213 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import LookupLocation, QueryRequest
+from section_index import dense_resume_vector
+from query_cache import collection_version
+
+DEFAULT_MATCHES_PATH = os.path.join('.cache', 'job_matches.sqlite')
+
+
+def job_match_request(resume_id, resume_collection, top_k):
+    """
+    Builds a query that searches job descriptions with the stored vector of a resume.
+
+    The resume is referenced by its point ID and Qdrant looks its vector up in
+    resume_collection, so nothing is re-embedded. Section collections have no single
+    vector to look up; use job_match_request_for_vector with dense_resume_vector there.
+    """
+    return QueryRequest(
+        query=resume_id,
+        lookup_from=LookupLocation(collection=resume_collection),
+        limit=top_k,
+        with_payload=["page_content", "metadata.job_title"],
+    )
+
+
+def job_match_request_for_vector(vector, top_k):
+    """
+    Builds the same query as job_match_request from an already fetched resume vector.
+    """
+    return QueryRequest(query=vector, limit=top_k, with_payload=["page_content", "metadata.job_title"])
+
+
+def collection_versions(resume_collection, job_collection):
+    """
+    Returns the version markers (see query_cache.py) of the two collections job matches are computed from.
+    """
+    return {name: collection_version(name) for name in (resume_collection, job_collection)}
+
+
+def format_job_matches(points):
+    """
+    Converts scored job description points into API results.
+    """
+    return [
+        {
+            "id": str(point.id),
+            "job_title": (point.payload.get("metadata") or {}).get("job_title"),
+            "content": point.payload.get("page_content"),
+            "similarity": point.score,
+        }
+        for point in sorted(points, key=lambda x: x.score, reverse=True)
+    ]
+
+
+class JobMatchStore:
+    """
+    SQLite table of precomputed top-k job descriptions for every resume.
+
+    The table records the collection versions it was computed at; once an ingest bumps
+    either collection, is_current turns False until the matches are computed again.
+    """
+
+    def __init__(self, path=DEFAULT_MATCHES_PATH):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS resume_job_matches ('
+            'resume_id TEXT NOT NULL, rank INTEGER NOT NULL, match TEXT NOT NULL, computed_at REAL NOT NULL, '
+            'PRIMARY KEY (resume_id, rank))'
+        )
+        self._conn.execute('CREATE TABLE IF NOT EXISTS collection_versions (collection TEXT PRIMARY KEY, version TEXT)')
+        self._conn.commit()
+
+    def versions(self):
+        """
+        Returns the collection versions of the last completed precompute, or {} if there was none.
+        """
+        with self._lock:
+            return dict(self._conn.execute('SELECT collection, version FROM collection_versions'))
+
+    def set_versions(self, versions):
+        """
+        Records the collection versions the stored matches were computed at.
+        """
+        with self._lock:
+            self._conn.execute('DELETE FROM collection_versions')
+            self._conn.executemany('INSERT INTO collection_versions VALUES (?, ?)', list(versions.items()))
+            self._conn.commit()
+
+    def is_current(self, versions):
+        """
+        Returns True if the stored matches were computed at the given collection versions.
+        """
+        stored = self.versions()
+        return bool(stored) and stored == versions
+
+    def get(self, resume_id, top_k):
+        """
+        Returns up to top_k precomputed matches for resume_id, or None if it has none.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT match FROM resume_job_matches WHERE resume_id = ? ORDER BY rank LIMIT ?',
+                (resume_id, top_k),
+            ).fetchall()
+        if not rows:
+            return None
+        return [json.loads(row[0]) for row in rows]
+
+    def put_many(self, matches):
+        """
+        Replaces the stored matches of every resume in matches.
+
+        Args:
+            matches (dict): Mapping of resume ID to its ranked list of job matches.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                'DELETE FROM resume_job_matches WHERE resume_id = ?', [(resume_id,) for resume_id in matches]
+            )
+            self._conn.executemany(
+                'INSERT INTO resume_job_matches (resume_id, rank, match, computed_at) VALUES (?, ?, ?, ?)',
+                [
+                    (resume_id, rank, json.dumps(match), now)
+                    for resume_id, ranked in matches.items()
+                    for rank, match in enumerate(ranked)
+                ],
+            )
+            self._conn.commit()
+
+    def delete_except(self, resume_ids):
+        """
+        Drops matches of resumes that are no longer in the resume collection.
+        """
+        with self._lock:
+            stored = {row[0] for row in self._conn.execute('SELECT DISTINCT resume_id FROM resume_job_matches')}
+            removed = [(resume_id,) for resume_id in stored - set(resume_ids)]
+            self._conn.executemany('DELETE FROM resume_job_matches WHERE resume_id = ?', removed)
+            self._conn.commit()
+        return len(removed)
+
+
+def precompute_job_matches(qdrant_host, qdrant_port, resume_collection, job_collection,
+                           top_k=10, batch_size=64, store_path=DEFAULT_MATCHES_PATH):
+    """
+    Computes the top-k job descriptions for every resume and stores them in a SQLite table.
+
+    Args:
+        qdrant_host (str): Host address for the Qdrant server.
+        qdrant_port (int): Port number for the Qdrant server.
+        resume_collection (str): Name of the resume collection.
+        job_collection (str): Name of the job description collection.
+        top_k (int): Number of job matches stored per resume.
+        batch_size (int): Number of resumes searched per Qdrant batch request.
+        store_path (str): Path of the SQLite match table.
+
+    Returns:
+        None
+    """
+    try:
+        client = QdrantClient(host=qdrant_host, port=qdrant_port)
+        store = JobMatchStore(store_path)
+        # Read before computing, so an ingest that runs meanwhile leaves the table stale
+        versions = collection_versions(resume_collection, job_collection)
+
+        resume_ids = []
+        offset = None
+        while True:
+            points, offset = client.scroll(
+                collection_name=resume_collection,
+                limit=batch_size,
+                offset=offset,
+                with_payload=False,
+                with_vectors=True,
+            )
+            ids = [str(point.id) for point in points]
+            if ids:
+                # Reuse the stored resume vectors fetched with the scroll page; section collections
+                # are matched by the mean of their section vectors
+                vectors = [dense_resume_vector(point.vector) for point in points]
+                responses = client.query_batch_points(
+                    collection_name=job_collection,
+                    requests=[job_match_request_for_vector(vector, top_k) for vector in vectors],
+                )
+                store.put_many({
+                    resume_id: format_job_matches(response.points)
+                    for resume_id, response in zip(ids, responses)
+                })
+                resume_ids.extend(ids)
+            if offset is None:
+                break
+
+        removed = store.delete_except(resume_ids)
+        store.set_versions(versions)
+        print(f"Precomputed job matches for {len(resume_ids)} resumes ({removed} stale resumes removed).")
+    except Exception as e:
+        print(f"An unexpected error occurred: {e}")
+
+
+if __name__ == "__main__":
+    precompute_job_matches(
+        qdrant_host="localhost",
+        qdrant_port=6333,
+        resume_collection='resume_collection',
+        job_collection='jobdescription_collection',
+    )
@@ -0,0 +1,118 @@
+import os
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+DEFAULT_PROJECTION_PATH = os.path.join('.cache', 'projection.npz')
+
+
+class Projection:
+    """
+    Linear projection applied to stored and query vectors alike: (v - mean) @ components.T.
+
+    PCA fits the components on corpus vectors. Truncation keeps the first n dimensions,
+    which only preserves similarity for Matryoshka-trained embedding models.
+    """
+
+    def __init__(self, mean, components, method='pca'):
+        self.mean = np.asarray(mean, dtype=np.float32)
+        self.components = np.asarray(components, dtype=np.float32)
+        self.method = method
+
+    @property
+    def dimension(self):
+        return self.components.shape[0]
+
+    @classmethod
+    def fit_pca(cls, vectors, n_components):
+        """
+        Fits a PCA projection on corpus vectors.
+
+        Args:
+            vectors (array): Corpus vectors, one per row.
+            n_components (int): Output dimension.
+
+        Returns:
+            Projection: The fitted projection.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        # Fit on unit vectors, since the collections compare vectors by cosine
+        vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        mean = vectors.mean(axis=0)
+        _, _, vt = np.linalg.svd(vectors - mean, full_matrices=False)
+        if n_components > vt.shape[0]:
+            raise ValueError(f"Cannot fit {n_components} components on {len(vectors)} vectors.")
+        return cls(mean, vt[:n_components], method='pca')
+
+    @classmethod
+    def truncate(cls, dimension, n_components):
+        """
+        Builds a Matryoshka-style projection that keeps the first n_components dimensions.
+        """
+        return cls(np.zeros(dimension, dtype=np.float32), np.eye(dimension, dtype=np.float32)[:n_components],
+                   method='truncate')
+
+    def apply(self, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.method == 'pca':
+            vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=-1, keepdims=True), 1e-12)
+        return (vectors - self.mean) @ self.components.T
+
+    def save(self, path=DEFAULT_PROJECTION_PATH):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        np.savez(path, mean=self.mean, components=self.components, method=self.method)
+
+    @classmethod
+    def load(cls, path=DEFAULT_PROJECTION_PATH):
+        data = np.load(path)
+        return cls(data['mean'], data['components'], method=str(data['method']))
+
+
+class ProjectedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that projects every document and query vector.
+    """
+
+    def __init__(self, embeddings, projection):
+        self.embeddings = embeddings
+        self.projection = projection
+
+    def embed_documents(self, texts):
+        return self.projection.apply(self.embeddings.embed_documents(texts)).tolist()
+
+    def embed_query(self, text):
+        return self.projection.apply(self.embeddings.embed_query(text)).tolist()
+
+    async def aembed_documents(self, texts):
+        return self.projection.apply(await self.embeddings.aembed_documents(texts)).tolist()
+
+    async def aembed_query(self, text):
+        return self.projection.apply(await self.embeddings.aembed_query(text)).tolist()
+
+
+def fit_projection_from_cache(cache, n_components, path=DEFAULT_PROJECTION_PATH, method='pca', sample_size=20000, seed=0):
+    """
+    Fits a projection on the vectors already stored in an embedding cache and saves it.
+
+    Args:
+        cache (EmbeddingCache): Cache holding the corpus vectors.
+        n_components (int): Output dimension.
+        path (str): Where the projection is saved.
+        method (str): "pca" or "truncate".
+        sample_size (int): Maximum number of vectors the PCA is fitted on.
+        seed (int): Seed for the sample.
+
+    Returns:
+        Projection: The saved projection.
+    """
+    vectors = cache.matrix()
+    if method == 'truncate':
+        projection = Projection.truncate(vectors.shape[1], n_components)
+    else:
+        if len(vectors) > sample_size:
+            rows = np.sort(np.random.default_rng(seed).choice(len(vectors), sample_size, replace=False))
+            vectors = vectors[rows]
+        projection = Projection.fit_pca(np.asarray(vectors), n_components)
+    projection.save(path)
+    print(f"{method} projection to {n_components} dimensions saved to {path}")
+    return projection
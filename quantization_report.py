@@ -0,0 +1,172 @@
+import os
+import json
+import time
+import shutil
+import tempfile
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import (
+    Distance, VectorParams, PointStruct, SearchParams, QuantizationSearchParams,
+)
+from embedding_cache import DEFAULT_CACHE_DIR, model_cache_dir, load_cached_vectors
+from ingestion import quantization_config
+from local_index import LocalIndex, LocalIndexWriter
+from projection import Projection
+
+
+def exact_top_k(corpus, queries, top_k):
+    """
+    Returns the exact cosine top_k rows of corpus for every query, the recall ground truth.
+    """
+    corpus = corpus / np.maximum(np.linalg.norm(corpus, axis=1, keepdims=True), 1e-12)
+    queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+    scores = queries @ corpus.T
+    return [set(np.argsort(-row)[:top_k].tolist()) for row in scores]
+
+
+def summarize(name, dimension, bytes_per_vector, truth, found, latencies):
+    recall = np.mean([len(expected & set(rows)) / len(expected) for expected, rows in zip(truth, found)])
+    return {
+        "variant": name,
+        "dimension": dimension,
+        "bytes_per_vector": bytes_per_vector,
+        "recall": round(float(recall), 4),
+        "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 3),
+        "p95_ms": round(float(np.percentile(latencies, 95)) * 1000, 3),
+    }
+
+
+def evaluate_local(corpus, queries, truth, top_k, dimensions, rescore_factor=4):
+    """
+    Measures recall and per-query latency of the local index for float32 and int8 vectors,
+    at full dimension and after PCA and truncation projections.
+    """
+    variants = [("full", None)]
+    for n_components in dimensions:
+        variants.append((f"pca-{n_components}", Projection.fit_pca(corpus, n_components)))
+        variants.append((f"truncate-{n_components}", Projection.truncate(corpus.shape[1], n_components)))
+
+    rows = []
+    work_dir = tempfile.mkdtemp(prefix="quantization_report_")
+    try:
+        for name, projection in variants:
+            stored = corpus if projection is None else projection.apply(corpus)
+            projected_queries = queries if projection is None else projection.apply(queries)
+            index_dir = os.path.join(work_dir, name)
+            writer = LocalIndexWriter(index_dir)
+            writer.add(range(len(stored)), stored, [""] * len(stored), [{}] * len(stored))
+            writer.close()
+
+            dimension = stored.shape[1]
+            for quantized in (False, True):
+                index = LocalIndex(index_dir, quantized=quantized, rescore_factor=rescore_factor)
+                found, latencies = [], []
+                for query in projected_queries:
+                    start = time.perf_counter()
+                    hits = index.search([query], top_k)[0]
+                    latencies.append(time.perf_counter() - start)
+                    found.append([row for row, _ in hits])
+                index.close()
+                # Quantized search keeps float32 vectors on disk; RAM holds int8 codes and a scale per row
+                bytes_per_vector = dimension + 4 if quantized else dimension * 4
+                label = f"local {name} {'int8' if quantized else 'float32'}"
+                rows.append(summarize(label, dimension, bytes_per_vector, truth, found, latencies))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return rows
+
+
+def evaluate_qdrant(corpus, queries, truth, top_k, qdrant_host, qdrant_port, oversampling=2.0,
+                    collection_prefix="quantization_report", batch_size=256):
+    """
+    Measures recall and per-query latency of Qdrant collections without quantization, with
+    scalar and with product quantization. Temporary collections are deleted afterwards.
+    """
+    client = QdrantClient(host=qdrant_host, port=qdrant_port)
+    dimension = corpus.shape[1]
+    rows = []
+    for quantization in (None, "scalar", "product"):
+        name = f"{collection_prefix}_{quantization or 'none'}"
+        if client.collection_exists(name):
+            client.delete_collection(name)
+        client.create_collection(
+            collection_name=name,
+            vectors_config=VectorParams(size=dimension, distance=Distance.COSINE, on_disk=quantization is not None),
+            quantization_config=quantization_config(quantization),
+        )
+        try:
+            for start in range(0, len(corpus), batch_size):
+                client.upsert(name, points=[
+                    PointStruct(id=start + i, vector=vector.tolist())
+                    for i, vector in enumerate(corpus[start:start + batch_size])
+                ])
+            params = None
+            if quantization:
+                params = SearchParams(quantization=QuantizationSearchParams(rescore=True, oversampling=oversampling))
+
+            found, latencies = [], []
+            for query in queries:
+                start = time.perf_counter()
+                response = client.query_points(name, query=query.tolist(), limit=top_k, search_params=params)
+                latencies.append(time.perf_counter() - start)
+                found.append([point.id for point in response.points])
+            bytes_per_vector = {None: dimension * 4, "scalar": dimension, "product": dimension * 4 // 16}[quantization]
+            rows.append(summarize(f"qdrant {quantization or 'none'}", dimension, bytes_per_vector, truth, found, latencies))
+        finally:
+            client.delete_collection(name)
+    return rows
+
+
+def quantization_report(model_name='llama3.2', cache_dir=DEFAULT_CACHE_DIR, top_k=10, num_queries=100,
+                        dimensions=(256, 512, 1024), qdrant_host=None, qdrant_port=6333,
+                        output_file='quantization_report.json', seed=0):
+    """
+    Compares recall@k and latency of reduced and quantized vectors against full-precision search.
+
+    Corpus and query vectors come from the embedding cache, so nothing is embedded. A random
+    sample of num_queries cached vectors is held out as queries and the exact cosine top_k of
+    the remaining vectors is the ground truth.
+
+    Args:
+        model_name (str): Embedding model whose cached vectors are evaluated.
+        cache_dir (str): Root directory of the embedding cache, as for cached_ollama_embeddings.
+        top_k (int): Number of results compared per query.
+        num_queries (int): Number of held-out query vectors.
+        dimensions (tuple): Projection dimensions to evaluate.
+        qdrant_host (str, optional): Also evaluate Qdrant quantization on this server.
+        qdrant_port (int): Port number for the Qdrant server.
+        output_file (str): Path of the JSON report.
+        seed (int): Seed for the query sample.
+
+    Returns:
+        list: One result dict per variant.
+    """
+    vectors = np.asarray(load_cached_vectors(model_cache_dir(model_name, cache_dir)), dtype=np.float32)
+    if len(vectors) <= num_queries:
+        raise ValueError(f"Need more than {num_queries} cached vectors, found {len(vectors)}.")
+
+    rng = np.random.default_rng(seed)
+    held_out = np.zeros(len(vectors), dtype=bool)
+    held_out[rng.choice(len(vectors), num_queries, replace=False)] = True
+    corpus, queries = vectors[~held_out], vectors[held_out]
+    truth = exact_top_k(corpus, queries, top_k)
+    dimensions = [n for n in dimensions if n < min(corpus.shape)]
+
+    rows = evaluate_local(corpus, queries, truth, top_k, dimensions)
+    if qdrant_host:
+        rows.extend(evaluate_qdrant(corpus, queries, truth, top_k, qdrant_host, qdrant_port))
+
+    print(f"{len(corpus)} vectors, {len(queries)} queries, recall@{top_k}")
+    print(f"{'variant':<28}{'dim':>6}{'bytes':>8}{'recall':>8}{'p50 ms':>9}{'p95 ms':>9}")
+    for row in rows:
+        print(f"{row['variant']:<28}{row['dimension']:>6}{row['bytes_per_vector']:>8}"
+              f"{row['recall']:>8.3f}{row['p50_ms']:>9.3f}{row['p95_ms']:>9.3f}")
+
+    with open(output_file, 'w') as f:
+        json.dump({"corpus_size": len(corpus), "queries": len(queries), "top_k": top_k, "results": rows}, f, indent=2)
+    print(f"Report written to {output_file}")
+    return rows
+
+
+if __name__ == '__main__':
+    quantization_report()
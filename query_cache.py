@@ -0,0 +1,129 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Version markers written by the ingestion scripts whenever they change a collection
+COLLECTION_VERSION_DIR = os.path.join('.cache', 'collection_versions')
+
+
+def collection_version_path(collection_name, version_dir=COLLECTION_VERSION_DIR):
+    return os.path.join(version_dir, collection_name)
+
+
+def bump_collection_version(collection_name, version_dir=COLLECTION_VERSION_DIR):
+    """
+    Marks a collection as changed, invalidating results cached by running API processes.
+    """
+    os.makedirs(version_dir, exist_ok=True)
+    path = collection_version_path(collection_name, version_dir)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(str(time.time_ns()))
+    os.replace(tmp_path, path)
+
+
+def collection_version(collection_name, version_dir=COLLECTION_VERSION_DIR):
+    """
+    Returns the current version marker of a collection, or None if it was never bumped.
+    """
+    try:
+        with open(collection_version_path(collection_name, version_dir)) as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return None
+
+
+def query_cache_key(*parts):
+    """
+    Hashes the parts of a request that determine its results.
+    """
+    canonical = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def normalize_query_text(text):
+    """
+    Lowercases and collapses whitespace, so texts differing only in case or spacing share an embedding.
+    """
+    return ' '.join((text or '').lower().split())
+
+
+class TTLCache:
+    """
+    In-memory LRU cache whose entries expire ttl seconds after they are stored.
+
+    Memory is bounded by max_entries; the least recently used entry is evicted first.
+    """
+
+    def __init__(self, max_entries=1024, ttl=300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': len(self._entries),
+            }
+
+
+class QueryResultCache(TTLCache):
+    """
+    TTLCache of search results that empties itself when the searched collection changes.
+
+    The collection's version marker is checked on every lookup; ingestion scripts bump it
+    through bump_collection_version after writing to the collection.
+    """
+
+    def __init__(self, collection_name, max_entries=1024, ttl=300.0, version_dir=COLLECTION_VERSION_DIR):
+        super().__init__(max_entries=max_entries, ttl=ttl)
+        self.collection_name = collection_name
+        self.version_dir = version_dir
+        self.invalidations = 0
+        self._version = collection_version(collection_name, version_dir)
+
+    def get(self, key):
+        version = collection_version(self.collection_name, self.version_dir)
+        if version != self._version:
+            self.clear()
+            self._version = version
+            self.invalidations += 1
+        return super().get(key)
+
+    def stats(self):
+        stats = super().stats()
+        stats['invalidations'] = self.invalidations
+        return stats
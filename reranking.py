@@ -0,0 +1,240 @@
+import re
+import time
+import asyncio
+import logging
+from datetime import date
+from typing import List
+from pydantic import BaseModel
+from prometheus_client import Counter
+from instrumentation import stage_timer
+from structured_output import ainvoke_structured
+from bm25_embeddings import tokenize
+
+RERANK_FALLBACKS = Counter('resume_rerank_fallbacks_total', 'Re-rankings cut short by their time budget', ['stage'])
+
+# Weights of the vector similarity and the structured-field features in the re-rank score
+RERANK_WEIGHTS = {'vector': 0.4, 'skills': 0.35, 'experience': 0.15, 'education': 0.1}
+
+# Share of the LLM judge's score in the final score of the candidates it rates
+JUDGE_WEIGHT = 0.5
+
+# Characters of each resume shown to the LLM judge
+JUDGE_RESUME_CHARS = 800
+
+# Job skills of a single token this short (C, R, Go) are too ambiguous to look for in resume
+# text; they only match the resume's Skills
+MIN_CONTENT_SKILL_CHARS = 3
+
+YEAR = re.compile(r'\b(19[5-9]\d|20\d{2})\b')
+REQUIRED_YEARS = re.compile(r'(\d+)\s*\+?\s*(?:-\s*\d+\s*)?years?', re.IGNORECASE)
+ONGOING = re.compile(r'\b(current|present|now|today)\b', re.IGNORECASE)
+
+# Degree keywords by level; the highest level found wins
+DEGREE_LEVELS = (
+    (4, re.compile(r'\b(ph\.?\s?d|doctor(ate)?)\b', re.IGNORECASE)),
+    (3, re.compile(r"\b(master'?s?|mba|m\.?\s?sc?|m\.?\s?eng|m\.?a\.)\b", re.IGNORECASE)),
+    (2, re.compile(r"\b(bachelor'?s?|b\.?\s?sc?|b\.?\s?eng|b\.?a\.|undergraduate)\b", re.IGNORECASE)),
+    (1, re.compile(r"\b(associate'?s?|diploma)\b", re.IGNORECASE)),
+)
+
+
+class JudgeScore(BaseModel):
+    id: str
+    score: float
+
+
+class JudgeScores(BaseModel):
+    scores: List[JudgeScore] = []
+
+
+def _as_text(value):
+    # Flattens the str / dict / list values of structured fields into one string
+    if isinstance(value, dict):
+        return " ".join(_as_text(item) for item in value.values())
+    if isinstance(value, list):
+        return " ".join(_as_text(item) for item in value)
+    return str(value or "")
+
+
+def degree_level(text):
+    """
+    Returns the highest degree level mentioned in text: 4 doctorate, 3 master,
+    2 bachelor, 1 associate, 0 none.
+    """
+    for level, pattern in DEGREE_LEVELS:
+        if pattern.search(text):
+            return level
+    return 0
+
+
+def job_requirements(job):
+    """
+    Extracts the features resumes are scored against from a structured job description.
+
+    Returns:
+        dict: "skills" (lowercased set), "years" (required years of experience or None)
+        and "degree" (required degree level, 0 if none).
+    """
+    required = _as_text(job.get('required_qualifications'))
+    years = [int(match) for match in REQUIRED_YEARS.findall(required)]
+    return {
+        'skills': {skill.strip().lower() for skill in job.get('skills') or [] if isinstance(skill, str) and skill.strip()},
+        'years': max(years) if years else None,
+        'degree': degree_level(required),
+    }
+
+
+def experience_years(resume):
+    """
+    Estimates years of experience as the span from the earliest start year to the latest
+    end year across the resume's positions, counting "Current"/"Present" as this year.
+    """
+    this_year = date.today().year
+    years = []
+    for experience in resume.get('Experience') or []:
+        if not isinstance(experience, dict):
+            continue
+        dates = str(experience.get('Dates') or '')
+        years.extend(int(year) for year in YEAR.findall(dates))
+        if ONGOING.search(dates):
+            years.append(this_year)
+    return max(years) - min(years) if years else 0
+
+
+def skill_in_text(skill, text_terms):
+    """
+    Returns True if a skill occurs in a text as whole terms (see bm25_embeddings.tokenize), so
+    "Java" does not match inside "JavaScript". text_terms is the text's terms joined by spaces,
+    with a space on either side.
+    """
+    terms = tokenize(skill)
+    if not terms or (len(terms) == 1 and len(terms[0]) < MIN_CONTENT_SKILL_CHARS):
+        return False
+    return f" {' '.join(terms)} " in text_terms
+
+
+def feature_scores(requirements, resume, content=""):
+    """
+    Scores one resume against job requirements, every feature between 0 and 1.
+
+    Features the job does not specify are left out, so they neither help nor hurt.
+    Job skills are matched against the resume's skills, and as whole terms against its
+    aggregated content.
+    """
+    scores = {}
+    if requirements['skills']:
+        skills = {str(skill).strip().lower() for skill in resume.get('Skills') or []}
+        text_terms = f" {' '.join(tokenize(content))} "
+        matched = sum(1 for skill in requirements['skills'] if skill in skills or skill_in_text(skill, text_terms))
+        scores['skills'] = matched / len(requirements['skills'])
+    if requirements['years']:
+        scores['experience'] = min(1.0, experience_years(resume) / requirements['years'])
+    if requirements['degree']:
+        level = degree_level(_as_text(resume.get('Education')))
+        scores['education'] = 1.0 if level >= requirements['degree'] else level / requirements['degree']
+    return scores
+
+
+def judge_prompt(job, candidates):
+    resumes = "\n".join(
+        f"- id: {hit['id']}\n  resume: {(hit.get('content') or '')[:JUDGE_RESUME_CHARS]}" for hit in candidates
+    )
+    return f"""
+        Rate how well each resume fits the job description, from 0 (no fit) to 10 (perfect fit).
+        Return JSON of the form {{"scores": [{{"id": "<resume id>", "score": <0-10>}}]}} with one entry per resume.
+        Job Description: {_as_text(job)}
+        Resumes:
+        {resumes}
+    """
+
+
+class Reranker:
+    """
+    Second ranking stage over a candidate pool wider than top_k.
+
+    Candidates are re-scored on structured-field features of their resume metadata (skill
+    overlap, years of experience, degree level) blended with their vector similarity, and
+    optionally on the score of an LLM judge. Both stages share a per-request time budget:
+    when it runs out during feature scoring the vector order is returned, and when the judge
+    does not answer in time the feature order is kept.
+    """
+
+    def __init__(self, budget_seconds=2.0, weights=None, judge_candidates=10, admission=None):
+        self.budget_seconds = budget_seconds
+        self.weights = weights or RERANK_WEIGHTS
+        self.judge_candidates = judge_candidates
+        self.admission = admission
+
+    def _score(self, requirements, hits, deadline):
+        similarities = [hit['similarity'] for hit in hits]
+        low, high = min(similarities), max(similarities)
+        scored = []
+        for hit in hits:
+            if time.perf_counter() > deadline:
+                return None
+            features = feature_scores(requirements, hit.get('metadata') or {}, hit.get('content') or '')
+            features['vector'] = (hit['similarity'] - low) / (high - low) if high > low else 1.0
+            total = sum(self.weights[name] for name in features)
+            score = sum(self.weights[name] * value for name, value in features.items()) / total
+            scored.append((score, hit))
+        scored.sort(key=lambda pair: pair[0], reverse=True)
+        return scored
+
+    async def _judge(self, model, job, candidates, stats):
+        prompt = judge_prompt(job, candidates)
+        if self.admission is None:
+            response = await ainvoke_structured(model, prompt, JudgeScores, stats=stats)
+        else:
+            async with self.admission.admit():
+                response = await ainvoke_structured(model, prompt, JudgeScores, stats=stats)
+        return {item['id']: min(max(item['score'], 0.0), 10.0) / 10 for item in response['scores']}
+
+    async def rerank(self, job, hits, top_k, model=None, stats=None):
+        """
+        Re-orders hits for a structured job description and returns the best top_k.
+
+        Args:
+            job (dict): Structured job description (format.job_description_format fields).
+            hits (list): Candidates from search_batch(..., with_metadata=True), in vector order.
+            top_k (int): Number of results to return.
+            model: Language model used as judge; None skips the judge.
+            stats (StructuredOutputStats, optional): Counters for the judge's structured output.
+
+        Returns:
+            list: top_k {"id", "content", "similarity", "rerank_score"} dicts, without metadata.
+        """
+        if not hits:
+            return []
+        deadline = time.perf_counter() + self.budget_seconds
+        with stage_timer('rerank_features'):
+            scored = self._score(job_requirements(job), hits, deadline)
+        if scored is None:
+            RERANK_FALLBACKS.labels('features').inc()
+            return [_public(hit) for hit in hits[:top_k]]
+
+        if model is not None:
+            candidates = [hit for _, hit in scored[:self.judge_candidates]]
+            try:
+                with stage_timer('rerank_judge'):
+                    judged = await asyncio.wait_for(
+                        self._judge(model, job, candidates, stats), timeout=max(0.0, deadline - time.perf_counter())
+                    )
+                # Only the judged head of the ranking is re-ordered; it stays ahead of the rest
+                head = sorted(
+                    (
+                        ((1 - JUDGE_WEIGHT) * score + JUDGE_WEIGHT * judged.get(hit['id'], score), hit)
+                        for score, hit in scored[:self.judge_candidates]
+                    ),
+                    key=lambda pair: pair[0], reverse=True,
+                )
+                scored = head + scored[self.judge_candidates:]
+            except asyncio.TimeoutError:
+                RERANK_FALLBACKS.labels('judge').inc()
+            except Exception as e:
+                logging.warning(f"LLM judge failed, keeping feature ranking ({e})")
+
+        return [{**_public(hit), 'rerank_score': round(score, 4)} for score, hit in scored[:top_k]]
+
+
+def _public(hit):
+    return {key: value for key, value in hit.items() if key != 'metadata'}
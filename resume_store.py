@@ -0,0 +1,240 @@
+import os
+import json
+import sqlite3
+import threading
+from format import resume_format
+from structured_output import template_fields
+from qdrant_client.http.models import PointStruct, SparseVector
+from ingestion import existing_point_ids
+from bm25_embeddings import BM25SparseEmbeddings, SPARSE_VECTOR_NAME
+from section_index import SectionVectorStore
+
+DEFAULT_STORE_PATH = os.path.join('.cache', 'resume_store.sqlite')
+
+# One column per top-level field of format.resume_format; keys outside the template go to "extra"
+RESUME_FIELDS = list(template_fields(resume_format))
+CONTENT_FIELD = 'content'
+
+# Resume fields behind the search filters, kept with their original values in slim payloads
+FILTERED_METADATA_FIELDS = (
+    'metadata.Skills', 'metadata.Certifications', 'metadata.Education[].Year', 'metadata.Languages',
+)
+
+
+def _project(value, path):
+    # Keeps only the parts of value on a payload index path such as ["Education[]", "Year"]
+    if not path:
+        return value
+    head, rest = path[0], path[1:]
+    if head.endswith('[]'):
+        items = value.get(head[:-2]) if isinstance(value, dict) else None
+        return [_project(item, rest) for item in items or [] if isinstance(item, dict)]
+    if isinstance(value, dict) and head in value:
+        return {head: _project(value[head], rest)} if rest else {head: value[head]}
+    return {}
+
+
+def _merge(target, source):
+    for key, value in source.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            _merge(target[key], value)
+        elif isinstance(value, list) and isinstance(target.get(key), list):
+            # Lists of objects from different paths are merged item by item
+            target[key] = [
+                {**a, **b} if isinstance(a, dict) and isinstance(b, dict) else b
+                for a, b in zip(target[key], value)
+            ]
+        else:
+            target[key] = value
+
+
+def slim_metadata(resume, indexed_fields=FILTERED_METADATA_FIELDS):
+    """
+    Returns the part of a resume behind the search filters: the given fields (keys like
+    "metadata.Education[].Year"), with the same nesting.
+    """
+    slim = {}
+    for key in indexed_fields:
+        parts = key.split('.')[1:] if key.startswith('metadata.') else key.split('.')
+        projected = _project(resume, parts)
+        if isinstance(projected, list):
+            projected = {parts[0][:-2]: projected}
+        _merge(slim, projected)
+    return slim
+
+
+class ResumeStore:
+    """
+    Local SQLite store of full resume records keyed by Qdrant point ID.
+
+    Each top-level resume field is its own column, so a lookup only reads and decodes the
+    fields it asks for. Collections ingested with a store keep just the filterable fields
+    in their Qdrant payload, and the API hydrates results from here.
+    """
+
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        columns = ', '.join(f'"{field}" TEXT' for field in [CONTENT_FIELD, *RESUME_FIELDS, 'extra'])
+        self._conn.execute(f'CREATE TABLE IF NOT EXISTS resumes (id TEXT PRIMARY KEY, {columns})')
+
+    @staticmethod
+    def fields():
+        """
+        Field names accepted by get_many, besides "metadata" for the whole resume.
+        """
+        return [CONTENT_FIELD, *RESUME_FIELDS]
+
+    def put_many(self, ids, page_contents, metadatas):
+        """
+        Inserts or replaces the records of the given point IDs.
+        """
+        rows = []
+        for id_, page_content, metadata in zip(ids, page_contents, metadatas):
+            metadata = metadata or {}
+            extra = {key: value for key, value in metadata.items() if key not in RESUME_FIELDS}
+            rows.append((
+                str(id_), page_content,
+                *(json.dumps(metadata[field], ensure_ascii=False) if field in metadata else None for field in RESUME_FIELDS),
+                json.dumps(extra, ensure_ascii=False) if extra else None,
+            ))
+        placeholders = ', '.join('?' * (len(RESUME_FIELDS) + 3))
+        with self._lock:
+            self._conn.execute('BEGIN')
+            self._conn.executemany(f'INSERT OR REPLACE INTO resumes VALUES ({placeholders})', rows)
+            self._conn.execute('COMMIT')
+
+    def get_many(self, ids, fields=None):
+        """
+        Reads the requested fields of many records.
+
+        Args:
+            ids (list): Point IDs.
+            fields (list, optional): Names from fields(), or "metadata" for the whole resume.
+                Defaults to ["content", "metadata"].
+
+        Returns:
+            dict: Point ID to a dict of the requested fields; IDs not in the store are missing.
+
+        Raises:
+            ValueError: If a field is unknown.
+        """
+        fields = list(fields) if fields is not None else [CONTENT_FIELD, 'metadata']
+        unknown = [field for field in fields if field not in self.fields() and field != 'metadata']
+        if unknown:
+            raise ValueError(f"Unknown resume fields: {', '.join(unknown)}")
+        columns = [CONTENT_FIELD] if CONTENT_FIELD in fields else []
+        columns += RESUME_FIELDS + ['extra'] if 'metadata' in fields else [field for field in fields if field in RESUME_FIELDS]
+        if not ids:
+            return {}
+
+        select = ', '.join(['id', *(f'"{column}"' for column in columns)])
+        with self._lock:
+            rows = self._conn.execute(
+                f'SELECT {select} FROM resumes WHERE id IN ({",".join("?" * len(ids))})', [str(id_) for id_ in ids]
+            ).fetchall()
+
+        records = {}
+        for row in rows:
+            values = dict(zip(columns, row[1:]))
+            record = {}
+            if CONTENT_FIELD in fields:
+                record[CONTENT_FIELD] = values[CONTENT_FIELD]
+            decoded = {
+                column: json.loads(value) for column, value in values.items()
+                if column != CONTENT_FIELD and value is not None
+            }
+            if 'metadata' in fields:
+                metadata = {field: decoded[field] for field in RESUME_FIELDS if field in decoded}
+                metadata.update(decoded.get('extra') or {})
+                record['metadata'] = metadata
+            for field in fields:
+                if field in RESUME_FIELDS:
+                    record[field] = decoded.get(field)
+            records[row[0]] = record
+        return records
+
+    def delete_except(self, ids):
+        """
+        Drops records whose IDs are not in ids. Returns the number of records removed.
+        """
+        keep = {str(id_) for id_ in ids}
+        with self._lock:
+            stored = [row[0] for row in self._conn.execute('SELECT id FROM resumes')]
+            removed = [(id_,) for id_ in stored if id_ not in keep]
+            self._conn.executemany('DELETE FROM resumes WHERE id = ?', removed)
+        return len(removed)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def slim_payload(document):
+    """
+    Returns the Qdrant payload of a resume in a slim collection: only the filterable fields.
+    """
+    return {'metadata': slim_metadata(document.metadata or {})}
+
+
+class SlimVectorStore:
+    """
+    Writes resumes to a collection whose payload only holds the filterable fields, with the
+    full records in a ResumeStore.
+
+    Vectors are computed from the full documents, as resume_vector_store (dense, plus BM25
+    when sparse is set) or SectionVectorStore (sections=True) would, and each batch is
+    upserted with its slim payload in one request. Records are stored before the upsert,
+    so a crash in between only leaves records that the next run overwrites.
+    """
+
+    def __init__(self, client, collection_name, embeddings, store, sparse=True, sections=False):
+        self.client = client
+        self.collection_name = collection_name
+        self.embeddings = embeddings
+        self.store = store
+        self.sparse_embeddings = BM25SparseEmbeddings() if sparse else None
+        self.section_store = SectionVectorStore(
+            client, collection_name, embeddings, sparse=sparse, payload_builder=slim_payload
+        ) if sections else None
+
+    def add_documents(self, documents, ids):
+        self.store.put_many(ids, [document.page_content for document in documents],
+                            [document.metadata for document in documents])
+        if self.section_store:
+            return self.section_store.add_documents(documents, ids)
+
+        texts = [document.page_content for document in documents]
+        vectors = self.embeddings.embed_documents(texts)
+        sparse_vectors = self.sparse_embeddings.embed_documents(texts) if self.sparse_embeddings else None
+        points = []
+        for index, (id_, document, vector) in enumerate(zip(ids, documents, vectors)):
+            if sparse_vectors is not None:
+                # Hybrid collections keep the dense vector unnamed, as QdrantVectorStore does
+                sparse = sparse_vectors[index]
+                vector = {'': vector, SPARSE_VECTOR_NAME: SparseVector(indices=sparse.indices, values=sparse.values)}
+            points.append(PointStruct(id=id_, vector=vector, payload=slim_payload(document)))
+        self.client.upsert(collection_name=self.collection_name, points=points)
+        return ids
+
+
+def is_slim_collection(client, collection_name):
+    """
+    Returns True if the collection's points were written by SlimVectorStore, i.e. their payload
+    has no resume text, and None if the collection is empty.
+    """
+    points, _ = client.scroll(collection_name=collection_name, limit=1, with_payload=['page_content'], with_vectors=False)
+    if not points:
+        return None
+    return 'page_content' not in (points[0].payload or {})
+
+
+def prune_store(store, client, collection_name):
+    """
+    Removes records of points that are no longer in the collection.
+    """
+    return store.delete_except(existing_point_ids(client, collection_name))
@@ -0,0 +1,187 @@
+import asyncio
+from typing import List
+from pydantic import BaseModel
+from qdrant_client.http.models import (
+    QueryRequest, Prefetch, FusionQuery, Fusion, Filter, FieldCondition, MatchValue, MatchAny,
+    SparseVector, SearchParams, QuantizationSearchParams,
+)
+from bm25_embeddings import BM25SparseEmbeddings, SPARSE_VECTOR_NAME
+from section_index import SECTION_VECTOR_NAME, is_section_collection
+from local_index import LocalIndex
+from ingestion import FILTER_PAYLOAD_KEY, normalize_filter_value
+
+
+# Filters on structured resume fields
+class ResumeFilters(BaseModel):
+    skills: List[str] = []
+    certifications: List[str] = []
+    languages: List[str] = []
+    education_years: List[str] = []
+
+    def is_empty(self):
+        return not (self.skills or self.certifications or self.languages or self.education_years)
+
+    def normalized(self):
+        """
+        Returns the filter values in the form ingestion stores them (see ingestion.normalize_filter_value),
+        so matching ignores case.
+        """
+        return {
+            field: [value for value in map(normalize_filter_value, values) if value]
+            for field, values in self.model_dump().items()
+        }
+
+    def to_qdrant(self):
+        """
+        Every listed skill, certification and language must be present; any listed
+        graduation year matches. Returns None when no filter is set.
+        """
+        values = self.normalized()
+        conditions = [
+            FieldCondition(key=f"{FILTER_PAYLOAD_KEY}.{field}", match=MatchValue(value=value))
+            for field in ("skills", "certifications", "languages")
+            for value in values[field]
+        ]
+        if values["education_years"]:
+            conditions.append(
+                FieldCondition(key=f"{FILTER_PAYLOAD_KEY}.education_years", match=MatchAny(any=values["education_years"]))
+            )
+        return Filter(must=conditions) if conditions else None
+
+
+class QdrantRetriever:
+    """
+    Resume search against a Qdrant collection.
+
+    Collections with the BM25 sparse vector are searched with dense and sparse prefetches
+    fused by reciprocal rank fusion; filters run inside Qdrant on payload indexes.
+    On quantized collections, dense searches oversample on the quantized vectors and
+    rescore the candidates with the original ones. On section collections (see
+    section_index.py) a resume scores as its best-matching section (MAX_SIM in Qdrant).
+    """
+
+    def __init__(self, client, collection_name, hybrid=False, prefetch_factor=4, search_params=None, sections=False):
+        self.client = client
+        self.collection_name = collection_name
+        self.hybrid = hybrid
+        self.prefetch_factor = prefetch_factor
+        self.search_params = search_params
+        self.sections = sections
+        self.sparse_embeddings = BM25SparseEmbeddings()
+
+    @classmethod
+    async def create(cls, client, collection_name, prefetch_factor=4, oversampling=2.0):
+        """
+        Builds a retriever, enabling hybrid search when the collection has the sparse vector,
+        rescoring when it is quantized and section scoring when it stores section vectors.
+        """
+        try:
+            collection = await client.get_collection(collection_name)
+            hybrid = SPARSE_VECTOR_NAME in (collection.config.params.sparse_vectors or {})
+            quantized = collection.config.quantization_config is not None
+            sections = is_section_collection(collection)
+        except Exception:
+            hybrid = quantized = sections = False
+        search_params = None
+        if quantized:
+            search_params = SearchParams(quantization=QuantizationSearchParams(rescore=True, oversampling=oversampling))
+        return cls(client, collection_name, hybrid=hybrid, prefetch_factor=prefetch_factor, search_params=search_params,
+                   sections=sections)
+
+    def dense_query(self, vector):
+        # Section multi-vectors are queried with a one-vector multi-vector
+        if self.sections:
+            return {"query": [vector], "using": SECTION_VECTOR_NAME}
+        return {"query": vector}
+
+    def query_request(self, text, vector, top_k, query_filter, with_payload=("page_content",)):
+        # An empty selection returns points without payload, e.g. when results are hydrated elsewhere
+        with_payload = list(with_payload) or False
+        if not self.hybrid:
+            return QueryRequest(
+                **self.dense_query(vector), filter=query_filter, params=self.search_params, limit=top_k,
+                with_payload=with_payload,
+            )
+
+        sparse_vector = self.sparse_embeddings.embed_query(text)
+        prefetch_limit = top_k * self.prefetch_factor
+        return QueryRequest(
+            prefetch=[
+                Prefetch(**self.dense_query(vector), filter=query_filter, params=self.search_params, limit=prefetch_limit),
+                Prefetch(
+                    query=SparseVector(indices=sparse_vector.indices, values=sparse_vector.values),
+                    using=SPARSE_VECTOR_NAME,
+                    filter=query_filter,
+                    limit=prefetch_limit,
+                ),
+            ],
+            query=FusionQuery(fusion=Fusion.RRF),
+            limit=top_k,
+            with_payload=with_payload,
+        )
+
+    async def search_batch(self, texts, vectors, top_k, filters=None, with_metadata=False, with_content=True):
+        """
+        Searches one query per (text, vector) pair in a single Qdrant batch request.
+
+        Returns:
+            list: For every query, a list of {"id", "content", "similarity"} dicts, which also
+            carry the structured resume as "metadata" when with_metadata is set. "content" is
+            left out when with_content is not set, and only the requested payload is fetched.
+        """
+        query_filter = filters.to_qdrant() if filters else None
+        with_payload = (("page_content",) if with_content else ()) + (("metadata",) if with_metadata else ())
+        responses = await self.client.query_batch_points(
+            collection_name=self.collection_name,
+            requests=[
+                self.query_request(text, vector, top_k, query_filter, with_payload)
+                for text, vector in zip(texts, vectors)
+            ],
+        )
+        results = []
+        for response in responses:
+            hits = []
+            for point in sorted(response.points, key=lambda x: x.score, reverse=True):
+                payload = point.payload or {}
+                hit = {"id": str(point.id), "similarity": point.score}
+                if with_content:
+                    hit["content"] = payload.get("page_content")
+                if with_metadata:
+                    hit["metadata"] = payload.get("metadata") or {}
+                hits.append(hit)
+            results.append(hits)
+        return results
+
+
+class LocalRetriever:
+    """
+    Dense resume search against an in-process LocalIndex; needs no Qdrant server.
+    """
+
+    def __init__(self, index: LocalIndex):
+        self.index = index
+        self.hybrid = False
+
+    async def search_batch(self, texts, vectors, top_k, filters=None, with_metadata=False, with_content=True):
+        """
+        Same contract as QdrantRetriever.search_batch. Scoring runs in a worker thread
+        because NumPy releases the GIL during the matrix products.
+        """
+        filter_values = filters.normalized() if filters and not filters.is_empty() else None
+
+        def hit(row, score):
+            result = {"id": self.index.ids[row], "similarity": score}
+            if not (with_content or with_metadata):
+                return result
+            record = self.index.record(row)
+            if with_content:
+                result["content"] = record.get("page_content")
+            if with_metadata:
+                result["metadata"] = record.get("metadata") or {}
+            return result
+
+        def search():
+            hits = self.index.search(vectors, top_k, filter_values)
+            return [[hit(row, score) for row, score in query_hits] for query_hits in hits]
+
+        return await asyncio.to_thread(search)
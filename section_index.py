@@ -0,0 +1,157 @@
+import logging
+import numpy as np
+from qdrant_client.http.models import (
+    Distance, VectorParams, MultiVectorConfig, MultiVectorComparator, PointStruct, SparseVector,
+)
+from bm25_embeddings import BM25SparseEmbeddings, SPARSE_VECTOR_NAME
+from instrumentation import stage_timer
+
+# Named multi-vector holding one vector per resume section
+SECTION_VECTOR_NAME = 'sections'
+
+# Longest section text embedded; longer sections are cut, which now only affects that section
+MAX_SECTION_CHARS = 2000
+
+
+def resume_sections(resume):
+    """
+    Splits a structured resume into the texts embedded as separate vectors: the summary,
+    skills with certifications and languages, and one text per education, experience and
+    project entry. Empty sections are left out.
+
+    Args:
+        resume (dict): A resume in the format of format.resume_format.
+
+    Returns:
+        list: Section texts, at most MAX_SECTION_CHARS long each.
+    """
+    sections = []
+    if resume.get('Summary'):
+        sections.append(f"Summary: {resume['Summary']}")
+
+    skills = ", ".join(filter(None, resume.get('Skills') or []))
+    certifications = ", ".join(filter(None, resume.get('Certifications') or []))
+    languages = ", ".join(filter(None, resume.get('Languages') or []))
+    profile = " | ".join(filter(None, [
+        f"Skills: {skills}" if skills else "",
+        f"Certifications: {certifications}" if certifications else "",
+        f"Languages: {languages}" if languages else "",
+    ]))
+    if profile:
+        sections.append(profile)
+
+    for edu in resume.get('Education') or []:
+        if isinstance(edu, dict) and (edu.get('Degree') or edu.get('Institution')):
+            sections.append(f"Education: {edu.get('Degree', '')} from {edu.get('Institution', '')} ({edu.get('Year', '')})")
+
+    for exp in resume.get('Experience') or []:
+        if isinstance(exp, dict) and (exp.get('Title') or exp.get('Responsibilities')):
+            sections.append(
+                f"Experience: {exp.get('Title', '')} at {exp.get('Company', '')} ({exp.get('Dates', '')}): "
+                + ", ".join(exp.get('Responsibilities') or [])
+            )
+
+    for proj in resume.get('Projects') or []:
+        if isinstance(proj, dict) and (proj.get('Title') or proj.get('Description')):
+            sections.append(f"Project: {proj.get('Title', '')}: {proj.get('Description', '')}")
+
+    return [section[:MAX_SECTION_CHARS] for section in sections]
+
+
+def section_vectors_config(dimension, on_disk=False):
+    """
+    Returns the vectors config of a section-level collection: one multi-vector per resume,
+    scored against a query vector by its best-matching section (MAX_SIM).
+    """
+    return {
+        SECTION_VECTOR_NAME: VectorParams(
+            size=dimension,
+            distance=Distance.COSINE,
+            on_disk=on_disk,
+            multivector_config=MultiVectorConfig(comparator=MultiVectorComparator.MAX_SIM),
+        ),
+    }
+
+
+def is_section_collection(collection_info):
+    """
+    Returns True if a collection (from client.get_collection) stores section multi-vectors.
+    """
+    vectors = collection_info.config.params.vectors
+    return isinstance(vectors, dict) and SECTION_VECTOR_NAME in vectors
+
+
+def full_payload(document):
+    """
+    Returns the payload QdrantVectorStore writes for a document: its text and metadata.
+    """
+    return {'page_content': document.page_content, 'metadata': document.metadata}
+
+
+def dense_resume_vector(vector):
+    """
+    Returns a single dense vector from the stored vector(s) of a resume point: the unnamed
+    dense vector of plain and hybrid collections, or the normalized mean of the section
+    vectors of a section collection. Used to match resumes against job descriptions.
+
+    Raises:
+        ValueError: If the point has neither.
+    """
+    if not isinstance(vector, dict):
+        return vector
+    if '' in vector:
+        return vector['']
+    if SECTION_VECTOR_NAME in vector:
+        mean = np.asarray(vector[SECTION_VECTOR_NAME], dtype=np.float32).mean(axis=0)
+        return (mean / max(float(np.linalg.norm(mean)), 1e-12)).tolist()
+    raise ValueError(f"Point has no dense resume vector, only {sorted(vector)}.")
+
+
+class SectionVectorStore:
+    """
+    Writes resumes as one point each, holding a vector per section.
+
+    Has the add_documents interface of QdrantVectorStore, so ingestion.stream_sync can
+    use it unchanged. The sections of all documents in a call are embedded in one batched
+    embed_documents call. The BM25 sparse vector of the aggregated text is written too
+    when the collection has one. payload_builder, if given, builds each point's payload
+    from its document instead of the default page_content and metadata.
+    """
+
+    def __init__(self, client, collection_name, embeddings, sparse=True, payload_builder=None):
+        self.client = client
+        self.collection_name = collection_name
+        self.embeddings = embeddings
+        self.sparse_embeddings = BM25SparseEmbeddings() if sparse else None
+        self.payload_builder = payload_builder or full_payload
+
+    def add_documents(self, documents, ids):
+        """
+        Embeds and upserts documents whose metadata is the structured resume.
+        """
+        sections = []
+        for document in documents:
+            texts = resume_sections(document.metadata or {})
+            # A resume without structured sections falls back to its aggregated text
+            sections.append(texts or [document.page_content[:MAX_SECTION_CHARS]])
+
+        flat = [text for texts in sections for text in texts]
+        with stage_timer('section_embedding'):
+            vectors = self.embeddings.embed_documents(flat)
+        sparse_vectors = (
+            self.sparse_embeddings.embed_documents([document.page_content for document in documents])
+            if self.sparse_embeddings else None
+        )
+
+        points = []
+        position = 0
+        for index, (id_, document, texts) in enumerate(zip(ids, documents, sections)):
+            vector = {SECTION_VECTOR_NAME: vectors[position:position + len(texts)]}
+            position += len(texts)
+            if sparse_vectors is not None:
+                sparse = sparse_vectors[index]
+                vector[SPARSE_VECTOR_NAME] = SparseVector(indices=sparse.indices, values=sparse.values)
+            points.append(PointStruct(id=id_, vector=vector, payload=self.payload_builder(document)))
+        self.client.upsert(collection_name=self.collection_name, points=points)
+        logging.info(f"Upserted {len(points)} resumes with {len(flat)} section vectors")
+        return ids
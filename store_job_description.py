@@ -1,48 +1,61 @@
 import os
-import json
-from langchain_ollama import OllamaEmbeddings
-from uuid import uuid4
 from langchain_core.documents import Document
 from langchain_qdrant import QdrantVectorStore
 from qdrant_client import QdrantClient
 from qdrant_client.http.models import Distance, VectorParams
+from embedding_cache import cached_ollama_embeddings
+from projection import Projection, ProjectedEmbeddings
+from ingestion import stream_sync, checkpoint_path_for, quantization_config
+from instrumentation import stage_summary, start_metrics_server_from_env
 from aggregate_data import aggregate_job_description_data
 
-def process_job_description(json_file_path, model_name, qdrant_host, qdrant_port, collection_name):
+def process_job_description(json_file_path, model_name, qdrant_host, qdrant_port, collection_name, delete_removed=True,
+                            batch_size=256, checkpoint=True, quantization=None, on_disk=False,
+                            projection_path=None):
     """
     Processes job descriptions from a JSON file and stores them in a Qdrant vector database.
 
     Args:
-        json_file_path (str): Path to the job description JSON file.
+        json_file_path (str): Path to the job description JSON or JSON Lines file.
         model_name (str): Name of the embedding model.
         qdrant_host (str): Host address for the Qdrant server.
         qdrant_port (int): Port number for the Qdrant server.
         collection_name (str): Name of the Qdrant collection.
+        delete_removed (bool): Delete points for records no longer in the JSON file. The
+            job description collection has no other writer, so this is on by default.
+        batch_size (int): Number of records embedded and upserted per batch.
+        checkpoint (bool): Resume an interrupted ingest after its last completed batch.
+        quantization (str, optional): "scalar" or "product" to store quantized vectors in RAM.
+        on_disk (bool): Keep the original vectors on disk when creating the collection.
+        projection_path (str, optional): Projection saved by projection.py, applied to every
+            vector. The API must use the same projection for queries.
 
     Returns:
         None
     """
     try:
-        # Initialize embeddings and Qdrant client
-        embeddings = OllamaEmbeddings(model=model_name)
+        # Initialize cached, batched embeddings and Qdrant client
+        embeddings = cached_ollama_embeddings(model_name)
+        dimension = 3072
+        if projection_path:
+            projection = Projection.load(projection_path)
+            embeddings = ProjectedEmbeddings(embeddings, projection)
+            dimension = projection.dimension
         client = QdrantClient(host=qdrant_host, port=qdrant_port)
 
         # Load job descriptions from JSON file
         if not os.path.exists(json_file_path):
             raise FileNotFoundError(f"The file {json_file_path} does not exist.")
 
-        with open(json_file_path, 'r') as f:
-            job_description_json = json.load(f)
-
-        if not isinstance(job_description_json, list):
-            raise ValueError("The JSON file should contain a list of job descriptions.")
-
         # Check if collection exists, create if not
         if collection_name not in [collection.name for collection in client.get_collections().collections]:
             client.create_collection(
                 collection_name=collection_name,
-                vectors_config=VectorParams(size=3072, distance=Distance.COSINE),
+                vectors_config=VectorParams(size=dimension, distance=Distance.COSINE, on_disk=on_disk),
+                quantization_config=quantization_config(quantization),
             )
+        elif quantization:
+            client.update_collection(collection_name, quantization_config=quantization_config(quantization))
 
         # Initialize Qdrant vector store
         vector_store = QdrantVectorStore(
@@ -51,17 +64,18 @@ def process_job_description(json_file_path, model_name, qdrant_host, qdrant_port
             embedding=embeddings,
         )
 
-        # Process job descriptions and add to vector store
-        documents = [
-            Document(page_content=aggregate_job_description_data(job), metadata=job)
-            for job in job_description_json
-        ]
-
-        uuids = [str(uuid4()) for _ in range(len(job_description_json))]
-
-        vector_store.add_documents(documents=documents, ids=uuids)
+        # Stream records into the vector store in checkpointed batches
+        checkpoint_path = checkpoint_path_for(json_file_path, collection_name) if checkpoint else None
+        stats = stream_sync(
+            vector_store, client, collection_name, json_file_path,
+            to_document=lambda job: Document(page_content=aggregate_job_description_data(job), metadata=job),
+            batch_size=batch_size,
+            checkpoint_path=checkpoint_path,
+            delete_removed=delete_removed,
+        )
 
-        print("Data successfully uploaded to the Qdrant vector database.")
+        print(f"Data successfully synced to the Qdrant vector database: {stats}")
+        print(f"Stage timings: {stage_summary()}")
 
     except FileNotFoundError as fnf_error:
         print(f"Error: {fnf_error}")
@@ -73,6 +87,7 @@ def process_job_description(json_file_path, model_name, qdrant_host, qdrant_port
         print(f"An unexpected error occurred: {e}")
 
 if __name__ == "__main__":
+    start_metrics_server_from_env()
     process_job_description(
         json_file_path='job_description.json',
         model_name="llama3.2",
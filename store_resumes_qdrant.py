@@ -1,67 +1,134 @@
 import os
-import json
-from langchain_ollama import OllamaEmbeddings
-from uuid import uuid4
 from langchain_core.documents import Document
-from langchain_qdrant import QdrantVectorStore
 from qdrant_client import QdrantClient
-from qdrant_client.http.models import Distance, VectorParams
+from qdrant_client.http.models import Distance, VectorParams, SparseVectorParams, Modifier
+from embedding_cache import cached_ollama_embeddings
+from projection import Projection, ProjectedEmbeddings
+from ingestion import (
+    stream_sync, checkpoint_path_for, quantization_config, create_payload_indexes, resume_vector_store, has_sparse_vector,
+    resume_filter_payload,
+)
+from bm25_embeddings import SPARSE_VECTOR_NAME
+from instrumentation import stage_summary, start_metrics_server_from_env
 from aggregate_data import aggregate_resume_data
+from section_index import SectionVectorStore, section_vectors_config, is_section_collection
+from resume_store import ResumeStore, SlimVectorStore, is_slim_collection, prune_store
 
-def process_resumes(json_file_path, model_name, qdrant_host, qdrant_port, collection_name):
+def resume_writer(client, collection_name, embeddings, store=None):
+    """
+    Builds the vector store that writes resumes to an existing collection the way it was
+    created: section vectors for section collections, slim payloads when a ResumeStore is given.
+
+    Raises:
+        ValueError: If the collection holds slim points and no store is given, whose records
+            would be missing from the store, or full points and a store is given.
+    """
+    sections = is_section_collection(client.get_collection(collection_name))
+    slim = is_slim_collection(client, collection_name)
+    if slim and store is None:
+        raise ValueError(
+            f"Collection '{collection_name}' keeps its resumes in a resume store; pass its resume_store_path."
+        )
+    if slim is False and store is not None:
+        raise ValueError(
+            f"Collection '{collection_name}' keeps full resumes in its payload; ingest it without a resume store."
+        )
+    if store is not None:
+        return SlimVectorStore(
+            client, collection_name, embeddings, store,
+            sparse=has_sparse_vector(client, collection_name), sections=sections,
+        )
+    if sections:
+        return SectionVectorStore(client, collection_name, embeddings)
+    return resume_vector_store(client, collection_name, embeddings)
+
+def process_resumes(json_file_path, model_name, qdrant_host, qdrant_port, collection_name, delete_removed=False,
+                    batch_size=256, checkpoint=True, quantization=None, on_disk=False, projection_path=None,
+                    sections=False, resume_store_path=None):
     """
     Processes resumes from a JSON file and stores them in a Qdrant vector database.
 
     Args:
-        json_file_path (str): Path to the resumes JSON file.
+        json_file_path (str): Path to the resumes JSON or JSON Lines file.
         model_name (str): Name of the embedding model.
         qdrant_host (str): Host address for the Qdrant server.
         qdrant_port (int): Port number for the Qdrant server.
         collection_name (str): Name of the Qdrant collection.
+        delete_removed (bool): Delete points for records no longer in the JSON file. Off by
+            default because store_to_existing_collection.py adds resumes from other files
+            to the same collection, and those points would be deleted too. Replaced points of
+            the file's own resumes are deleted either way (see ingestion.sync_documents).
+        batch_size (int): Number of records embedded and upserted per batch.
+        checkpoint (bool): Resume an interrupted ingest after its last completed batch.
+        quantization (str, optional): "scalar" or "product" to store quantized vectors in RAM.
+        on_disk (bool): Keep the original vectors on disk when creating the collection.
+        projection_path (str, optional): Projection saved by projection.py, applied to every
+            vector. The API must use the same projection for queries.
+        sections (bool): Store one vector per resume section (see section_index.py) instead of
+            one vector of the aggregated text. Use a separate collection for this mode.
+        resume_store_path (str, optional): Write full records to a ResumeStore at this path and
+            keep only the filterable fields in the Qdrant payload. Use it from the first ingest
+            of a collection, and point the API's RESUME_STORE_PATH at the same file.
 
     Returns:
         None
     """
     try:
-        # Initialize embeddings and Qdrant client
-        embeddings = OllamaEmbeddings(model=model_name)
+        # Initialize cached, batched embeddings and Qdrant client
+        embeddings = cached_ollama_embeddings(model_name)
+        dimension = 3072
+        if projection_path:
+            projection = Projection.load(projection_path)
+            embeddings = ProjectedEmbeddings(embeddings, projection)
+            dimension = projection.dimension
         client = QdrantClient(host=qdrant_host, port=qdrant_port)
 
         # Load resumes from JSON file
         if not os.path.exists(json_file_path):
             raise FileNotFoundError(f"The file '{json_file_path}' does not exist.")
 
-        with open(json_file_path, 'r') as f:
-            resumes_json = json.load(f)
-
-        if not isinstance(resumes_json, list):
-            raise ValueError("Invalid data format. Expected a list of resumes.")
-
         # Check if collection exists, create if not
         if collection_name not in [collection.name for collection in client.get_collections().collections]:
             client.create_collection(
                 collection_name=collection_name,
-                vectors_config=VectorParams(size=3072, distance=Distance.COSINE),
+                vectors_config=(
+                    section_vectors_config(dimension, on_disk=on_disk) if sections
+                    else VectorParams(size=dimension, distance=Distance.COSINE, on_disk=on_disk)
+                ),
+                sparse_vectors_config={SPARSE_VECTOR_NAME: SparseVectorParams(modifier=Modifier.IDF)},
+                quantization_config=quantization_config(quantization),
             )
+        elif quantization:
+            client.update_collection(collection_name, quantization_config=quantization_config(quantization))
 
-        # Initialize Qdrant vector store
-        vector_store = QdrantVectorStore(
-            client=client,
-            collection_name=collection_name,
-            embedding=embeddings,
-        )
+        # Index the structured fields used as search filters
+        create_payload_indexes(client, collection_name)
 
-        # Process resumes and add to vector store
-        documents = [
-            Document(page_content=aggregate_resume_data(resume), metadata=resume)
-            for resume in resumes_json
-        ]
+        if sections != is_section_collection(client.get_collection(collection_name)):
+            raise ValueError(
+                f"Collection '{collection_name}' was created {'without' if sections else 'with'} section vectors."
+            )
 
-        uuids = [str(uuid4()) for _ in range(len(resumes_json))]
+        # Initialize Qdrant vector store (dense + BM25 sparse vectors when the collection supports it)
+        store = ResumeStore(resume_store_path) if resume_store_path else None
+        vector_store = resume_writer(client, collection_name, embeddings, store)
 
-        vector_store.add_documents(documents=documents, ids=uuids)
+        # Stream records into the vector store in checkpointed batches
+        checkpoint_path = checkpoint_path_for(json_file_path, collection_name) if checkpoint else None
+        stats = stream_sync(
+            vector_store, client, collection_name, json_file_path,
+            to_document=lambda resume: Document(page_content=aggregate_resume_data(resume), metadata=resume),
+            batch_size=batch_size,
+            checkpoint_path=checkpoint_path,
+            delete_removed=delete_removed,
+            extra_payload=resume_filter_payload,
+        )
+        if store:
+            stats['store_pruned'] = prune_store(store, client, collection_name)
+            store.close()
 
-        print("Resumes have been successfully uploaded to the vector store.")
+        print(f"Resumes have been successfully synced to the vector store: {stats}")
+        print(f"Stage timings: {stage_summary()}")
     except FileNotFoundError as e:
         print(f"Error: {e}")
     except ValueError as e:
@@ -70,6 +137,7 @@ def process_resumes(json_file_path, model_name, qdrant_host, qdrant_port, collec
         print(f"An unexpected error occurred: {e}")
 
 if __name__ == "__main__":
+    start_metrics_server_from_env()
     process_resumes(
         json_file_path='resumes_json.json',
         model_name="llama3.2",
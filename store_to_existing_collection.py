@@ -1,29 +1,36 @@
 import os
-import json
-from langchain_ollama import OllamaEmbeddings
-from uuid import uuid4
 from langchain_core.documents import Document
-from langchain_qdrant import QdrantVectorStore
 from qdrant_client import QdrantClient
 from qdrant_client.http.models import Distance, VectorParams
+from embedding_cache import cached_ollama_embeddings
+from instrumentation import stage_summary, start_metrics_server_from_env
+from ingestion import sync_documents, stream_sync, checkpoint_path_for, resume_filter_payload
+from resume_store import ResumeStore, prune_store
+from store_resumes_qdrant import resume_writer
 
-def upload_to_existing_collection(json_file, model_name, qdrant_host, qdrant_port, collection_name):
+def upload_to_existing_collection(json_file, model_name, qdrant_host, qdrant_port, collection_name,
+                                  batch_size=256, checkpoint=True, resume_store_path=None):
     """
     Uploads new data to an existing Qdrant collection.
 
     Args:
-        json_file_path (str): Path to the JSON file containing the data.
+        json_file (str or list): Path to a JSON or JSON Lines file containing the data,
+            or the list of data entries itself.
         model_name (str): Name of the embedding model.
         qdrant_host (str): Host address for the Qdrant server.
         qdrant_port (int): Port number for the Qdrant server.
         collection_name (str): Name of the existing Qdrant collection.
+        batch_size (int): Number of entries embedded and upserted per batch when streaming a file.
+        checkpoint (bool): Resume an interrupted upload of a file after its last completed batch.
+        resume_store_path (str, optional): ResumeStore of a collection ingested with one
+            (see store_resumes_qdrant.process_resumes); required for such collections.
 
     Returns:
         None
     """
     try:
-        # Initialize embeddings and Qdrant client
-        embeddings = OllamaEmbeddings(model=model_name)
+        # Initialize cached, batched embeddings and Qdrant client
+        embeddings = cached_ollama_embeddings(model_name)
         client = QdrantClient(host=qdrant_host, port=qdrant_port)
 
         # Check if collection exists
@@ -31,27 +38,36 @@ def upload_to_existing_collection(json_file, model_name, qdrant_host, qdrant_por
         if collection_name not in existing_collections:
             raise ValueError(f"Collection '{collection_name}' does not exist in Qdrant.")
 
-        if not isinstance(json_file, list):
+        if isinstance(json_file, str):
+            if not os.path.exists(json_file):
+                raise FileNotFoundError(f"The file '{json_file}' does not exist.")
+        elif not isinstance(json_file, list):
             raise ValueError("Invalid data format. Expected a list of data entries.")
 
-        # Initialize Qdrant vector store
-        vector_store = QdrantVectorStore(
-            client=client,
-            collection_name=collection_name,
-            embedding=embeddings,
-        )
+        # Write points the way the collection was created: hybrid, section or slim
+        store = ResumeStore(resume_store_path) if resume_store_path else None
+        vector_store = resume_writer(client, collection_name, embeddings, store)
 
-        # Process data and add to vector store
-        documents = [
-            Document(page_content=entry.get('aggregate_content', ''), metadata=entry)
-            for entry in json_file
-        ]
+        def to_document(entry):
+            return Document(page_content=entry.get('aggregate_content', ''), metadata=entry)
 
-        uuids = [str(uuid4()) for _ in range(len(json_file))]
+        # Deterministic IDs: unchanged entries already in the collection are not re-uploaded
+        if isinstance(json_file, str):
+            checkpoint_path = checkpoint_path_for(json_file, collection_name) if checkpoint else None
+            stats = stream_sync(
+                vector_store, client, collection_name, json_file, to_document,
+                batch_size=batch_size, checkpoint_path=checkpoint_path, delete_removed=False,
+                extra_payload=resume_filter_payload,
+            )
+        else:
+            stats = sync_documents(vector_store, client, collection_name, json_file, to_document, delete_removed=False,
+                                   extra_payload=resume_filter_payload)
+        if store:
+            stats['store_pruned'] = prune_store(store, client, collection_name)
+            store.close()
 
-        vector_store.add_documents(documents=documents, ids=uuids)
-
-        print(f"Data has been successfully uploaded to the collection '{collection_name}'.")
+        print(f"Data has been successfully uploaded to the collection '{collection_name}': {stats}")
+        print(f"Stage timings: {stage_summary()}")
     except FileNotFoundError as e:
         print(f"Error: {e}")
     except ValueError as e:
@@ -60,8 +76,9 @@ def upload_to_existing_collection(json_file, model_name, qdrant_host, qdrant_por
         print(f"An unexpected error occurred: {e}")
 
 if __name__ == "__main__":
+    start_metrics_server_from_env()
     upload_to_existing_collection(
-        json_file_path='new_data.json',  # Path to the JSON file containing new data
+        json_file='new_data.json',       # Path to the JSON file containing new data
         model_name="llama3.2",          # Embedding model name
         qdrant_host="localhost",        # Host address for Qdrant
         qdrant_port=6333,               # Port for Qdrant
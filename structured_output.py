@@ -0,0 +1,331 @@
+import re
+import json
+import time
+import logging
+import threading
+from functools import lru_cache
+from typing import List, Optional, Union
+from pydantic import BaseModel, ConfigDict, ValidationError, create_model, model_validator
+from format import job_description_format, resume_format
+
+# Ollama output format: "schema" constrains generation to the Pydantic JSON schema (Ollama 0.5+),
+# "json" only to syntactically valid JSON
+STRUCTURED_FORMAT = "schema"
+
+TRAILING_COMMA = re.compile(r',(\s*[}\]])')
+CODE_FENCE = re.compile(r'```(?:json)?', re.IGNORECASE)
+
+# Characters of the failed response quoted back to the model in the retry prompt
+RETRY_RESPONSE_CHARS = 4000
+
+
+class StructuredOutputError(ValueError):
+    """
+    Raised when a model response cannot be turned into JSON, even after the retry.
+    """
+
+
+class TemplateModel(BaseModel):
+    """
+    Base of the schemas derived from format.py. Missing and null fields fall back to
+    empty defaults, numbers are accepted where text is expected and extra keys are kept.
+    """
+    model_config = ConfigDict(extra='allow', coerce_numbers_to_str=True)
+
+    @model_validator(mode='before')
+    @classmethod
+    def drop_nulls(cls, data):
+        if isinstance(data, dict):
+            return {key: value for key, value in data.items() if value is not None}
+        return data
+
+
+def _strip_trailing_commas(text):
+    # Removes commas before a closing bracket, leaving string literals untouched
+    parts = re.split(r'("(?:[^"\\]|\\.)*")', text)
+    return ''.join(part if i % 2 else TRAILING_COMMA.sub(r'\1', part) for i, part in enumerate(parts))
+
+
+def _json_span(text):
+    # Returns the first balanced {...} or [...] block of text, skipping brackets inside strings
+    start = next((i for i, char in enumerate(text) if char in '{['), None)
+    if start is None:
+        return None
+    depth, in_string, escaped = 0, False, False
+    for i in range(start, len(text)):
+        char = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in '{[':
+            depth += 1
+        elif char in '}]':
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    # Unterminated output: close the brackets that are still open
+    closing = []
+    for char in _strip_trailing_commas(text[start:]):
+        if char in '{[':
+            closing.append('}' if char == '{' else ']')
+        elif char in '}]' and closing:
+            closing.pop()
+    return text[start:] + ''.join(reversed(closing))
+
+
+def repair_json(text):
+    """
+    Parses JSON from a model response, tolerating surrounding prose, code fences,
+    trailing commas and truncated closing brackets.
+
+    Args:
+        text (str): Raw model response.
+
+    Returns:
+        tuple: (parsed value, True if the response needed repairing).
+
+    Raises:
+        StructuredOutputError: If no JSON could be recovered.
+    """
+    try:
+        return json.loads(text), False
+    except (json.JSONDecodeError, TypeError):
+        pass
+
+    candidate = CODE_FENCE.sub('', text or '')
+    span = _json_span(candidate)
+    if span is not None:
+        for attempt in (span, _strip_trailing_commas(span)):
+            try:
+                return json.loads(attempt), True
+            except json.JSONDecodeError:
+                continue
+    if span is None:
+        raise StructuredOutputError("No JSON object found in model response")
+    try:
+        # Last resort: the first JSON value, ignoring whatever follows it
+        start = candidate.index(span[0])
+        return json.JSONDecoder().raw_decode(_strip_trailing_commas(candidate[start:]))[0], True
+    except json.JSONDecodeError as e:
+        raise StructuredOutputError(f"Invalid JSON in model response: {e}")
+
+
+def _field_type(name, example):
+    # Python type and default for a template value
+    if isinstance(example, dict):
+        model = schema_from_template(f"{name}Schema", example)
+        return model, model()
+    if isinstance(example, list):
+        if example and isinstance(example[0], dict):
+            return List[schema_from_template(f"{name}Item", example[0])], []
+        return List[str], []
+    if isinstance(example, bool):
+        return Optional[Union[bool, str]], None
+    if isinstance(example, (int, float)):
+        return Optional[Union[int, float, str]], None
+    return str, ""
+
+
+def template_fields(template):
+    """
+    Parses a format.py template into a dict, tolerating trailing commas.
+    """
+    return template if isinstance(template, dict) else repair_json(template)[0]
+
+
+def schema_from_template(name, template):
+    """
+    Builds a Pydantic model whose fields mirror a JSON template from format.py.
+
+    Args:
+        name (str): Name of the model class.
+        template (str or dict): The template text or its parsed value.
+
+    Returns:
+        type: A TemplateModel subclass.
+    """
+    fields = {}
+    for key, example in template_fields(template).items():
+        field_type, default = _field_type(key.title().replace('_', ''), example)
+        fields[key] = (field_type, default)
+    return create_model(name, __base__=TemplateModel, **fields)
+
+
+JobDescriptionSchema = schema_from_template('JobDescriptionSchema', job_description_format)
+ResumeSchema = schema_from_template('ResumeSchema', resume_format)
+
+
+@lru_cache()
+def schema_for_template(template):
+    """
+    Returns the schema of a format.py template, building it once for templates other than the two above.
+    """
+    if template == job_description_format:
+        return JobDescriptionSchema
+    if template == resume_format:
+        return ResumeSchema
+    return schema_from_template('TemplateSchema', template)
+
+
+def parse_structured(text, schema):
+    """
+    Repairs and validates a model response against a schema.
+
+    Returns:
+        tuple: (validated dict, True if the response needed repairing).
+
+    Raises:
+        StructuredOutputError: If the response holds no JSON object or fails validation.
+    """
+    data, repaired = repair_json(text)
+    if not isinstance(data, dict):
+        raise StructuredOutputError(f"Expected a JSON object, got {type(data).__name__}")
+    try:
+        return schema.model_validate(data).model_dump(), repaired
+    except ValidationError as e:
+        errors = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()[:10])
+        raise StructuredOutputError(f"Response does not match the format: {errors}")
+
+
+def retry_prompt(prompt, response, error):
+    """
+    Builds the follow-up prompt that shows the model its unusable answer and what was wrong with it.
+    """
+    return f"""{prompt}
+
+            Your previous answer could not be used: {error}
+            Previous answer: {(response or '')[:RETRY_RESPONSE_CHARS]}
+            Return only the corrected JSON object, with no comments or explanations.
+            """
+
+
+def output_format(schema):
+    """
+    Returns the Ollama format argument for a schema according to STRUCTURED_FORMAT.
+    """
+    return schema.model_json_schema() if STRUCTURED_FORMAT == "schema" else "json"
+
+
+class StructuredOutputStats:
+    """
+    Thread-safe counters of structured generations: how many documents succeeded, needed
+    repairing or a retry, or failed, and how much LLM time went to unusable responses.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.documents = 0
+        self.succeeded = 0
+        self.repaired = 0
+        self.retries = 0
+        self.failed = 0
+        self.llm_seconds = 0.0
+        self.wasted_llm_seconds = 0.0
+
+    def record(self, succeeded, repaired, retries, llm_seconds, wasted_llm_seconds):
+        with self._lock:
+            self.documents += 1
+            self.succeeded += succeeded
+            self.failed += not succeeded
+            self.repaired += repaired
+            self.retries += retries
+            self.llm_seconds += llm_seconds
+            self.wasted_llm_seconds += wasted_llm_seconds
+
+    def stats(self):
+        with self._lock:
+            return {
+                'documents': self.documents,
+                'succeeded': self.succeeded,
+                'failed': self.failed,
+                'repaired': self.repaired,
+                'retries': self.retries,
+                'success_rate': self.succeeded / self.documents if self.documents else 0.0,
+                'retries_per_document': self.retries / self.documents if self.documents else 0.0,
+                'llm_seconds': round(self.llm_seconds, 3),
+                'wasted_llm_seconds': round(self.wasted_llm_seconds, 3),
+            }
+
+
+class _Generation:
+    # Bookkeeping of one document across its first attempt and retry
+    def __init__(self, prompt, schema, stats):
+        self.prompt = prompt
+        self.schema = schema
+        self.stats = stats
+        self.llm_seconds = 0.0
+        self.wasted = 0.0
+        self.error = None
+        self.response = None
+
+    def next_prompt(self):
+        return self.prompt if self.error is None else retry_prompt(self.prompt, self.response, self.error)
+
+    def handle(self, response, seconds):
+        """
+        Returns the validated dict, or None after recording why the response was unusable.
+        """
+        self.llm_seconds += seconds
+        try:
+            data, repaired = parse_structured(response, self.schema)
+        except StructuredOutputError as e:
+            self.wasted += seconds
+            self.error, self.response = e, response
+            return None
+        self.finish(True, repaired)
+        return data
+
+    def finish(self, succeeded, repaired=False):
+        if self.stats is not None:
+            self.stats.record(succeeded, repaired, int(self.error is not None or not succeeded),
+                              self.llm_seconds, self.wasted)
+
+
+def invoke_structured(model, prompt, schema, stats=None):
+    """
+    Generates a JSON object matching schema, with one targeted retry on an unusable response.
+
+    Args:
+        model: The language model (an OllamaLLM or compatible runnable).
+        prompt (str): The extraction prompt.
+        schema (type): Pydantic model the response must match.
+        stats (StructuredOutputStats, optional): Counters to record the outcome in.
+
+    Returns:
+        dict: The validated response.
+
+    Raises:
+        StructuredOutputError: If the retry is unusable as well.
+    """
+    generation = _Generation(prompt, schema, stats)
+    for _ in range(2):
+        start = time.perf_counter()
+        response = model.invoke(generation.next_prompt(), format=output_format(schema))
+        data = generation.handle(response, time.perf_counter() - start)
+        if data is not None:
+            return data
+        logging.warning(f"Unusable structured output ({generation.error})")
+    generation.finish(False)
+    raise generation.error
+
+
+async def ainvoke_structured(model, prompt, schema, stats=None):
+    """
+    Async counterpart of invoke_structured.
+    """
+    generation = _Generation(prompt, schema, stats)
+    for _ in range(2):
+        start = time.perf_counter()
+        response = await model.ainvoke(generation.next_prompt(), format=output_format(schema))
+        data = generation.handle(response, time.perf_counter() - start)
+        if data is not None:
+            return data
+        logging.warning(f"Unusable structured output ({generation.error})")
+    generation.finish(False)
+    raise generation.error
@@ -0,0 +1,74 @@
+import asyncio
+import pytest
+from admission import AdmissionController, Coalescer, OverloadedError
+
+
+def test_full_queue_is_rejected_with_retry_after():
+    async def scenario():
+        controller = AdmissionController('test_queue', max_concurrency=1, max_queue=1, queue_timeout=5)
+        release = asyncio.Event()
+
+        async def hold():
+            async with controller.admit():
+                await release.wait()
+
+        holder = asyncio.ensure_future(hold())
+        waiter = asyncio.ensure_future(hold())
+        try:
+            while controller.stats()['active'] < 1 or controller.stats()['waiting'] < 1:
+                await asyncio.sleep(0)
+            with pytest.raises(OverloadedError) as excinfo:
+                async with controller.admit():
+                    pass
+        finally:
+            release.set()
+            await asyncio.gather(holder, waiter)
+        return excinfo.value
+
+    error = asyncio.run(scenario())
+    # One waiter at an average hold of 1s on a single slot
+    assert error.retry_after == 2
+
+
+def test_wait_longer_than_queue_timeout_is_shed():
+    async def scenario():
+        controller = AdmissionController('test_timeout', max_concurrency=1, max_queue=4, queue_timeout=0.01)
+        async with controller.admit():
+            with pytest.raises(OverloadedError):
+                async with controller.admit():
+                    pass
+        assert controller.stats()['waiting'] == 0
+        # The slot is free again once the holder leaves
+        async with controller.admit():
+            return controller.stats()['active']
+
+    assert asyncio.run(scenario()) == 1
+
+
+def test_overloaded_handler_sets_retry_after():
+    from main import overloaded_handler
+
+    response = asyncio.run(overloaded_handler(None, OverloadedError('busy', 3)))
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '3'
+
+
+def test_coalescer_shares_one_call_between_identical_keys():
+    calls = []
+
+    async def compute(key):
+        calls.append(key)
+        await asyncio.sleep(0.01)
+        return key.upper()
+
+    async def scenario():
+        coalescer = Coalescer('test')
+        results = await asyncio.gather(*(
+            coalescer.run(key, lambda key=key: compute(key)) for key in ['a', 'a', 'a', 'b']
+        ))
+        return results, len(coalescer)
+
+    results, in_flight = asyncio.run(scenario())
+    assert results == ['A', 'A', 'A', 'B']
+    assert sorted(calls) == ['a', 'b']
+    assert in_flight == 0
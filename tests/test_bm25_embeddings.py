@@ -0,0 +1,26 @@
+from bm25_embeddings import BM25SparseEmbeddings, tokenize, term_index
+
+
+def test_tokenize_keeps_skill_tokens():
+    assert tokenize('Built APIs in C++, C# and Node.js.') == ['built', 'apis', 'c++', 'c#', 'node.js']
+
+
+def test_tokenize_drops_stopwords_and_trailing_punctuation():
+    assert tokenize('The lead of a team-') == ['lead', 'team']
+    assert tokenize(None) == []
+
+
+def test_query_weights_each_distinct_term_once():
+    vector = BM25SparseEmbeddings().embed_query('python Python sql')
+    assert vector.indices == sorted([term_index('python'), term_index('sql')])
+    assert vector.values == [1.0, 1.0]
+
+
+def test_document_weights_saturate_with_term_frequency():
+    embeddings = BM25SparseEmbeddings()
+    once, = embeddings.embed_documents(['python sql'])
+    twice, = embeddings.embed_documents(['python python sql'])
+    weight = lambda vector, term: dict(zip(vector.indices, vector.values))[term_index(term)]
+    assert weight(once, 'python') < weight(twice, 'python') < 2 * weight(once, 'python')
+    # Longer documents weigh the same term frequency less
+    assert weight(twice, 'sql') < weight(once, 'sql')
@@ -0,0 +1,94 @@
+import os
+import pytest
+from dedup import SignatureIndex, deduplicate_texts, minhash_signature, estimated_similarity
+
+BASE = (
+    "Senior data engineer with eight years of experience building batch and streaming pipelines "
+    "on Spark, Kafka and Airflow. Led the migration of a reporting warehouse to BigQuery, cut "
+    "nightly job runtimes in half and mentored four junior engineers. Holds a master's degree in "
+    "computer science and the Google Cloud Professional Data Engineer certification."
+)
+OTHER = (
+    "Registered nurse specialised in paediatric intensive care, with a decade of bedside experience, "
+    "charge nurse duties on night shifts and training of new staff in ventilator management."
+)
+
+
+def near_duplicate(text):
+    # Case changes and an edit to the last word only alter one shingle
+    return text.replace('certification.', 'certificate.').upper()
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = SignatureIndex(str(tmp_path / 'index.sqlite'))
+    yield index
+    index.close()
+
+
+def test_signature_ignores_case_and_punctuation():
+    assert estimated_similarity(minhash_signature(BASE), minhash_signature(BASE.upper().replace(',', ''))) == 1.0
+
+
+def test_add_links_near_duplicates(index):
+    assert index.add('a.txt', BASE) == 'a.txt'
+    assert index.add('b.txt', near_duplicate(BASE)) == 'a.txt'
+    assert index.add('c.txt', OTHER) == 'c.txt'
+    assert index.duplicates() == {'b.txt': 'a.txt'}
+    assert index.duplicates_of('a.txt') == ['b.txt']
+
+
+def test_remove_canonical_returns_orphans_for_relinking(index):
+    index.add('a.txt', BASE)
+    index.add('b.txt', near_duplicate(BASE))
+    index.add('c.txt', BASE + ' ')
+
+    orphans = index.remove('a.txt')
+    assert sorted(orphans) == ['b.txt', 'c.txt']
+    assert 'a.txt' not in index.sources()
+
+    # Adding the orphans again makes the first one canonical and links the other to it
+    canonicals = [index.add(source, text) for source, text in [('b.txt', near_duplicate(BASE)), ('c.txt', BASE + ' ')]]
+    assert canonicals == ['b.txt', 'b.txt']
+    assert index.duplicates() == {'c.txt': 'b.txt'}
+
+
+def test_readding_a_changed_text_updates_its_link(index):
+    index.add('a.txt', BASE)
+    index.add('b.txt', near_duplicate(BASE))
+    assert index.add('b.txt', OTHER) == 'b.txt'
+    assert index.duplicates() == {}
+    assert index.remove('a.txt') == []
+
+
+def test_deduplicate_texts_relinks_after_canonical_is_deleted(tmp_path):
+    text_dir = tmp_path / 'texts'
+    text_dir.mkdir()
+    (text_dir / 'a.txt').write_text(BASE)
+    (text_dir / 'b.txt').write_text(near_duplicate(BASE))
+    (text_dir / 'c.txt').write_text(BASE + ' ')
+    (text_dir / 'd.txt').write_text(OTHER)
+    (text_dir / 'notes.md').write_text(BASE)
+    index_path = str(tmp_path / 'index.sqlite')
+
+    assert deduplicate_texts(str(text_dir), index_path) == {'b.txt': 'a.txt', 'c.txt': 'a.txt'}
+
+    os.remove(text_dir / 'a.txt')
+    assert deduplicate_texts(str(text_dir), index_path) == {'c.txt': 'b.txt'}
+
+
+def test_deduplicate_texts_relinks_after_canonical_changes(tmp_path):
+    text_dir = tmp_path / 'texts'
+    text_dir.mkdir()
+    (text_dir / 'a.txt').write_text(BASE)
+    (text_dir / 'b.txt').write_text(near_duplicate(BASE))
+    index_path = str(tmp_path / 'index.sqlite')
+
+    assert deduplicate_texts(str(text_dir), index_path) == {'b.txt': 'a.txt'}
+
+    (text_dir / 'a.txt').write_text(OTHER)
+    assert deduplicate_texts(str(text_dir), index_path) == {}
+
+    # b.txt is now canonical, so the old text reappearing elsewhere links to it
+    (text_dir / 'c.txt').write_text(BASE)
+    assert deduplicate_texts(str(text_dir), index_path) == {'c.txt': 'b.txt'}
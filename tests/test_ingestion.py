@@ -0,0 +1,149 @@
+import json
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_qdrant import QdrantVectorStore
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import Distance, VectorParams
+from ingestion import (
+    point_id, content_point_id, record_fingerprint, existing_point_states, sync_documents, stream_sync,
+    iter_json_records, checkpoint_path_for, load_checkpoint, save_checkpoint,
+)
+from extractResumeJsonFormat import merge_jsonl_results, write_duplicate_links
+
+RESUME = {'Name': 'Ada Lovelace', 'Skills': ['Python']}
+
+
+def test_duplicate_links_keep_the_point_id(tmp_path):
+    results = tmp_path / 'results.jsonl'
+    results.write_text(json.dumps({'index': 0, 'source': 'a.txt', 'data': RESUME}) + '\n')
+    output = tmp_path / 'resumes.json'
+
+    merge_jsonl_results(str(results), str(output))
+    before = json.loads(output.read_text())[0]
+    write_duplicate_links(str(results), {'b.txt': 'a.txt'})
+    merge_jsonl_results(str(results), str(output))
+    after = json.loads(output.read_text())[0]
+
+    assert before['Source'] == 'a.txt'
+    assert after['DuplicateSources'] == ['b.txt']
+    assert point_id(after) == point_id(before)
+    assert record_fingerprint(after) == record_fingerprint(RESUME)
+
+
+def test_point_id_is_keyed_by_source():
+    edited = {**RESUME, 'Skills': ['Python', 'SQL'], 'Source': 'a.txt'}
+    assert point_id({**RESUME, 'Source': 'a.txt'}) == point_id(edited)
+    assert point_id({**RESUME, 'Source': 'b.txt'}) != point_id(edited)
+    assert record_fingerprint(RESUME) != record_fingerprint(edited)
+    # Records without a source are keyed by content
+    assert point_id(RESUME) == content_point_id({**RESUME, 'Source': 'a.txt'}) != point_id(edited)
+
+
+@pytest.fixture
+def collection(tmp_path, monkeypatch):
+    # Collection version markers are written under the working directory
+    monkeypatch.chdir(tmp_path)
+    client = QdrantClient(':memory:')
+    client.create_collection('resumes', vectors_config=VectorParams(size=8, distance=Distance.COSINE))
+    vector_store = QdrantVectorStore(client=client, collection_name='resumes', embedding=DeterministicFakeEmbedding(size=8))
+    yield client, vector_store
+    client.close()
+
+
+def to_document(resume):
+    return Document(page_content=json.dumps(resume), metadata=resume)
+
+
+def resume(source, skill, **fields):
+    return {'Name': source, 'Skills': [skill], 'Source': source, **fields}
+
+
+def test_sync_updates_edited_records_in_place(collection):
+    client, vector_store = collection
+    records = [resume('a.txt', 'Python'), resume('b.txt', 'SQL')]
+    assert sync_documents(vector_store, client, 'resumes', records, to_document) == \
+        {'added': 2, 'updated': 0, 'unchanged': 0, 'deleted': 0}
+    assert sync_documents(vector_store, client, 'resumes', records, to_document)['unchanged'] == 2
+
+    edited = [resume('a.txt', 'Rust'), records[1]]
+    assert sync_documents(vector_store, client, 'resumes', edited, to_document) == \
+        {'added': 0, 'updated': 1, 'unchanged': 1, 'deleted': 0}
+    assert client.count('resumes').count == 2
+    point = client.retrieve('resumes', [point_id(edited[0])])[0]
+    assert point.payload['metadata']['Skills'] == ['Rust']
+    assert point.payload['source'] == 'a.txt'
+
+
+def test_sync_only_deletes_replaced_points_of_synced_sources(collection):
+    client, vector_store = collection
+    other = resume('other.txt', 'Go')
+    sync_documents(vector_store, client, 'resumes', [resume('a.txt', 'Python'), resume('b.txt', 'SQL'), other], to_document)
+    # A point written before records were keyed by source
+    legacy = resume('c.txt', 'Java')
+    vector_store.add_documents([to_document(legacy)], ids=[content_point_id(legacy)])
+
+    # b.txt is now a near-duplicate of a.txt and other.txt comes from another file
+    records = [resume('a.txt', 'Python', DuplicateSources=['b.txt']), legacy]
+    stats = sync_documents(vector_store, client, 'resumes', records, to_document)
+    assert stats['deleted'] == 2
+    assert set(existing_point_states(client, 'resumes')) == {point_id(records[0]), point_id(legacy), point_id(other)}
+
+    stats = sync_documents(vector_store, client, 'resumes', records, to_document, delete_removed=True)
+    assert stats['deleted'] == 1
+    assert client.count('resumes').count == 2
+
+
+RECORDS = [{'Name': f'resume {i}', 'Summary': 'x' * i} for i in range(7)]
+
+
+def test_iter_json_records_reads_arrays_across_chunks(tmp_path):
+    path = tmp_path / 'resumes.json'
+    path.write_text(json.dumps(RECORDS, indent=2))
+    assert list(iter_json_records(str(path), chunk_size=5)) == RECORDS
+
+    path.write_text('\n'.join(json.dumps(record) for record in RECORDS) + '\n')
+    assert list(iter_json_records(str(path), chunk_size=5)) == RECORDS
+
+
+@pytest.mark.parametrize('text', [json.dumps(RECORDS)[:-20], 'name,skills\n'])
+def test_iter_json_records_rejects_truncated_or_other_files(tmp_path, text):
+    path = tmp_path / 'resumes.json'
+    path.write_text(text)
+    with pytest.raises(ValueError):
+        list(iter_json_records(str(path), chunk_size=5))
+
+
+def test_checkpoint_is_ignored_after_the_file_changes(tmp_path):
+    path = tmp_path / 'resumes.json'
+    path.write_text(json.dumps(RECORDS))
+    checkpoint = str(tmp_path / 'resumes.checkpoint.json')
+    save_checkpoint(checkpoint, str(path), 4)
+    assert load_checkpoint(checkpoint, str(path)) == 4
+
+    path.write_text(json.dumps(RECORDS + RECORDS[:1]))
+    assert load_checkpoint(checkpoint, str(path)) == 0
+
+
+def test_stream_sync_resumes_after_the_last_completed_batch(collection, tmp_path):
+    client, vector_store = collection
+    path = tmp_path / 'resumes.json'
+    path.write_text(json.dumps(RECORDS))
+    checkpoint = checkpoint_path_for(str(path), 'resumes')
+    fail_on = {'resume 5'}
+
+    def flaky_to_document(record):
+        if record['Name'] in fail_on:
+            raise RuntimeError('interrupted')
+        return to_document(record)
+
+    with pytest.raises(RuntimeError):
+        stream_sync(vector_store, client, 'resumes', str(path), flaky_to_document, batch_size=2, checkpoint_path=checkpoint)
+    assert load_checkpoint(checkpoint, str(path)) == 4
+    assert client.count('resumes').count == 4
+
+    fail_on.clear()
+    stats = stream_sync(vector_store, client, 'resumes', str(path), flaky_to_document, batch_size=2, checkpoint_path=checkpoint)
+    assert stats == {'added': 3, 'updated': 0, 'unchanged': 0, 'deleted': 0, 'resumed': 4}
+    assert client.count('resumes').count == 7
+    assert not (tmp_path / checkpoint).exists()
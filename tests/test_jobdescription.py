@@ -0,0 +1,54 @@
+import asyncio
+import json
+
+from format import job_description_format
+from jobdescription import acreate_job_descriptions, filled_slots, posting_field
+
+
+class FakeModel:
+    """Async model double returning a distinct posting on every call."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def bind(self, **kwargs):
+        return self
+
+    async def ainvoke(self, prompt, **kwargs):
+        self.calls += 1
+        words = ' '.join(f'term{self.calls}x{i}' for i in range(30))
+        return json.dumps({'job_title': f'Role {self.calls}', 'job_summary': words, 'skills': [words]})
+
+
+def test_posting_field_matches_title_then_department():
+    fields = ['software engineer', 'quality assurance', 'chef']
+    assert posting_field({'job_title': 'Software Engineer', 'department': 'Engineering'}, fields) == 'software engineer'
+    assert posting_field({'job_title': 'QA Engineer', 'department': 'Quality Assurance'}, fields) == 'quality assurance'
+    assert posting_field({'job_title': 'Chef de Cuisine'}, fields) == 'chef'
+    assert posting_field({'job_title': 'Pilot', 'department': 'Aviation'}, fields) is None
+
+
+def test_filled_slots_counts_postings_without_generation():
+    jobs = [{'job_title': 'Chef'}] * 3 + [{'job_title': 'Chef', 'generation': {'field': 'chef', 'example': 0}}]
+    assert filled_slots(jobs, ['chef', 'teacher'], 3) == {('chef', 0), ('chef', 1), ('chef', 2)}
+
+
+def test_rerun_only_generates_missing_slots(tmp_path):
+    path = tmp_path / 'jobs.json'
+    path.write_text(json.dumps([{'job_title': 'Chef', 'department': 'Culinary'}] * 2))
+    model = FakeModel()
+
+    jobs = asyncio.run(acreate_job_descriptions(
+        model, ['chef', 'teacher'], job_description_format, number_example=2, filename=str(path),
+    ))
+    assert model.calls == 2
+    assert len(jobs) == 4
+    assert {(job['generation']['field'], job['generation']['example']) for job in jobs[2:]} == {
+        ('teacher', 0), ('teacher', 1),
+    }
+
+    asyncio.run(acreate_job_descriptions(
+        model, ['chef', 'teacher'], job_description_format, number_example=2, filename=str(path),
+    ))
+    assert model.calls == 2
+    assert len(json.loads(path.read_text())) == 4
@@ -0,0 +1,51 @@
+from language_routing import detect_language, detection_sample, needs_translation, split_chunks
+from llm_cache import LLMCache, cache_key
+
+ENGLISH_TEXT = (
+    "Experienced software engineer with a strong background in distributed systems, "
+    "cloud infrastructure and data pipelines. Led a team of five developers."
+)
+FRENCH_TEXT = (
+    "Ingénieur logiciel expérimenté avec une solide expérience des systèmes distribués, "
+    "de l'infrastructure cloud et des pipelines de données. A dirigé une équipe de cinq développeurs."
+)
+
+
+def test_detect_language():
+    assert detect_language(ENGLISH_TEXT) == 'en'
+    assert detect_language(FRENCH_TEXT) == 'fr'
+    assert detect_language('12345 --- 678') == 'unknown'
+    assert not needs_translation('en') and not needs_translation('unknown') and needs_translation('fr')
+
+
+def test_detection_sample_is_bounded_and_normalized():
+    assert detection_sample('a  b\n\nc', max_chars=3) == 'a b'
+    assert len(detection_sample('word ' * 2000)) == 2000
+
+
+def test_detections_are_cached_apart_from_llm_results(tmp_path):
+    cache = LLMCache(str(tmp_path / 'cache.sqlite'))
+    try:
+        cache.put(cache_key('llama3.2', 'template', 'text'), '{}')
+        assert detect_language(FRENCH_TEXT, cache=cache) == 'fr'
+        assert detect_language(FRENCH_TEXT, cache=cache) == 'fr'
+
+        detections = cache.namespace('language_detections').stats()
+        assert (detections['hits'], detections['misses'], detections['entries']) == (1, 1, 1)
+        llm = cache.stats()
+        assert (llm['hits'], llm['misses'], llm['entries']) == (0, 0, 1)
+    finally:
+        cache.close()
+
+
+def test_split_chunks_prefers_section_then_line_breaks():
+    text = 'Summary\nline\n\nSkills: ' + 'x' * 20 + '\n\nExperience\n' + 'y' * 12 + '\n' + 'z' * 12
+    chunks = split_chunks(text, max_chars=30)
+    assert chunks == ['Summary\nline', 'Skills: ' + 'x' * 20, 'Experience\n\n' + 'y' * 12, 'z' * 12]
+    assert all(len(chunk) <= 30 for chunk in chunks)
+
+
+def test_split_chunks_splits_long_lines_and_skips_blank_sections():
+    chunks = split_chunks('a' * 25 + '\n\n   \n\nb', max_chars=10)
+    assert chunks == ['a' * 10, 'a' * 10, 'a' * 5 + '\n\nb']
+    assert split_chunks('') == []
@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+from local_index import LocalIndexWriter, LocalIndex
+
+COUNT = 600
+DIMENSION = 48
+SKILLS = ['Python', 'SQL', 'Java']
+
+
+def metadata_for(row):
+    return {
+        'Skills': [SKILLS[row % 3]] + (['Docker'] if row % 2 == 0 else []),
+        'Education': [{'Degree': 'BSc', 'Year': str(2010 + row % 5)}],
+    }
+
+
+@pytest.fixture(scope='module')
+def index_dir(tmp_path_factory):
+    index_dir = str(tmp_path_factory.mktemp('local_index'))
+    vectors = np.random.RandomState(0).standard_normal((COUNT, DIMENSION)).astype(np.float32)
+    writer = LocalIndexWriter(index_dir)
+    # Two batches, so rows and record offsets continue across add calls
+    for start, end in [(0, 250), (250, COUNT)]:
+        rows = range(start, end)
+        writer.add([f'id-{row}' for row in rows], vectors[start:end],
+                   [f'resume {row}' for row in rows], [metadata_for(row) for row in rows])
+    writer.close()
+    return index_dir, vectors
+
+
+def exact_top_k(vectors, query, top_k, rows=None):
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    scores = normalized @ (query / np.linalg.norm(query))
+    rows = np.arange(len(vectors)) if rows is None else np.asarray(rows)
+    return [int(row) for row in rows[np.argsort(-scores[rows])][:top_k]]
+
+
+def test_search_matches_brute_force(index_dir):
+    index_dir, vectors = index_dir
+    index = LocalIndex(index_dir)
+    queries = vectors[:5] + 0.1
+    try:
+        results = index.search(queries, top_k=10)
+        for query, result in zip(queries, results):
+            assert [row for row, _ in result] == exact_top_k(vectors, query, 10)
+            scores = [score for _, score in result]
+            assert scores == sorted(scores, reverse=True)
+        assert index.search(vectors[7:8] * 3, top_k=1)[0][0][0] == 7
+        assert index.record(300) == {'page_content': 'resume 300', 'metadata': metadata_for(300)}
+    finally:
+        index.close()
+
+
+def test_quantized_search_recall(index_dir):
+    index_dir, vectors = index_dir
+    index = LocalIndex(index_dir, quantized=True)
+    queries = np.random.RandomState(1).standard_normal((20, DIMENSION)).astype(np.float32)
+    try:
+        results = index.search(queries, top_k=10)
+        hits = sum(len({row for row, _ in result} & set(exact_top_k(vectors, query, 10)))
+                   for query, result in zip(queries, results))
+        assert hits / (10 * len(queries)) >= 0.95
+        # Returned scores are the rescored float32 similarities
+        row, score = results[0][0]
+        expected = vectors[row] @ queries[0] / np.linalg.norm(vectors[row]) / np.linalg.norm(queries[0])
+        assert score == pytest.approx(expected, abs=1e-5)
+    finally:
+        index.close()
+
+
+@pytest.mark.parametrize('quantized', [False, True])
+def test_search_filters(index_dir, quantized):
+    index_dir, vectors = index_dir
+    index = LocalIndex(index_dir, quantized=quantized)
+    query = vectors[0]
+    try:
+        # Every skill must match
+        rows = [row for row, _ in index.search([query], top_k=20, filters={'skills': ['Python', 'Docker']})[0]]
+        allowed = [row for row in range(COUNT) if row % 6 == 0]
+        assert rows == exact_top_k(vectors, query, 20, allowed)
+
+        # Any education year matches
+        rows = [row for row, _ in index.search([query], top_k=COUNT, filters={'education_years': ['2011', '2013']})[0]]
+        assert sorted(rows) == [row for row in range(COUNT) if row % 5 in (1, 3)]
+
+        # Case is ignored
+        assert index.search([query], top_k=20, filters={'skills': ['PYTHON', 'docker']})[0] == \
+            index.search([query], top_k=20, filters={'skills': ['Python', 'Docker']})[0]
+
+        assert index.search([query], top_k=5, filters={'skills': ['Rust']}) == [[]]
+        assert len(index.search([query], top_k=5, filters={'skills': []})[0]) == 5
+    finally:
+        index.close()
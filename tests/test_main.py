@@ -0,0 +1,32 @@
+import pytest
+from fastapi.testclient import TestClient
+import main
+
+ENDPOINTS = [
+    ('get', '/similar-resumes', {'params': {'job_description': 'Data engineer'}}),
+    ('post', '/similar-resumes', {'json': {'job_title': 'Data engineer'}}),
+    ('get', '/similar-resumes/stream', {'params': {'job_description': 'Data engineer'}}),
+    ('get', '/similar-jobs/00000000-0000-0000-0000-000000000001', {}),
+]
+
+
+@pytest.fixture(scope='module')
+def api():
+    with TestClient(main.app) as client:
+        yield client
+
+
+@pytest.mark.parametrize('top_k', [-1, 0, main.MAX_TOP_K + 1])
+@pytest.mark.parametrize('method, path, kwargs', ENDPOINTS)
+def test_top_k_out_of_range_is_rejected(api, method, path, kwargs, top_k):
+    kwargs = {**kwargs, 'params': {**kwargs.get('params', {}), 'top_k': top_k}}
+    response = getattr(api, method)(path, **kwargs)
+    assert response.status_code == 422
+    assert [error['loc'] for error in response.json()['detail']] == [['query', 'top_k']]
+
+
+@pytest.mark.parametrize('top_k', [-1, 0, main.MAX_TOP_K + 1])
+def test_batch_top_k_out_of_range_is_rejected(api, top_k):
+    response = api.post('/similar-resumes/batch', json={'job_descriptions': ['Data engineer'], 'top_k': top_k})
+    assert response.status_code == 422
+    assert [error['loc'] for error in response.json()['detail']] == [['body', 'top_k']]
@@ -0,0 +1,80 @@
+import pytest
+from fastapi.testclient import TestClient
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.http.models import Distance, VectorParams, PointStruct
+import main
+from precompute_job_matches import JobMatchStore, collection_versions
+from query_cache import bump_collection_version
+
+RESUME_ID = '00000000-0000-0000-0000-000000000001'
+PRECOMPUTED = [{'id': 'precomputed', 'job_title': 'Stored', 'content': 'stored', 'similarity': 1.0}]
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    # Collection version markers are read from the working directory
+    monkeypatch.chdir(tmp_path)
+    return JobMatchStore(str(tmp_path / 'matches.sqlite'))
+
+
+def test_store_round_trip(store):
+    store.put_many({'r1': [{'id': 'j1'}, {'id': 'j2'}], 'r2': [{'id': 'j3'}]})
+    assert store.get('r1', 1) == [{'id': 'j1'}]
+    assert store.get('r1', 5) == [{'id': 'j1'}, {'id': 'j2'}]
+    assert store.get('r3', 5) is None
+
+    store.put_many({'r1': [{'id': 'j4'}]})
+    assert store.get('r1', 5) == [{'id': 'j4'}]
+    assert store.delete_except(['r1']) == 1
+    assert store.get('r2', 5) is None
+
+
+def test_store_is_stale_after_an_ingest(store):
+    assert not store.is_current(collection_versions('resumes', 'jobs'))
+    bump_collection_version('jobs')
+    store.set_versions(collection_versions('resumes', 'jobs'))
+    assert store.is_current(collection_versions('resumes', 'jobs'))
+
+    bump_collection_version('jobs')
+    assert not store.is_current(collection_versions('resumes', 'jobs'))
+    store.set_versions(collection_versions('resumes', 'jobs'))
+    bump_collection_version('resumes')
+    assert not store.is_current(collection_versions('resumes', 'jobs'))
+
+
+@pytest.fixture
+def api(store, monkeypatch):
+    monkeypatch.setattr(main, 'get_job_match_store', lambda: store)
+    with TestClient(main.app) as client:
+        qdrant = AsyncQdrantClient(location=':memory:')
+        client.portal.call(setup_collections, qdrant)
+        main.app.state.qdrant = qdrant
+        yield client
+
+
+async def setup_collections(qdrant):
+    for name in (main.COLLECTION_NAME, main.JOB_COLLECTION_NAME):
+        await qdrant.create_collection(name, vectors_config=VectorParams(size=2, distance=Distance.COSINE))
+    await qdrant.upsert(main.COLLECTION_NAME, [PointStruct(id=RESUME_ID, vector=[1.0, 0.0])])
+    await qdrant.upsert(main.JOB_COLLECTION_NAME, [
+        PointStruct(id=i, vector=vector, payload={'page_content': title, 'metadata': {'job_title': title}})
+        for i, (vector, title) in enumerate([([1.0, 0.1], 'Close'), ([0.0, 1.0], 'Far')], start=1)
+    ])
+
+
+def test_similar_jobs_serves_current_table(api, store):
+    store.put_many({RESUME_ID: PRECOMPUTED})
+    store.set_versions(collection_versions(main.COLLECTION_NAME, main.JOB_COLLECTION_NAME))
+    assert api.get(f'/similar-jobs/{RESUME_ID}', params={'top_k': 1}).json() == PRECOMPUTED
+
+    # Too few precomputed matches, or precomputed=false: live search
+    live = api.get(f'/similar-jobs/{RESUME_ID}', params={'top_k': 2}).json()
+    assert [match['job_title'] for match in live] == ['Close', 'Far']
+    assert api.get(f'/similar-jobs/{RESUME_ID}', params={'top_k': 1, 'precomputed': False}).json()[0]['job_title'] == 'Close'
+
+
+def test_similar_jobs_falls_back_after_job_ingest(api, store):
+    store.put_many({RESUME_ID: PRECOMPUTED})
+    store.set_versions(collection_versions(main.COLLECTION_NAME, main.JOB_COLLECTION_NAME))
+    bump_collection_version(main.JOB_COLLECTION_NAME)
+    assert api.get(f'/similar-jobs/{RESUME_ID}', params={'top_k': 1}).json()[0]['job_title'] == 'Close'
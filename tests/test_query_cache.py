@@ -0,0 +1,49 @@
+from query_cache import (
+    TTLCache, QueryResultCache, bump_collection_version, collection_version, normalize_query_text, query_cache_key,
+)
+
+
+def test_ttl_cache_expires_entries(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr('query_cache.time.monotonic', lambda: now[0])
+    cache = TTLCache(ttl=10)
+    cache.put('a', 1)
+    assert cache.get('a') == 1
+    now[0] += 11
+    assert cache.get('a') is None
+    assert cache.stats()['entries'] == 0
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(max_entries=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    cache.get('a')
+    cache.put('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+
+
+def test_query_keys_ignore_case_spacing_and_dict_order():
+    assert normalize_query_text('  Senior   PYTHON\tdeveloper ') == 'senior python developer'
+    assert query_cache_key('search', {'top_k': 5, 'q': 'x'}) == query_cache_key('search', {'q': 'x', 'top_k': 5})
+    assert query_cache_key('search', 5) != query_cache_key('search', 6)
+
+
+def test_result_cache_is_cleared_when_the_collection_version_is_bumped(tmp_path):
+    cache = QueryResultCache('resumes', version_dir=str(tmp_path))
+    cache.put('q', ['resume'])
+    assert cache.get('q') == ['resume']
+    assert collection_version('resumes', str(tmp_path)) is None
+
+    bump_collection_version('resumes', str(tmp_path))
+    assert collection_version('resumes', str(tmp_path)) is not None
+    assert cache.get('q') is None
+    assert cache.stats()['invalidations'] == 1
+
+    cache.put('q', ['new resume'])
+    assert cache.get('q') == ['new resume']
+    # Another collection's version does not touch this cache
+    bump_collection_version('jobs', str(tmp_path))
+    assert cache.get('q') == ['new resume']
+    assert cache.stats()['invalidations'] == 1
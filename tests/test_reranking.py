@@ -0,0 +1,84 @@
+import asyncio
+import json
+import pytest
+from reranking import Reranker, RERANK_FALLBACKS, feature_scores, job_requirements
+
+JOB = {
+    'skills': ['Java', 'C', 'Go', 'Machine Learning'],
+    'required_qualifications': ["Bachelor's degree in computer science", '5+ years of backend development'],
+}
+
+
+def test_job_requirements():
+    assert job_requirements(JOB) == {'skills': {'java', 'c', 'go', 'machine learning'}, 'years': 5, 'degree': 2}
+
+
+@pytest.mark.parametrize('skills, content, expected', [
+    # Substrings and ambiguous short skills in the text do not count
+    ([], 'JavaScript developer who likes to go climbing, C level reporting', 0.0),
+    ([], 'Built Java services and machine-learning pipelines', 0.25),
+    ([], 'Applied machine learning to ranking in Java.', 0.5),
+    # Short skills match the resume's Skills
+    (['c', ' GO '], 'JavaScript', 0.5),
+])
+def test_skill_overlap_matches_whole_terms(skills, content, expected):
+    scores = feature_scores(job_requirements(JOB), {'Skills': skills}, content)
+    assert scores['skills'] == expected
+
+
+def test_experience_and_education_features():
+    resume = {
+        'Experience': [{'Dates': '2015 - 2018'}, {'Dates': '2018 - 2019'}],
+        'Education': [{'Degree': 'Associate degree', 'Institution': 'City College'}],
+    }
+    scores = feature_scores(job_requirements(JOB), resume)
+    assert scores['experience'] == pytest.approx(4 / 5)
+    assert scores['education'] == pytest.approx(1 / 2)
+    # Features the job does not specify are left out
+    assert feature_scores(job_requirements({'skills': []}), resume) == {}
+
+
+def hits():
+    return [
+        {'id': 'a', 'similarity': 0.9, 'content': 'Sales manager', 'metadata': {'Skills': ['Sales']}},
+        {'id': 'b', 'similarity': 0.8, 'content': 'Java engineer', 'metadata': {
+            'Skills': ['Java', 'Go', 'C'], 'Experience': [{'Dates': '2010 - 2020'}], 'Education': [{'Degree': 'BSc'}],
+        }},
+    ]
+
+
+def test_rerank_orders_by_features():
+    results = asyncio.run(Reranker(budget_seconds=5).rerank(JOB, hits(), top_k=2))
+    assert [result['id'] for result in results] == ['b', 'a']
+    assert 'metadata' not in results[0] and results[0]['rerank_score'] > results[1]['rerank_score']
+
+
+def test_rerank_falls_back_to_vector_order_when_out_of_budget():
+    before = RERANK_FALLBACKS.labels('features')._value.get()
+    results = asyncio.run(Reranker(budget_seconds=-1).rerank(JOB, hits(), top_k=2))
+    assert [result['id'] for result in results] == ['a', 'b']
+    assert 'rerank_score' not in results[0]
+    assert RERANK_FALLBACKS.labels('features')._value.get() == before + 1
+
+
+class SlowJudge:
+    # Answers like an Ollama model, after a delay
+    def __init__(self, delay, scores):
+        self.delay = delay
+        self.scores = scores
+
+    async def ainvoke(self, prompt, **kwargs):
+        await asyncio.sleep(self.delay)
+        return json.dumps({'scores': [{'id': id_, 'score': score} for id_, score in self.scores.items()]})
+
+
+def test_rerank_judge_reorders_the_head():
+    results = asyncio.run(Reranker(budget_seconds=5).rerank(JOB, hits(), top_k=2, model=SlowJudge(0, {'a': 10, 'b': 0})))
+    assert [result['id'] for result in results] == ['a', 'b']
+
+
+def test_rerank_keeps_feature_order_when_judge_is_late():
+    before = RERANK_FALLBACKS.labels('judge')._value.get()
+    results = asyncio.run(Reranker(budget_seconds=0.05).rerank(JOB, hits(), top_k=2, model=SlowJudge(1, {'a': 10})))
+    assert [result['id'] for result in results] == ['b', 'a']
+    assert RERANK_FALLBACKS.labels('judge')._value.get() == before + 1
@@ -0,0 +1,116 @@
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_qdrant import QdrantVectorStore
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import Distance, VectorParams
+from resume_store import ResumeStore, SlimVectorStore, slim_metadata, slim_payload
+from section_index import SectionVectorStore, section_vectors_config
+from store_resumes_qdrant import resume_writer
+
+RESUME = {
+    'Name': 'Ada Lovelace',
+    'Email': 'ada@example.com',
+    'Skills': ['Python', 'SQL'],
+    'Certifications': ['AWS Solutions Architect'],
+    'Languages': ['English', 'French'],
+    'Education': [
+        {'Degree': 'BSc Mathematics', 'Institution': 'University of London', 'Year': '2015'},
+        {'Degree': 'MSc Computer Science', 'Institution': 'Imperial College', 'Year': '2017'},
+    ],
+    'Experience': [{'Title': 'Engineer', 'Company': 'Analytical Engines', 'Duration': '5 years'}],
+    'Source': 'ada.pdf',
+}
+
+
+def test_slim_metadata_keeps_only_indexed_fields():
+    assert slim_metadata(RESUME) == {
+        'Skills': ['Python', 'SQL'],
+        'Certifications': ['AWS Solutions Architect'],
+        'Languages': ['English', 'French'],
+        'Education': [{'Year': '2015'}, {'Year': '2017'}],
+    }
+
+
+def test_slim_metadata_tolerates_missing_and_malformed_fields():
+    assert slim_metadata({'Name': 'Ada', 'Education': ['BSc', {'Degree': 'MSc'}]}) == {'Education': [{}]}
+    assert slim_metadata({}) == {'Education': []}
+
+
+def test_slim_metadata_merges_paths_of_the_same_list():
+    fields = ['metadata.Education[].Year', 'metadata.Education[].Degree']
+    assert slim_metadata(RESUME, fields) == {'Education': [
+        {'Year': '2015', 'Degree': 'BSc Mathematics'},
+        {'Year': '2017', 'Degree': 'MSc Computer Science'},
+    ]}
+
+
+def test_slim_payload_nests_under_metadata():
+    payload = slim_payload(Document(page_content='text', metadata=RESUME))
+    assert payload == {'metadata': slim_metadata(RESUME)}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ResumeStore(str(tmp_path / 'store.sqlite'))
+    yield store
+    store.close()
+
+
+def test_store_round_trip_and_field_projection(store):
+    store.put_many(['p1', 'p2'], ['text 1', 'text 2'], [RESUME, {'Name': 'Grace'}])
+
+    records = store.get_many(['p1', 'p2', 'missing'])
+    assert set(records) == {'p1', 'p2'}
+    assert records['p1'] == {'content': 'text 1', 'metadata': RESUME}
+    assert records['p2'] == {'content': 'text 2', 'metadata': {'Name': 'Grace'}}
+
+    assert store.get_many(['p1'], fields=['Skills', 'Name']) == {'p1': {'Skills': ['Python', 'SQL'], 'Name': 'Ada Lovelace'}}
+    assert store.get_many(['p2'], fields=['Skills']) == {'p2': {'Skills': None}}
+    assert store.get_many([], fields=['content']) == {}
+
+
+def test_store_rejects_unknown_fields(store):
+    with pytest.raises(ValueError, match='Salary'):
+        store.get_many(['p1'], fields=['Salary'])
+
+
+def test_store_replace_and_delete_except(store):
+    store.put_many(['p1', 'p2', 'p3'], ['a', 'b', 'c'], [{}, {}, {}])
+    store.put_many(['p1'], ['a2'], [{'Name': 'Ada'}])
+    assert store.get_many(['p1']) == {'p1': {'content': 'a2', 'metadata': {'Name': 'Ada'}}}
+
+    assert store.delete_except(['p1', 'p3']) == 1
+    assert set(store.get_many(['p1', 'p2', 'p3'], fields=['content'])) == {'p1', 'p3'}
+
+
+@pytest.fixture
+def client():
+    client = QdrantClient(':memory:')
+    client.create_collection('full', vectors_config=VectorParams(size=8, distance=Distance.COSINE))
+    client.create_collection('slim', vectors_config=VectorParams(size=8, distance=Distance.COSINE))
+    client.create_collection('sections', vectors_config=section_vectors_config(8))
+    yield client
+    client.close()
+
+
+def test_resume_writer_matches_the_collection(client, store):
+    embeddings = DeterministicFakeEmbedding(size=8)
+    document = Document(page_content='text', metadata=RESUME)
+
+    # Empty collections take either kind of writer
+    assert isinstance(resume_writer(client, 'slim', embeddings, store), SlimVectorStore)
+    assert isinstance(resume_writer(client, 'sections', embeddings), SectionVectorStore)
+    writer = resume_writer(client, 'full', embeddings)
+    assert isinstance(writer, QdrantVectorStore)
+
+    writer.add_documents([document], ids=['00000000-0000-0000-0000-000000000001'])
+    SlimVectorStore(client, 'slim', embeddings, store, sparse=False).add_documents(
+        [document], ['00000000-0000-0000-0000-000000000002'])
+    assert store.get_many(['00000000-0000-0000-0000-000000000002'])
+
+    with pytest.raises(ValueError, match='resume_store_path'):
+        resume_writer(client, 'slim', embeddings)
+    with pytest.raises(ValueError, match='without a resume store'):
+        resume_writer(client, 'full', embeddings, store)
+    assert isinstance(resume_writer(client, 'slim', embeddings, store), SlimVectorStore)
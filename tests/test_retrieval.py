@@ -0,0 +1,64 @@
+import json
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_qdrant import QdrantVectorStore
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import Distance, VectorParams, MatchValue, MatchAny
+from ingestion import sync_documents, create_payload_indexes, resume_filter_payload, resume_filter_values
+from retrieval import ResumeFilters
+
+
+def test_resume_filter_values_are_normalized():
+    resume = {
+        'Skills': ['Python', ' python ', 'Machine  Learning'], 'Languages': ['English'],
+        'Education': [{'Year': '2019'}, {'Year': 2021}, 'BSc'], 'Certifications': None,
+    }
+    assert resume_filter_values(resume) == {
+        'skills': ['machine learning', 'python'], 'certifications': [], 'languages': ['english'],
+        'education_years': ['2019', '2021'],
+    }
+
+
+def test_to_qdrant_translates_filters():
+    assert ResumeFilters().to_qdrant() is None
+    query_filter = ResumeFilters(skills=['Python', 'SQL '], education_years=['2019', '2020']).to_qdrant()
+    conditions = {condition.key: condition.match for condition in query_filter.must}
+    assert [c.match for c in query_filter.must[:2]] == [MatchValue(value='python'), MatchValue(value='sql')]
+    assert conditions['filters.education_years'] == MatchAny(any=['2019', '2020'])
+    assert len(query_filter.must) == 3
+
+
+@pytest.fixture
+def collection(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    client = QdrantClient(':memory:')
+    client.create_collection('resumes', vectors_config=VectorParams(size=8, distance=Distance.COSINE))
+    create_payload_indexes(client, 'resumes')
+    vector_store = QdrantVectorStore(client=client, collection_name='resumes', embedding=DeterministicFakeEmbedding(size=8))
+    resumes = [
+        {'Source': 'a.txt', 'Skills': ['Python', 'Docker'], 'Languages': ['English'], 'Education': [{'Year': '2019'}]},
+        {'Source': 'b.txt', 'Skills': ['python'], 'Languages': ['FRENCH'], 'Education': [{'Year': '2020'}]},
+        {'Source': 'c.txt', 'Skills': ['JavaScript'], 'Languages': ['english'], 'Education': []},
+    ]
+    sync_documents(vector_store, client, 'resumes', resumes,
+                   lambda resume: Document(page_content=json.dumps(resume), metadata=resume),
+                   extra_payload=resume_filter_payload)
+    yield client
+    client.close()
+
+
+def matching_sources(client, filters):
+    points = client.query_points('resumes', query=[1.0] * 8, query_filter=filters.to_qdrant(), limit=10).points
+    return sorted(point.payload['source'] for point in points)
+
+
+@pytest.mark.parametrize('filters, expected', [
+    (ResumeFilters(skills=['python']), ['a.txt', 'b.txt']),
+    (ResumeFilters(skills=['PYTHON', 'docker']), ['a.txt']),
+    (ResumeFilters(skills=['Java']), []),
+    (ResumeFilters(languages=['English']), ['a.txt', 'c.txt']),
+    (ResumeFilters(languages=['french'], education_years=['2019', '2020']), ['b.txt']),
+])
+def test_qdrant_filters_ignore_case(collection, filters, expected):
+    assert matching_sources(collection, filters) == expected
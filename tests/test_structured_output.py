@@ -0,0 +1,49 @@
+import pytest
+from structured_output import repair_json, parse_structured, schema_from_template, StructuredOutputError
+
+
+def test_repair_json_leaves_valid_json_alone():
+    assert repair_json('{"a": 1}') == ({'a': 1}, False)
+
+
+@pytest.mark.parametrize('text', [
+    '```json\n{"a": 1, "b": [1, 2]}\n```',
+    'Here is the result: {"a": 1, "b": [1, 2]} Hope this helps!',
+    '{"a": 1, "b": [1, 2,],}',
+    '{"a": 1, "b": [1, 2',
+])
+def test_repair_json_recovers_model_output(text):
+    assert repair_json(text) == ({'a': 1, 'b': [1, 2]}, True)
+
+
+def test_repair_json_keeps_brackets_and_commas_inside_strings():
+    data, repaired = repair_json('Result: {"note": "a, } b ,]", "items": ["x",]}')
+    assert data == {'note': 'a, } b ,]', 'items': ['x']}
+    assert repaired
+
+
+def test_repair_json_raises_without_json():
+    with pytest.raises(StructuredOutputError):
+        repair_json('I could not find any experience in this resume.')
+
+
+Schema = schema_from_template('Schema', '{"Name": "", "Skills": [], "Education": [{"Degree": "", "Year": ""}],}')
+
+
+def test_parse_structured_fills_defaults_and_coerces():
+    data, repaired = parse_structured('{"Name": "Ada", "Skills": null, "Education": [{"Year": 2019}], "Extra": 1}', Schema)
+    assert not repaired
+    assert data['Name'] == 'Ada'
+    assert data['Skills'] == []
+    assert data['Education'] == [{'Degree': '', 'Year': '2019'}]
+    assert data['Extra'] == 1
+
+
+def test_parse_structured_rejects_non_objects():
+    with pytest.raises(StructuredOutputError):
+        parse_structured('[{"Name": "Ada"}]', Schema)
+
+
+def test_parse_structured_rejects_mismatched_types():
+    with pytest.raises(StructuredOutputError, match='Skills'):
+        parse_structured('{"Skills": {"Python": true}}', Schema)